@@ -0,0 +1,335 @@
+import math
+import time
+import numpy as np
+
+
+class CursorFilter:
+    """Base class for cursor smoothing filters
+
+    filter() takes a raw screen position and the frame timestamp in seconds and
+    returns the smoothed position. Timestamps drive the time-aware filters so
+    replays at any speed give the same output.
+    """
+
+    def filter(self, x, y, timestamp):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+
+class PassthroughFilter(CursorFilter):
+    """No smoothing (the lowest possible latency reference)"""
+
+    def filter(self, x, y, timestamp):
+        return float(x), float(y)
+
+
+class LegacyFilter(CursorFilter):
+    """The original virtual_mouse.py smooth_movement: lerp plus average velocity"""
+
+    def __init__(self, smoothening=12, velocity_smoothening=8, dead_zone=5, max_history=5):
+        self.smoothening = smoothening
+        self.velocity_smoothening = velocity_smoothening
+        self.dead_zone = dead_zone
+        self.max_history = max_history
+        self.reset()
+
+    def reset(self):
+        self.prev_x, self.prev_y = 0, 0
+        self.movement_history = []
+
+    def filter(self, x, y, timestamp):
+        prev_x, prev_y = self.prev_x, self.prev_y
+
+        # Calculate raw movement
+        raw_dx = x - prev_x
+        raw_dy = y - prev_y
+
+        # Apply dead zone to prevent micro-movements
+        if abs(raw_dx) < self.dead_zone and abs(raw_dy) < self.dead_zone:
+            return prev_x, prev_y
+
+        # Add to movement history for velocity smoothing
+        self.movement_history.append((raw_dx, raw_dy))
+        if len(self.movement_history) > self.max_history:
+            self.movement_history.pop(0)
+
+        # Calculate average velocity
+        if len(self.movement_history) > 1:
+            avg_dx = sum(dx for dx, dy in self.movement_history) / len(self.movement_history)
+            avg_dy = sum(dy for dx, dy in self.movement_history) / len(self.movement_history)
+
+            # Apply velocity-based smoothing
+            smooth_x = prev_x + (x - prev_x) / self.smoothening + avg_dx / self.velocity_smoothening
+            smooth_y = prev_y + (y - prev_y) / self.smoothening + avg_dy / self.velocity_smoothening
+        else:
+            smooth_x = prev_x + (x - prev_x) / self.smoothening
+            smooth_y = prev_y + (y - prev_y) / self.smoothening
+
+        self.prev_x, self.prev_y = smooth_x, smooth_y
+        return smooth_x, smooth_y
+
+
+def _smoothing_factor(dt, cutoff):
+    """Exponential smoothing factor for a low-pass filter with the given cutoff (Hz)"""
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class OneEuroFilter(CursorFilter):
+    """One-Euro filter: heavy smoothing when still, little lag when moving fast
+
+    min_cutoff (Hz) sets the jitter level at rest; beta raises the cutoff with
+    speed (in pixels per second) to cut lag on fast motion.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0, fps=30.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.default_dt = 1.0 / fps
+        self.reset()
+
+    def reset(self):
+        self.last_time = None
+        self.x = self.y = 0.0
+        self.dx = self.dy = 0.0
+
+    def filter(self, x, y, timestamp):
+        x = float(x)
+        y = float(y)
+        if self.last_time is None:
+            self.last_time = timestamp
+            self.x, self.y = x, y
+            return x, y
+
+        dt = timestamp - self.last_time
+        if dt <= 0:
+            dt = self.default_dt
+        self.last_time = timestamp
+
+        # Smoothed speed
+        a_d = _smoothing_factor(dt, self.d_cutoff)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+        self.dy += a_d * ((y - self.y) / dt - self.dy)
+        speed = math.hypot(self.dx, self.dy)
+
+        # Speed-dependent cutoff for the position
+        a = _smoothing_factor(dt, self.min_cutoff + self.beta * speed)
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+        return self.x, self.y
+
+
+class _KalmanAxis:
+    """Constant-velocity Kalman filter for one axis (state: position, velocity)"""
+
+    __slots__ = ('p', 'v', 'p_pp', 'p_pv', 'p_vv')
+
+    def __init__(self, position, velocity_variance):
+        self.p = position
+        self.v = 0.0
+        self.p_pp = 0.0
+        self.p_pv = 0.0
+        self.p_vv = velocity_variance
+
+    def update(self, measurement, dt, q, r):
+        # Predict with white-noise acceleration
+        self.p += self.v * dt
+        dt2 = dt * dt
+        p_pp = self.p_pp + 2 * dt * self.p_pv + dt2 * self.p_vv + q * dt2 * dt2 / 4
+        p_pv = self.p_pv + dt * self.p_vv + q * dt2 * dt / 2
+        p_vv = self.p_vv + q * dt2
+
+        # Correct with the measured position
+        s = p_pp + r
+        k_p = p_pp / s
+        k_v = p_pv / s
+        residual = measurement - self.p
+        self.p += k_p * residual
+        self.v += k_v * residual
+        self.p_pp = (1 - k_p) * p_pp
+        self.p_pv = (1 - k_p) * p_pv
+        self.p_vv = p_vv - k_v * p_pv
+        return self.p
+
+
+class KalmanFilter(CursorFilter):
+    """Constant-velocity Kalman filter on each screen axis
+
+    process_noise is the acceleration variance (px^2/s^4): higher follows quick
+    changes of direction sooner. measurement_noise is the landmark jitter (px^2).
+    """
+
+    def __init__(self, process_noise=1e7, measurement_noise=40.0, fps=30.0):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.default_dt = 1.0 / fps
+        self.reset()
+
+    def reset(self):
+        self.last_time = None
+        self.axes = None
+
+    def filter(self, x, y, timestamp):
+        x = float(x)
+        y = float(y)
+        if self.axes is None:
+            self.last_time = timestamp
+            self.axes = (_KalmanAxis(x, 1e6), _KalmanAxis(y, 1e6))
+            return x, y
+
+        dt = timestamp - self.last_time
+        if dt <= 0:
+            dt = self.default_dt
+        self.last_time = timestamp
+
+        q, r = self.process_noise, self.measurement_noise
+        return self.axes[0].update(x, dt, q, r), self.axes[1].update(y, dt, q, r)
+
+
+# Named filter presets: (class, keyword arguments)
+FILTER_PRESETS = {
+    "legacy": (LegacyFilter, {}),
+    "none": (PassthroughFilter, {}),
+    "one_euro": (OneEuroFilter, {'min_cutoff': 1.0, 'beta': 0.01}),
+    "one_euro_stable": (OneEuroFilter, {'min_cutoff': 0.5, 'beta': 0.004}),
+    "one_euro_fast": (OneEuroFilter, {'min_cutoff': 2.0, 'beta': 0.03}),
+    "kalman": (KalmanFilter, {'process_noise': 1e7, 'measurement_noise': 40.0}),
+    "kalman_stable": (KalmanFilter, {'process_noise': 1e6, 'measurement_noise': 40.0}),
+    "kalman_fast": (KalmanFilter, {'process_noise': 1e8, 'measurement_noise': 40.0})
+}
+DEFAULT_FILTER = "legacy"
+
+
+def create_filter(name=DEFAULT_FILTER, **overrides):
+    """Create a cursor filter from a preset name, optionally overriding parameters"""
+    if name not in FILTER_PRESETS:
+        raise ValueError(f"Unknown cursor filter '{name}' (choose from {', '.join(FILTER_PRESETS)})")
+    filter_class, params = FILTER_PRESETS[name]
+    return filter_class(**{**params, **overrides})
+
+
+def add_filter_arguments(parser):
+    """Add the --cursor-filter option to an argparse parser"""
+    parser.add_argument("--cursor-filter", default=DEFAULT_FILTER, choices=list(FILTER_PRESETS),
+                        help="cursor smoothing filter preset")
+    return parser
+
+
+# ----- Benchmark -----
+
+def run_filter(cursor_filter, timestamps, points):
+    """Filter an (N, 2) path and return the (N, 2) output"""
+    cursor_filter.reset()
+    output = np.empty((len(points), 2), dtype=np.float64)
+    for index, ((x, y), timestamp) in enumerate(zip(points.tolist(), timestamps.tolist())):
+        output[index] = cursor_filter.filter(x, y, timestamp)
+    return output
+
+
+def evaluate_filter(output, reference, max_lag=15, still_speed=2.0, settle_frames=10):
+    """Measure lag and jitter of a filtered path against a reference path
+
+    lag: the frame shift that best aligns the output with the reference.
+    jitter: RMS frame-to-frame output movement once the reference has been
+    still for settle_frames (so catching up after a move is not counted);
+    nan if the reference never holds still that long.
+    error: mean distance to the reference with no shift.
+    """
+    errors = []
+    for lag in range(min(max_lag, len(output) - 1) + 1):
+        delta = output[lag:] - reference[:len(reference) - lag]
+        errors.append(np.mean(np.hypot(delta[:, 0], delta[:, 1])))
+    lag = int(np.argmin(errors))
+
+    steps = np.hypot(*np.diff(output, axis=0).T)
+    reference_steps = np.hypot(*np.diff(reference, axis=0).T)
+    moving = (reference_steps >= still_speed).astype(np.int32)
+    recent = np.convolve(moving, np.ones(settle_frames, dtype=np.int32))[:len(moving)]
+    still = recent == 0
+    jitter = float(np.sqrt(np.mean(steps[still]**2))) if still.any() else float('nan')
+
+    return {'lag_frames': lag, 'jitter_px': jitter, 'error_px': float(errors[0])}
+
+
+def trace_cursor_path(trace, screen_width=1920, screen_height=1080, margin=100):
+    """Map the first hand's index fingertip in a trace to screen coordinates
+
+    Uses the same frame-to-screen mapping as virtual_mouse.py and returns
+    (timestamps, points) for the frames where a hand was present.
+    """
+    from hand_landmarks import INDEX_FINGER_TIP, landmarks_to_pixels
+
+    frame_width = trace.frame_width or 640
+    frame_height = trace.frame_height or 480
+    present = trace.hand_mask()[:, 0]
+    pixels = landmarks_to_pixels(trace.landmarks[present, 0, INDEX_FINGER_TIP], frame_width, frame_height)
+    screen_x = np.interp(pixels[:, 0], (margin, frame_width - margin), (0, screen_width))
+    screen_y = np.interp(pixels[:, 1], (margin, frame_height - margin), (0, screen_height))
+    return np.asarray(trace.timestamps[present], dtype=np.float64), np.column_stack([screen_x, screen_y])
+
+
+def synthetic_cursor_path(num_frames=1800, fps=30.0, noise=3.0, seed=0):
+    """Generate holds and quick moves between targets plus landmark-like noise
+
+    Returns (timestamps, noisy points, clean reference points).
+    """
+    rng = np.random.default_rng(seed)
+    clean = np.empty((num_frames, 2), dtype=np.float64)
+    position = np.array([960.0, 540.0])
+    index = 0
+    while index < num_frames:
+        # Hold still, then move to a new target with a smooth ease-in-out
+        hold = int(rng.integers(10, 40))
+        clean[index:index + hold] = position
+        index += hold
+        target = rng.uniform([100, 100], [1820, 980])
+        steps = int(rng.integers(6, 20))
+        t = (1 - np.cos(np.linspace(0, np.pi, steps + 1)[1:])) / 2
+        move = position + np.outer(t, target - position)
+        clean[index:index + steps] = move[:max(0, min(steps, num_frames - index))]
+        index += steps
+        position = target
+
+    timestamps = np.arange(num_frames) / fps
+    noisy = clean + rng.normal(0, noise, clean.shape)
+    return timestamps, noisy, clean
+
+
+def main():
+    import argparse
+    from landmark_trace import LandmarkTrace
+
+    parser = argparse.ArgumentParser(description="Cursor filter lag/jitter benchmark")
+    parser.add_argument("trace", nargs="?", default=None,
+                        help="landmark trace to replay (a synthetic path is used if omitted)")
+    parser.add_argument("--noise", type=float, default=3.0,
+                        help="landmark noise in pixels for the synthetic path")
+    parser.add_argument("--frames", type=int, default=1800,
+                        help="frames in the synthetic path")
+    args = parser.parse_args()
+
+    if args.trace:
+        timestamps, points = trace_cursor_path(LandmarkTrace(args.trace))
+        # Recorded traces have no ground truth; measure against the raw fingertip
+        reference = points
+        print(f"Trace: {len(points)} frames with a hand")
+    else:
+        timestamps, points, reference = synthetic_cursor_path(args.frames, noise=args.noise)
+        print(f"Synthetic path: {len(points)} frames, {args.noise:.1f}px noise")
+
+    print(f"{'filter':<20}{'lag (frames)':>14}{'jitter (px)':>13}{'error (px)':>12}{'us/update':>11}")
+    for name in FILTER_PRESETS:
+        cursor_filter = create_filter(name)
+        start = time.perf_counter()
+        output = run_filter(cursor_filter, timestamps, points)
+        per_update = (time.perf_counter() - start) * 1e6 / max(len(points), 1)
+        stats = evaluate_filter(output, reference)
+        print(f"{name:<20}{stats['lag_frames']:>14}{stats['jitter_px']:>13.2f}"
+              f"{stats['error_px']:>12.1f}{per_update:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
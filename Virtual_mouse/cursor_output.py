@@ -0,0 +1,301 @@
+import threading
+import time
+from collections import deque
+
+DEFAULT_MOVE_RATE = 60.0   # Moves per second without a cursor output thread (a 60 Hz display)
+
+
+class FakeMouse:
+    """Mouse backend that only counts and remembers moves (for test runs)"""
+
+    def __init__(self):
+        self.moves = 0
+        self.position = None
+
+    def move_to(self, x, y):
+        self.moves += 1
+        self.position = (x, y)
+
+
+class MoveLimiter:
+    """Drop cursor moves that would not change anything and cap the move rate
+
+    Positions are rounded to whole pixels. A move to the pixel the cursor is
+    already on, or closer than min_distance to it, is suppressed. Moves that
+    arrive faster than max_rate are held back and only the newest one is sent
+    once the rate allows (flush() sends it if no further move comes). The cap
+    is an average with half an interval of slack, so a move that arrives a
+    little early because of timer jitter is not held back a whole frame.
+    """
+
+    def __init__(self, move_to, max_rate=DEFAULT_MOVE_RATE, min_distance=1.0):
+        self.move_to_fn = move_to
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.min_distance = min_distance
+        self.last_position = None
+        self.next_emit_time = None      # When the next move is due at the capped rate
+        self.pending = None
+
+        # Counters
+        self.requested = 0
+        self.emitted = 0
+        self.suppressed_noop = 0
+        self.suppressed_small = 0
+        self.merged = 0
+
+    def move_to(self, x, y, now=None):
+        """Request a move; returns True if it was sent"""
+        if now is None:
+            now = time.perf_counter()
+        self.requested += 1
+        position = (int(round(x)), int(round(y)))
+
+        if self.last_position is not None:
+            dx = position[0] - self.last_position[0]
+            dy = position[1] - self.last_position[1]
+            if dx == 0 and dy == 0:
+                self.suppressed_noop += 1
+                if self.pending is not None:
+                    # The held-back move is no longer needed either
+                    self.merged += 1
+                self.pending = None
+                return False
+            if dx * dx + dy * dy < self.min_distance * self.min_distance:
+                self.suppressed_small += 1
+                if self.pending is not None:
+                    self.merged += 1
+                self.pending = None
+                return False
+
+        if not self._due(now):
+            # Too soon: keep only the newest position of the burst
+            if self.pending is not None:
+                self.merged += 1
+            self.pending = position
+            return False
+
+        self._emit(position, now)
+        return True
+
+    def flush(self, now=None):
+        """Send a held-back move once the rate limit allows it"""
+        if self.pending is None:
+            return False
+        if now is None:
+            now = time.perf_counter()
+        if not self._due(now):
+            return False
+        self._emit(self.pending, now)
+        return True
+
+    def _due(self, now):
+        return self.next_emit_time is None or self.next_emit_time - now <= self.min_interval / 2
+
+    def _emit(self, position, now):
+        if self.pending is not None and self.pending != position:
+            self.merged += 1
+        self.pending = None
+        self.move_to_fn(*position)
+        self.last_position = position
+        base = now if self.next_emit_time is None else max(self.next_emit_time, now)
+        self.next_emit_time = base + self.min_interval
+        self.emitted += 1
+
+    def get_stats(self):
+        """Return emitted versus suppressed move counts"""
+        suppressed = self.suppressed_noop + self.suppressed_small + self.merged
+        return {
+            'requested': self.requested,
+            'emitted': self.emitted,
+            'suppressed': suppressed,
+            'noop': self.suppressed_noop,
+            'small': self.suppressed_small,
+            'merged': self.merged
+        }
+
+    def print_report(self, title="Cursor moves"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['emitted']} emitted, {stats['suppressed']} suppressed "
+              f"of {stats['requested']} requested (no-op {stats['noop']}, "
+              f"sub-threshold {stats['small']}, merged {stats['merged']})")
+
+
+class CursorOutputThread:
+    """Move the cursor at a fixed rate, interpolating between vision targets
+
+    The vision loop calls set_target() once per camera frame. The output thread
+    runs at rate_hz and renders the cursor one target interval in the past, so
+    it always interpolates between the last two targets instead of jumping
+    once per frame. That adds one frame interval of latency, which the
+    prediction stage can hide.
+    """
+
+    def __init__(self, move_to, rate_hz=120.0, delay=None, flush=None):
+        self.move_to = move_to
+        self.flush = flush              # Called every tick (e.g. MoveLimiter.flush)
+        self.interval = 1.0 / rate_hz
+        self.delay = delay              # Fixed render delay; None tracks the target interval
+        self.target_interval = 1.0 / 30.0
+
+        # Last two (time, x, y) targets
+        self.targets = deque(maxlen=2)
+        self.lock = threading.Lock()
+
+        # Counters
+        self.ticks = 0
+        self.moves = 0
+        self.last_position = None
+
+        self.running = False
+        self.thread = None
+        self.start_time = None
+
+    def set_target(self, x, y, timestamp=None):
+        """Hand the output thread a new filtered cursor position"""
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        with self.lock:
+            if self.targets:
+                dt = timestamp - self.targets[-1][0]
+                if 0 < dt < 1.0:
+                    self.target_interval += 0.2 * (dt - self.target_interval)
+            self.targets.append((timestamp, float(x), float(y)))
+
+    def position_at(self, now):
+        """Interpolated cursor position for time now (None before the first target)"""
+        with self.lock:
+            if not self.targets:
+                return None
+            delay = self.delay if self.delay is not None else self.target_interval
+            t1, x1, y1 = self.targets[-1]
+            if len(self.targets) < 2:
+                return x1, y1
+            t0, x0, y0 = self.targets[0]
+
+        if t1 <= t0:
+            return x1, y1
+        a = (now - delay - t0) / (t1 - t0)
+        a = min(max(a, 0.0), 1.0)
+        return x0 + (x1 - x0) * a, y0 + (y1 - y0) * a
+
+    def start(self):
+        """Start the output thread"""
+        if self.running:
+            return self
+        self.running = True
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self.output_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def output_loop(self):
+        next_tick = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            position = self.position_at(now)
+            self.ticks += 1
+            if position is not None:
+                # Whole pixels only; a repeated pixel is not a move
+                position = (int(round(position[0])), int(round(position[1])))
+                if position != self.last_position:
+                    self.move_to(*position)
+                    self.moves += 1
+                    self.last_position = position
+                elif self.flush is not None:
+                    self.flush()
+
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (slow backend); do not try to catch up with a burst
+                next_tick = time.perf_counter()
+
+    def get_stats(self):
+        """Return tick/move counters and the achieved rates"""
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        return {
+            'ticks': self.ticks,
+            'moves': self.moves,
+            'tick_rate': self.ticks / elapsed if elapsed > 0 else 0.0,
+            'move_rate': self.moves / elapsed if elapsed > 0 else 0.0
+        }
+
+    def stop(self):
+        """Stop the output thread"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+
+def add_output_arguments(parser):
+    """Add the --cursor-rate/--max-move-rate options to an argparse parser"""
+    parser.add_argument("--cursor-rate", type=float, default=0,
+                        help="move the cursor from a separate thread at this rate in Hz "
+                             "(0 = once per camera frame)")
+    parser.add_argument("--max-move-rate", type=float, default=None,
+                        help="cap on cursor moves per second, applied after --cursor-rate (default: the "
+                             "--cursor-rate when set, so it is never throttled, otherwise 60; 0 = no cap)")
+    return parser
+
+
+def resolve_move_rate(args):
+    """Move rate cap from parsed --max-move-rate/--cursor-rate options (0 = no cap)"""
+    if args.max_move_rate is not None:
+        return args.max_move_rate
+    return args.cursor_rate if args.cursor_rate > 0 else DEFAULT_MOVE_RATE
+
+
+def main():
+    import argparse
+    from cursor_filters import create_filter, synthetic_cursor_path
+
+    parser = argparse.ArgumentParser(description="Cursor output thread test against a fake mouse")
+    parser.add_argument("--rate", type=float, nargs="+", default=[60.0, 120.0, 240.0],
+                        help="output rates in Hz")
+    parser.add_argument("--fps", type=float, default=30.0, help="simulated vision frame rate")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per run")
+
+    parser.add_argument("--max-move-rate", type=float, default=DEFAULT_MOVE_RATE,
+                        help="move rate cap for the limiter test (the output runs use their own rate)")
+    args = parser.parse_args()
+
+    # Sustained tracking through the legacy filter, once per frame, with and without the limiter
+    timestamps, noisy, _ = synthetic_cursor_path(1800, fps=args.fps)
+    cursor_filter = create_filter("legacy")
+    mouse = FakeMouse()
+    limiter = MoveLimiter(mouse.move_to, max_rate=args.max_move_rate)
+    for (x, y), timestamp in zip(noisy.tolist(), timestamps.tolist()):
+        limiter.move_to(*cursor_filter.filter(x, y, timestamp), now=timestamp)
+        limiter.flush(now=timestamp)
+    limiter.print_report(f"Per-frame moves ({len(noisy)} frames)")
+
+    _, points, _ = synthetic_cursor_path(int(args.duration * args.fps) + 1, fps=args.fps, noise=0.0)
+    # Moves a once-per-frame cursor would make
+    rounded = points.round().astype(int)
+    per_frame_moves = 1 + int((rounded[1:] != rounded[:-1]).any(axis=1).sum())
+    print(f"Per-frame output: {per_frame_moves} moves for {len(points)} targets")
+    for rate in args.rate:
+        mouse = FakeMouse()
+        limiter = MoveLimiter(mouse.move_to, max_rate=rate)
+        output = CursorOutputThread(limiter.move_to, rate_hz=rate, flush=limiter.flush).start()
+        start = time.perf_counter()
+        for index, (x, y) in enumerate(points.tolist()):
+            output.set_target(x, y)
+            # Pace the vision loop like a camera would
+            delay = start + (index + 1) / args.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        output.stop()
+
+        stats = output.get_stats()
+        print(f"{rate:.0f} Hz: {len(points)} targets at {args.fps:.0f} FPS -> "
+              f"{mouse.moves} moves ({stats['move_rate']:.0f}/s), "
+              f"{stats['ticks']} ticks ({stats['tick_rate']:.0f}/s)")
+        limiter.print_report(f"  capped at {rate:.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import math
+import time
+from collections import deque
+
+
+class CursorPredictor:
+    """Project the smoothed cursor forward by the measured pipeline latency
+
+    By the time the cursor moves, the fingertip has moved on for capture +
+    inference + smoothing time. predict() extrapolates the smoothed position
+    along its recent velocity by that latency, clamped so a sudden stop does
+    not fling the cursor past the target.
+    """
+
+    def __init__(self, max_lead_px=80.0, max_latency=0.2, min_speed=40.0,
+                 velocity_smoothing=0.5, bounds=None):
+        self.max_lead_px = max_lead_px       # Longest allowed extrapolation
+        self.max_latency = max_latency       # Latency is capped at this many seconds
+        self.min_speed = min_speed           # px/s below which the cursor is not projected
+        self.velocity_smoothing = velocity_smoothing
+        self.bounds = bounds                 # (width, height) to keep predictions on screen
+        self.reset()
+
+    def reset(self):
+        self.last = None
+        self.vx = self.vy = 0.0
+        self.clamped = 0
+        self.predictions = 0
+
+    def predict(self, x, y, timestamp, latency):
+        """Return the position projected latency seconds past timestamp"""
+        x = float(x)
+        y = float(y)
+        if self.last is not None:
+            last_x, last_y, last_time = self.last
+            dt = timestamp - last_time
+            if dt > 0:
+                a = self.velocity_smoothing
+                self.vx += a * ((x - last_x) / dt - self.vx)
+                self.vy += a * ((y - last_y) / dt - self.vy)
+        self.last = (x, y, timestamp)
+        self.predictions += 1
+
+        latency = min(max(latency, 0.0), self.max_latency)
+        speed = math.hypot(self.vx, self.vy)
+        if speed < self.min_speed:
+            return x, y
+
+        lead_x = self.vx * latency
+        lead_y = self.vy * latency
+        lead = math.hypot(lead_x, lead_y)
+
+        # Overshoot clamp
+        if lead > self.max_lead_px:
+            scale = self.max_lead_px / lead
+            lead_x *= scale
+            lead_y *= scale
+            self.clamped += 1
+
+        px = x + lead_x
+        py = y + lead_y
+        if self.bounds is not None:
+            px = min(max(px, 0.0), self.bounds[0] - 1)
+            py = min(max(py, 0.0), self.bounds[1] - 1)
+        return px, py
+
+
+class PredictionErrorLog:
+    """Score predictions against the positions observed later
+
+    Each prediction is stored with the time it was aimed at. Once an
+    observation at or after that time arrives, the fingertip position at the
+    target time is interpolated and the errors of both the predicted and the
+    unpredicted (smoothed only) cursor are accumulated.
+    """
+
+    def __init__(self):
+        self.pending = deque()
+        self.last_observation = None
+        self.count = 0
+        self.predicted_error = 0.0
+        self.baseline_error = 0.0
+        self.max_predicted_error = 0.0
+
+    def add(self, target_time, predicted, baseline):
+        self.pending.append((target_time, predicted, baseline))
+
+    def observe(self, x, y, timestamp):
+        """Record the fingertip position seen at timestamp"""
+        x = float(x)
+        y = float(y)
+        previous = self.last_observation
+        self.last_observation = (x, y, timestamp)
+        if previous is None:
+            return
+
+        prev_x, prev_y, prev_time = previous
+        while self.pending and self.pending[0][0] <= timestamp:
+            target_time, predicted, baseline = self.pending.popleft()
+            if target_time < prev_time:
+                # Aimed between older observations (e.g. after a gap); skip it
+                continue
+            span = timestamp - prev_time
+            t = (target_time - prev_time) / span if span > 0 else 1.0
+            actual_x = prev_x + (x - prev_x) * t
+            actual_y = prev_y + (y - prev_y) * t
+
+            error = math.hypot(predicted[0] - actual_x, predicted[1] - actual_y)
+            self.predicted_error += error
+            self.baseline_error += math.hypot(baseline[0] - actual_x, baseline[1] - actual_y)
+            self.max_predicted_error = max(self.max_predicted_error, error)
+            self.count += 1
+
+    def report(self):
+        """Return mean errors (px) with and without prediction"""
+        count = max(self.count, 1)
+        return {
+            'samples': self.count,
+            'predicted_px': self.predicted_error / count,
+            'baseline_px': self.baseline_error / count,
+            'max_predicted_px': self.max_predicted_error
+        }
+
+    def print_report(self, title="Cursor prediction"):
+        report = self.report()
+        print(f"{title}: {report['samples']} samples, mean error {report['predicted_px']:.1f}px "
+              f"predicted vs {report['baseline_px']:.1f}px unpredicted "
+              f"(max {report['max_predicted_px']:.1f}px)")
+
+
+def add_prediction_arguments(parser):
+    """Add the --predict/--predict-latency-ms options to an argparse parser"""
+    parser.add_argument("--predict", action="store_true",
+                        help="extrapolate the cursor by the measured pipeline latency")
+    parser.add_argument("--predict-latency-ms", type=float, default=None,
+                        help="use a fixed latency instead of the measured one")
+    return parser
+
+
+def replay_prediction(cursor_filter, predictor, timestamps, points, reference, latency):
+    """Run filter + predictor over a path and score it against the reference path"""
+    log = PredictionErrorLog()
+    cursor_filter.reset()
+    predictor.reset()
+    for (x, y), (ref_x, ref_y), timestamp in zip(points.tolist(), reference.tolist(), timestamps.tolist()):
+        log.observe(ref_x, ref_y, timestamp)
+        smooth = cursor_filter.filter(x, y, timestamp)
+        predicted = predictor.predict(smooth[0], smooth[1], timestamp, latency)
+        log.add(timestamp + latency, predicted, smooth)
+    return log
+
+
+def main():
+    import argparse
+    from cursor_filters import FILTER_PRESETS, create_filter, synthetic_cursor_path, trace_cursor_path
+    from landmark_trace import LandmarkTrace
+
+    parser = argparse.ArgumentParser(description="Cursor prediction error on replayed paths")
+    parser.add_argument("trace", nargs="?", default=None,
+                        help="landmark trace to replay (a synthetic path is used if omitted)")
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[33.0, 66.0, 100.0],
+                        help="pipeline latencies to simulate")
+    parser.add_argument("--max-lead", type=float, default=80.0,
+                        help="overshoot clamp in pixels")
+    parser.add_argument("--noise", type=float, default=3.0,
+                        help="landmark noise in pixels for the synthetic path")
+    args = parser.parse_args()
+
+    if args.trace:
+        timestamps, points = trace_cursor_path(LandmarkTrace(args.trace))
+        reference = points
+    else:
+        timestamps, points, reference = synthetic_cursor_path(noise=args.noise)
+
+    print(f"{'filter':<18}{'latency':>9}{'predicted':>11}{'smoothed':>10}{'max':>8}{'clamped':>9}")
+    for name in FILTER_PRESETS:
+        for latency_ms in args.latency_ms:
+            predictor = CursorPredictor(max_lead_px=args.max_lead)
+            start = time.perf_counter()
+            log = replay_prediction(create_filter(name), predictor, timestamps, points, reference,
+                                    latency_ms / 1000.0)
+            elapsed = time.perf_counter() - start
+            report = log.report()
+            print(f"{name:<18}{latency_ms:>7.0f}ms{report['predicted_px']:>9.1f}px"
+                  f"{report['baseline_px']:>8.1f}px{report['max_predicted_px']:>6.0f}px"
+                  f"{predictor.clamped / max(predictor.predictions, 1):>8.0%}")
+    print(f"({len(points)} frames, {elapsed * 1e6 / max(len(points), 1):.1f} us/frame for the last run)")
+
+
+if __name__ == "__main__":
+    main()
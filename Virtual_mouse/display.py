@@ -0,0 +1,55 @@
+import threading
+from collections import deque
+import cv2
+
+# OpenCV's HighGUI is not thread-safe, and apps sharing a VisionEngine each
+# run their window from their own thread; every window call in the process
+# goes through this lock
+window_lock = threading.RLock()
+
+NO_KEY = 0xFF           # poll_key() result when no key was pressed (cv2.waitKey's -1 masked)
+PENDING_KEYS = 32       # Keys kept for an app that has not polled for a while
+_pending_keys = {}      # Window -> keys read by any app's poll and not yet returned to this one
+
+
+def create_window(name, flags=cv2.WINDOW_AUTOSIZE):
+    with window_lock:
+        cv2.namedWindow(name, flags)
+
+
+def set_window_property(name, prop, value):
+    with window_lock:
+        cv2.setWindowProperty(name, prop, value)
+
+
+def show_frame(name, image):
+    with window_lock:
+        cv2.imshow(name, image)
+
+
+def poll_key(window, delay=1):
+    """cv2.waitKey for one app's window, masked to the key code (NO_KEY if none)
+
+    waitKey returns keys pressed in any HighGUI window of the process, so with
+    several apps polling (vision_engine.py) whichever polled first would take
+    the key. Every key read here is handed to all windows that poll instead,
+    so 'q' stops every app and no app loses its hotkeys to another.
+    """
+    with window_lock:
+        keys = _pending_keys.setdefault(window, deque(maxlen=PENDING_KEYS))
+        key = cv2.waitKey(delay)
+        if key != -1:
+            for pending in _pending_keys.values():
+                pending.append(key & 0xFF)
+        return keys.popleft() if keys else NO_KEY
+
+
+def close_window(name):
+    """Close one app's window, leaving the windows of other apps in the process open"""
+    with window_lock:
+        _pending_keys.pop(name, None)
+        try:
+            cv2.destroyWindow(name)
+        except cv2.error:
+            # The window was never opened (headless or background mode)
+            pass
@@ -0,0 +1,163 @@
+import time
+import cv2
+import numpy as np
+
+
+def write_into(target, result):
+    """Make sure an OpenCV result ended up in its dst buffer and return the buffer"""
+    # OpenCV writes into dst in place; copy if a binding ever returns a new array
+    if result is not target:
+        target[...] = result
+    return target
+
+
+class FramePool:
+    """Named frame-sized buffers that are reused from frame to frame
+
+    get() hands out the same array for a name as long as the shape and dtype
+    stay the same, so flips, colour conversions, copies and blends can write
+    into dst= buffers instead of allocating every frame. Every allocation is
+    counted per frame, so a steady-state loop should report none after the
+    first frame. A buffer is only valid until the same name is requested again.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+
+        # Counters
+        self.frames = 0
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.frame_allocations = 0      # In the current frame
+        self.frame_bytes = 0
+        self.steady_allocations = 0     # After the first frame
+        self.steady_bytes = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """Reused buffer (contents undefined)"""
+        shape = tuple(shape)
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buffer
+            self.allocations += 1
+            self.allocated_bytes += buffer.nbytes
+            self.frame_allocations += 1
+            self.frame_bytes += buffer.nbytes
+        return buffer
+
+    def zeros(self, name, shape, dtype=np.uint8):
+        """Reused buffer cleared to zero"""
+        buffer = self.get(name, shape, dtype)
+        buffer.fill(0)
+        return buffer
+
+    def copy(self, name, array):
+        """Reused copy of array"""
+        buffer = self.get(name, array.shape, array.dtype)
+        np.copyto(buffer, array)
+        return buffer
+
+    def flip(self, name, frame, flip_code=1):
+        """cv2.flip into a reused buffer"""
+        target = self.get(name, frame.shape, frame.dtype)
+        return write_into(target, cv2.flip(frame, flip_code, dst=target))
+
+    def cvt_color(self, name, frame, code, channels=3):
+        """cv2.cvtColor into a reused buffer with the given number of output channels"""
+        shape = frame.shape[:2] if channels == 1 else frame.shape[:2] + (channels,)
+        target = self.get(name, shape, frame.dtype)
+        return write_into(target, cv2.cvtColor(frame, code, dst=target))
+
+    def frame_done(self):
+        """Mark the end of one loop iteration"""
+        if self.frames > 0:
+            self.steady_allocations += self.frame_allocations
+            self.steady_bytes += self.frame_bytes
+        self.frames += 1
+        self.frame_allocations = 0
+        self.frame_bytes = 0
+
+    def get_stats(self):
+        """Return buffer and allocation counts (steady = after the first frame)"""
+        steady_frames = max(self.frames - 1, 1)
+        return {
+            'buffers': len(self.buffers),
+            'buffer_bytes': sum(buffer.nbytes for buffer in self.buffers.values()),
+            'frames': self.frames,
+            'allocations': self.allocations,
+            'allocated_bytes': self.allocated_bytes,
+            'steady_allocations_per_frame': self.steady_allocations / steady_frames,
+            'steady_bytes_per_frame': self.steady_bytes / steady_frames
+        }
+
+    def print_report(self, title="Frame buffers"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['buffers']} buffers ({stats['buffer_bytes'] / 1e6:.1f} MB), "
+              f"{stats['allocations']} allocations ({stats['allocated_bytes'] / 1e6:.1f} MB) "
+              f"over {stats['frames']} frames, {stats['steady_allocations_per_frame']:.2f} allocations "
+              f"and {stats['steady_bytes_per_frame'] / 1e3:.1f} kB per frame after the first")
+
+
+def main():
+    import argparse
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="Per-frame allocations of the overlay keyboard's frame path")
+    parser.add_argument("--frames", type=int, default=200, help="frames per resolution")
+    args = parser.parse_args()
+
+    def allocating_path(frame, overlay, alpha, pool):
+        # The original per-frame path: every step returns a new array
+        mirrored = cv2.flip(frame, 1)
+        rgb = cv2.cvtColor(mirrored, cv2.COLOR_BGR2RGB)
+        display = mirrored.copy()
+        background = np.zeros_like(mirrored)
+        display = cv2.addWeighted(display, 1 - alpha, overlay, alpha, 0)
+        blank = cv2.addWeighted(background, 1 - alpha, overlay, alpha, 0)
+        return rgb, display, blank
+
+    def pooled_path(frame, overlay, alpha, pool):
+        mirrored = pool.flip("mirror", frame)
+        rgb = pool.cvt_color("rgb", mirrored, cv2.COLOR_BGR2RGB)
+        display = pool.get("display", mirrored.shape)
+        write_into(display, cv2.addWeighted(mirrored, 1 - alpha, overlay, alpha, 0, dst=display))
+        background = pool.zeros("background", mirrored.shape)
+        blank = pool.get("blank", mirrored.shape)
+        write_into(blank, cv2.addWeighted(background, 1 - alpha, overlay, alpha, 0, dst=blank))
+        return rgb, display, blank
+
+    rng = np.random.default_rng(0)
+    for width, height in [(640, 480), (1280, 720), (1920, 1080)]:
+        frames = [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(4)]
+        overlay = np.zeros((height, width, 3), dtype=np.uint8)
+        overlay[int(height * 0.35):int(height * 0.95), width // 40:-width // 40] = (50, 50, 50)
+
+        results = {}
+        for name, path in [("allocating", allocating_path), ("pooled", pooled_path)]:
+            pool = FramePool()
+            outputs = None
+            tracemalloc.start()
+            peak = 0
+            start = time.perf_counter()
+            for index in range(args.frames):
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                outputs = path(frames[index % len(frames)], overlay, 0.8, pool)
+                if index > 0:
+                    # Transient allocations within the frame
+                    peak += tracemalloc.get_traced_memory()[1] - before
+                pool.frame_done()
+            elapsed = time.perf_counter() - start
+            tracemalloc.stop()
+            results[name] = [output.copy() for output in outputs]
+            print(f"{width}x{height} {name:<10} {elapsed * 1000.0 / args.frames:5.2f} ms/frame (traced), "
+                  f"{peak / max(args.frames - 1, 1) / 1e6:5.2f} MB allocated per frame")
+            if name == "pooled":
+                pool.print_report("  pool")
+        identical = all(np.array_equal(a, b) for a, b in zip(results["allocating"], results["pooled"]))
+        print(f"  identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import deque
+from frame_sources import open_source, REPLAY_FAST, REPLAY_REALTIME
+
+
+class ThreadedCapture:
+    """Read frames on a dedicated thread and always hand out the newest one"""
+
+    def __init__(self, source=0, width=None, height=None, fps=None, buffer_size=2,
+                 loop=False, mode=None):
+        self.cap = open_source(source, mode=mode or REPLAY_REALTIME, width=width,
+                               height=height, fps=fps, loop=loop)
+
+        # Ring buffer of (frame_id, frame, timestamp)
+        self.buffer = deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+
+        # Counters
+        self.frames_captured = 0
+        self.frames_delivered = 0
+        self.dropped_frames = 0
+        self.last_delivered_id = 0
+
+        self.running = False
+        self.finished = False
+        self.thread = None
+
+    @property
+    def live(self):
+        return self.cap.live
+
+    def start(self):
+        """Start the capture thread"""
+        if self.running:
+            return self
+        self.running = True
+        self.finished = False
+        self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def capture_loop(self):
+        """Continuously read frames into the ring buffer"""
+        while self.running:
+            ret, frame, timestamp = self.cap.read_timestamped()
+            if not ret:
+                break
+
+            with self.condition:
+                self.frames_captured += 1
+                self.buffer.append((self.frames_captured, frame, timestamp))
+                self.condition.notify_all()
+
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def read_latest(self, timeout=1.0):
+        """Return (ret, frame, timestamp, dropped) for the newest unseen frame"""
+        if not self.running and not self.finished:
+            self.start()
+
+        with self.condition:
+            if not self.condition.wait_for(
+                    lambda: self.frames_captured > self.last_delivered_id or self.finished,
+                    timeout):
+                return False, None, 0.0, 0
+            if not self.buffer or self.buffer[-1][0] <= self.last_delivered_id:
+                return False, None, 0.0, 0
+
+            frame_id, frame, timestamp = self.buffer[-1]
+            self.buffer.clear()
+
+        # Frames captured since the last read that the consumer never saw
+        dropped = frame_id - self.last_delivered_id - 1
+        self.last_delivered_id = frame_id
+        self.frames_delivered += 1
+        self.dropped_frames += dropped
+        return True, frame, timestamp, dropped
+
+    def read_timestamped(self):
+        """Return (ret, frame, timestamp) like FrameSource.read_timestamped"""
+        ret, frame, timestamp, _ = self.read_latest()
+        return ret, frame, timestamp
+
+    def read(self):
+        """VideoCapture-compatible read returning the newest frame"""
+        ret, frame, _, _ = self.read_latest()
+        return ret, frame
+
+    def isOpened(self):
+        if self.finished:
+            with self.condition:
+                return self.frames_captured > self.last_delivered_id
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def get_stats(self):
+        """Return capture counters"""
+        return {
+            'captured': self.frames_captured,
+            'delivered': self.frames_delivered,
+            'dropped': self.dropped_frames
+        }
+
+    def release(self):
+        """Stop the capture thread and release the source"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        self.cap.release()
+
+
+def create_capture(source=0, mode=None, width=None, height=None, fps=None, loop=False):
+    """Open a source for an app loop
+
+    Live and realtime sources are read on a background thread so the loop always
+    gets the newest frame. Fast replays are read synchronously so every frame is
+    processed exactly once and runs are deterministic.
+    """
+    frame_source = open_source(source, mode=mode or REPLAY_REALTIME, width=width,
+                               height=height, fps=fps, loop=loop)
+    if not frame_source.live and frame_source.mode == REPLAY_FAST:
+        return frame_source
+    return ThreadedCapture(frame_source).start()
+
+
+def main():
+    import argparse
+    from frame_sources import add_source_arguments
+
+    parser = add_source_arguments(argparse.ArgumentParser(description="Threaded capture demo"))
+    args = parser.parse_args()
+
+    cap = ThreadedCapture(args.source, mode=args.replay).start()
+    start = time.time()
+    while cap.isOpened():
+        ret, frame, timestamp, dropped = cap.read_latest()
+        if not ret:
+            break
+        # Simulate a slow consumer
+        time.sleep(0.03)
+
+    elapsed = time.time() - start
+    stats = cap.get_stats()
+    cap.release()
+    print(f"Captured: {stats['captured']}, delivered: {stats['delivered']}, "
+          f"dropped: {stats['dropped']} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
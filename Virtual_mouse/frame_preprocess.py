@@ -0,0 +1,144 @@
+import time
+import cv2
+import numpy as np
+from frame_buffers import FramePool, write_into
+
+
+def mirror_to_rgb(frame, dst=None):
+    """Mirrored RGB copy of a BGR frame in one pass
+
+    Reversing a row of BGR pixels byte by byte both mirrors it and swaps B
+    and R, so one cv2.flip over the (height, width * 3) byte view gives the
+    same pixels as cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB).
+    """
+    h, w = frame.shape[:2]
+    if dst is None:
+        dst = np.empty_like(frame)
+    rows = dst.reshape(h, w * 3)
+    write_into(rows, cv2.flip(frame.reshape(h, w * 3), 1, dst=rows))
+    return dst
+
+
+def parse_inference_size(text):
+    """Parse "WxH", "W" (height from the frame's aspect ratio) or "full" into (width, height or None)"""
+    if text is None or str(text).lower() in ("", "full", "0"):
+        return None
+    width, _, height = str(text).lower().partition("x")
+    return int(width), int(height) if height else None
+
+
+def inference_frame_size(inference_size, frame_shape):
+    """(width, height) to run inference at, or None to use the frame as it is"""
+    if inference_size is None:
+        return None
+    h, w = frame_shape[:2]
+    width, height = inference_size
+    if height is None:
+        height = max(int(round(h * width / w)), 1)
+    if width >= w and height >= h:
+        return None  # Never upscale
+    return width, height
+
+
+class FramePreprocessor:
+    """Mirror + BGR->RGB in one pass, with the mirrored BGR frame made on demand
+
+    inference_input() returns the mirrored RGB frame MediaPipe needs,
+    downscaled to inference_size if one is set. Landmarks come back
+    normalized, so they map onto the full-resolution frame unchanged.
+    display_frame() returns the full-resolution mirrored BGR frame for drawing
+    and imshow; it is converted back from the RGB frame when that is full size
+    (cheaper than a second flip) and only costs anything when a window is
+    actually shown.
+    """
+
+    def __init__(self, buffers=None, inference_size=None):
+        self.buffers = buffers if buffers is not None else FramePool()
+        self.inference_size = inference_size    # (width, height or None), None = full resolution
+        self.frame_shape = None
+        self.scaled_size = None
+        self.frame = None
+        self.rgb = None
+
+    def inference_shape(self, frame_shape):
+        """Shape of the inference_input() of a frame of this shape"""
+        if frame_shape != self.frame_shape:
+            self.frame_shape = frame_shape
+            self.scaled_size = inference_frame_size(self.inference_size, frame_shape)
+        if self.scaled_size is None:
+            return frame_shape
+        width, height = self.scaled_size
+        return (height, width) + tuple(frame_shape[2:])
+
+    def inference_input(self, frame, dst=None):
+        """Mirrored RGB frame at the inference resolution (reused buffer, or written into dst)"""
+        self.inference_shape(frame.shape)
+        self.frame = frame
+
+        if self.scaled_size is not None:
+            width, height = self.scaled_size
+            small = self.buffers.get("inference", (height, width, 3), frame.dtype)
+            write_into(small, cv2.resize(frame, (width, height), dst=small, interpolation=cv2.INTER_AREA))
+            frame = small
+        if dst is None:
+            dst = self.buffers.get("rgb", frame.shape, frame.dtype)
+        self.rgb = mirror_to_rgb(frame, dst)
+        return self.rgb
+
+    def display_frame(self):
+        """Full-resolution mirrored BGR frame of the last inference_input() call (reused buffer)"""
+        if self.scaled_size is not None:
+            return self.buffers.flip("mirror", self.frame, 1)
+        return self.buffers.cvt_color("mirror", self.rgb, cv2.COLOR_RGB2BGR)
+
+
+def add_inference_arguments(parser):
+    """Add the --inference-size option to an argparse parser"""
+    parser.add_argument("--inference-size", type=parse_inference_size, default=None,
+                        help="run hand detection on a downscaled frame, e.g. 640x360 or 640 "
+                             "(keeps the aspect ratio); display and hit-testing stay at full resolution")
+    return parser
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Separate flip + cvtColor vs the fused preprocessing stage")
+    parser.add_argument("--frames", type=int, default=300, help="frames per resolution")
+    args = parser.parse_args()
+
+    def timed(function, frames):
+        start = time.perf_counter()
+        for frame in frames:
+            function(frame)
+        return (time.perf_counter() - start) * 1000.0 / len(frames)
+
+    rng = np.random.default_rng(0)
+    print(f"{'resolution':<11}{'flip+cvt':>10}{'fused':>8}{'+display':>10}  identical")
+    for width, height in [(640, 480), (1280, 720), (1920, 1080)]:
+        frames = [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(4)]
+        frames = [frames[i % len(frames)] for i in range(args.frames)]
+        pool = FramePool()
+        preprocess = FramePreprocessor()
+
+        def separate(frame):
+            mirrored = pool.flip("mirror", frame, 1)
+            return mirrored, pool.cvt_color("rgb", mirrored, cv2.COLOR_BGR2RGB)
+
+        def with_display(frame):
+            preprocess.inference_input(frame)
+            return preprocess.display_frame()
+
+        identical = True
+        for frame in frames[:4]:
+            mirrored, rgb = separate(frame)
+            identical &= np.array_equal(preprocess.inference_input(frame), rgb)
+            identical &= np.array_equal(preprocess.display_frame(), mirrored)
+
+        print(f"{f'{width}x{height}':<11}{timed(separate, frames):>8.2f}ms"
+              f"{timed(preprocess.inference_input, frames):>6.2f}ms"
+              f"{timed(with_display, frames):>8.2f}ms  {identical}")
+
+
+if __name__ == "__main__":
+    main()
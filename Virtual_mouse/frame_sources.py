@@ -0,0 +1,263 @@
+import cv2
+import numpy as np
+import os
+import time
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# Replay modes for recorded sources
+REPLAY_REALTIME = "realtime"  # Pace frames at the recorded frame rate
+REPLAY_FAST = "fast"          # Hand out frames as fast as they are requested
+
+
+class FrameSource:
+    """Base class for all frame sources (VideoCapture-compatible interface)"""
+
+    live = False
+
+    def __init__(self, fps=30.0, mode=REPLAY_FAST):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.mode = mode
+        self.frame_index = 0
+        self.start_time = None
+        self.opened = True
+
+    def grab_frame(self):
+        """Return (ret, frame) for the next frame; implemented by subclasses"""
+        raise NotImplementedError
+
+    def read_timestamped(self):
+        """Return (ret, frame, timestamp) for the next frame"""
+        if not self.opened:
+            return False, None, 0.0
+
+        ret, frame = self.grab_frame()
+        if not ret:
+            if not self.live:
+                # End of a recorded source
+                self.opened = False
+            return False, None, 0.0
+
+        if self.live:
+            return True, frame, time.time()
+
+        # Recorded sources use media time so replays are deterministic
+        media_time = self.frame_index / self.fps
+        self.frame_index += 1
+
+        if self.mode == REPLAY_REALTIME:
+            if self.start_time is None:
+                self.start_time = time.time()
+            delay = self.start_time + media_time - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        return True, frame, media_time
+
+    def read(self):
+        ret, frame, _ = self.read_timestamped()
+        return ret, frame
+
+    def isOpened(self):
+        return self.opened
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.opened = False
+
+
+class CameraSource(FrameSource):
+    """Live webcam source"""
+
+    live = True
+
+    def __init__(self, index=0, width=None, height=None, fps=None):
+        super().__init__(fps=fps)
+        self.cap = cv2.VideoCapture(index)
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        # Keep the driver queue short so we never read stale frames
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def grab_frame(self):
+        return self.cap.read()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """Recorded video file source"""
+
+    def __init__(self, path, mode=REPLAY_FAST, loop=False):
+        self.cap = cv2.VideoCapture(path)
+        super().__init__(fps=self.cap.get(cv2.CAP_PROP_FPS), mode=mode)
+        self.loop = loop
+
+    def grab_frame(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def isOpened(self):
+        return self.opened and self.cap.isOpened()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Image file or directory of images, replayed in name order"""
+
+    def __init__(self, path, fps=30.0, mode=REPLAY_FAST, loop=False):
+        super().__init__(fps=fps, mode=mode)
+        if os.path.isdir(path):
+            self.paths = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            self.paths = [path]
+        self.loop = loop
+        self.index = 0
+        self.opened = len(self.paths) > 0
+
+        # Frame size comes from the first image
+        self.width, self.height = 0, 0
+        if self.opened:
+            first = cv2.imread(self.paths[0])
+            if first is not None:
+                self.height, self.width = first.shape[:2]
+
+    def grab_frame(self):
+        if self.index >= len(self.paths):
+            if not self.loop:
+                return False, None
+            self.index = 0
+
+        frame = cv2.imread(self.paths[self.index])
+        self.index += 1
+        return frame is not None, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.paths)
+        return super().get(prop)
+
+
+class SyntheticSource(FrameSource):
+    """Deterministic generated frames (a moving blob over a noisy background)"""
+
+    def __init__(self, width=640, height=480, num_frames=300, fps=30.0, mode=REPLAY_FAST, seed=0):
+        super().__init__(fps=fps, mode=mode)
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(40, 80, size=(height, width, 3), dtype=np.uint8)
+
+    def grab_frame(self):
+        if self.num_frames and self.frame_index >= self.num_frames:
+            return False, None
+
+        frame = self.background.copy()
+        t = self.frame_index / self.fps
+        cx = int(self.width * (0.5 + 0.35 * np.sin(t * 1.3)))
+        cy = int(self.height * (0.5 + 0.35 * np.cos(t * 0.9)))
+        cv2.circle(frame, (cx, cy), max(self.height // 10, 4), (140, 170, 220), -1)
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.num_frames
+        return super().get(prop)
+
+
+def open_source(spec=0, mode=REPLAY_FAST, width=None, height=None, fps=None, loop=False):
+    """Create a frame source from a camera index, path or "synthetic[:WxH]" spec"""
+    if isinstance(spec, FrameSource):
+        return spec
+
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec), width=width, height=height, fps=fps)
+
+    if spec.startswith("synthetic"):
+        size = spec.partition(":")[2]
+        if size:
+            width, height = (int(v) for v in size.lower().split("x"))
+        return SyntheticSource(width=width or 640, height=height or 480,
+                               fps=fps or 30.0, mode=mode)
+
+    if os.path.isdir(spec) or spec.lower().endswith(IMAGE_EXTENSIONS):
+        return ImageDirectorySource(spec, fps=fps or 30.0, mode=mode, loop=loop)
+
+    return VideoFileSource(spec, mode=mode, loop=loop)
+
+
+def add_source_arguments(parser):
+    """Add the common --source/--replay options to an argparse parser"""
+    parser.add_argument("--source", default="0",
+                        help="camera index, video file, image directory or synthetic[:WxH]")
+    parser.add_argument("--replay", choices=[REPLAY_REALTIME, REPLAY_FAST], default=REPLAY_REALTIME,
+                        help="replay recorded sources at their frame rate or as fast as possible")
+    return parser
+
+
+def main():
+    import argparse
+
+    parser = add_source_arguments(argparse.ArgumentParser(description="Read every frame from a source"))
+    args = parser.parse_args()
+
+    source = open_source(args.source, mode=args.replay)
+    frames = 0
+    start = time.time()
+    while source.isOpened():
+        ret, frame, timestamp = source.read_timestamped()
+        if not ret:
+            break
+        frames += 1
+
+    elapsed = time.time() - start
+    source.release()
+    print(f"Read {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.1f} FPS)")
+
+
+if __name__ == "__main__":
+    main()
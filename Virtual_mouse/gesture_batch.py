@@ -0,0 +1,238 @@
+import numpy as np
+import time
+from hand_landmarks import (
+    THUMB_IP, THUMB_TIP, INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_TIP,
+    MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_TIP, RING_FINGER_MCP,
+    RING_FINGER_PIP, RING_FINGER_TIP, PINKY_MCP, PINKY_PIP, PINKY_TIP, landmark_distance
+)
+from gestures import MOUSE_GESTURE_THRESHOLD
+
+# Label tables: batch classifiers return indices into these tuples (0 is always "none")
+MOUSE_GESTURES = ("none", "double_click", "left_click", "right_click", "scroll", "cursor", "fist")
+OVERLAY_GESTURES = ("none", "pinch", "point", "fist")
+ADVANCED_GESTURES = ("none", "select", "right_click", "point", "scroll", "drag", "open", "fist")
+
+# Landmarks read by the mouse rules: thumb/index/middle/ring/pinky tips, then finger MCPs
+MOUSE_POINTS = [THUMB_TIP, INDEX_FINGER_TIP, MIDDLE_FINGER_TIP, RING_FINGER_TIP, PINKY_TIP,
+                INDEX_FINGER_MCP, MIDDLE_FINGER_MCP, RING_FINGER_MCP, PINKY_MCP]
+
+
+def _apply_mask(labels, valid):
+    if valid is not None:
+        labels[~np.asarray(valid, dtype=bool)] = 0
+    return labels
+
+
+def classify_mouse_batch(landmarks, frame_width, frame_height,
+                         gesture_threshold=MOUSE_GESTURE_THRESHOLD, valid=None):
+    """Vectorized gestures.detect_gesture over (..., 21, 3) landmarks
+
+    Returns (labels, distances): uint8 indices into MOUSE_GESTURES and a (..., 3)
+    float64 array of thumb-index, thumb-middle and thumb-pinky pixel distances.
+    """
+    points = landmarks[..., MOUSE_POINTS, :2].astype(np.float64)
+    points *= np.array([frame_width, frame_height], dtype=np.float64)
+    pixels = points.astype(np.int32)
+    x = pixels[..., 0]
+    y = pixels[..., 1]
+
+    # Same horizontal-only distance as gestures.pinch_distance
+    thumb_x = x[..., 0]
+    thumb_index_dist = np.abs(x[..., 1] - thumb_x).astype(np.float64)
+    thumb_middle_dist = np.abs(x[..., 2] - thumb_x).astype(np.float64)
+    thumb_pinky_dist = np.abs(x[..., 4] - thumb_x).astype(np.float64)
+    index_middle_dist = np.abs(x[..., 2] - x[..., 1])
+
+    # Index, middle, ring, pinky tips above their MCP joints
+    up = y[..., 1:5] < y[..., 5:9]
+    index_up, middle_up, ring_up, pinky_up = up[..., 0], up[..., 1], up[..., 2], up[..., 3]
+
+    conditions = [
+        (thumb_pinky_dist < gesture_threshold) & (thumb_pinky_dist > 10),
+        (thumb_index_dist < gesture_threshold) & (thumb_index_dist > 10),
+        (thumb_middle_dist < gesture_threshold) & (thumb_middle_dist > 10),
+        index_up & middle_up & ~ring_up & ~pinky_up & (index_middle_dist < 50),
+        index_up & ~middle_up & ~ring_up & ~pinky_up,
+        ~up.any(axis=-1)
+    ]
+    labels = np.select(conditions, [1, 2, 3, 4, 5, 6], default=0).astype(np.uint8)
+    distances = np.stack([thumb_index_dist, thumb_middle_dist, thumb_pinky_dist], axis=-1)
+    return _apply_mask(labels, valid), distances
+
+
+def classify_overlay_batch(landmarks, valid=None):
+    """Vectorized gestures.detect_hand_gesture over (..., 21, 3) landmarks
+
+    Returns (labels, distances): uint8 indices into OVERLAY_GESTURES and a (..., 3)
+    array of normalized thumb-index, thumb-middle and thumb-pinky distances.
+    """
+    y = landmarks[..., 1]
+    index_extended = (y[..., INDEX_FINGER_TIP] < y[..., INDEX_FINGER_PIP]) & \
+                     (y[..., INDEX_FINGER_TIP] < y[..., INDEX_FINGER_MCP])
+    middle_extended = y[..., MIDDLE_FINGER_TIP] < y[..., MIDDLE_FINGER_PIP]
+    ring_extended = y[..., RING_FINGER_TIP] < y[..., RING_FINGER_PIP]
+    pinky_extended = y[..., PINKY_TIP] < y[..., PINKY_PIP]
+
+    thumb_index_dist = landmark_distance(landmarks, THUMB_TIP, INDEX_FINGER_TIP)
+    others_closed = ~middle_extended & ~ring_extended & ~pinky_extended
+
+    conditions = [
+        thumb_index_dist < 0.06,
+        index_extended & others_closed,
+        ~index_extended & others_closed
+    ]
+    labels = np.select(conditions, [1, 2, 3], default=0).astype(np.uint8)
+    distances = np.stack([thumb_index_dist,
+                          landmark_distance(landmarks, THUMB_TIP, MIDDLE_FINGER_TIP),
+                          landmark_distance(landmarks, THUMB_TIP, PINKY_TIP)], axis=-1)
+    return _apply_mask(labels, valid), distances
+
+
+def classify_advanced_batch(landmarks, valid=None):
+    """Vectorized gestures.classify_advanced_gesture over (..., 21, 3) landmarks
+
+    Returns (labels, distances) like classify_overlay_batch. Labels are per frame;
+    use stabilize_labels to apply the keyboard's stability filter.
+    """
+    x = landmarks[..., 0]
+    y = landmarks[..., 1]
+    thumb = x[..., THUMB_TIP] != x[..., THUMB_IP]
+    index = y[..., INDEX_FINGER_TIP] < y[..., INDEX_FINGER_PIP]
+    middle = y[..., MIDDLE_FINGER_TIP] < y[..., MIDDLE_FINGER_PIP]
+    ring = y[..., RING_FINGER_TIP] < y[..., RING_FINGER_PIP]
+    pinky = y[..., PINKY_TIP] < y[..., PINKY_PIP]
+    total = thumb.astype(np.int8) + index + middle + ring + pinky
+
+    thumb_index_dist = landmark_distance(landmarks, THUMB_TIP, INDEX_FINGER_TIP)
+    thumb_middle_dist = landmark_distance(landmarks, THUMB_TIP, MIDDLE_FINGER_TIP)
+
+    conditions = [
+        thumb_index_dist < 0.04,
+        thumb_middle_dist < 0.04,
+        (total == 1) & index,
+        (total == 2) & index & middle,
+        (total == 3) & index & middle & ring,
+        total == 5,
+        total == 0
+    ]
+    labels = np.select(conditions, [1, 2, 3, 4, 5, 6, 7], default=0).astype(np.uint8)
+    distances = np.stack([thumb_index_dist, thumb_middle_dist,
+                          landmark_distance(landmarks, THUMB_TIP, PINKY_TIP)], axis=-1)
+    return _apply_mask(labels, valid), distances
+
+
+def stabilize_labels(labels, stability_threshold=5):
+    """Vectorized GestureStabilizer over a 1-D label sequence for one hand"""
+    labels = np.asarray(labels)
+    # A label becomes stable once the history is full and its last (up to 3) entries agree
+    window = min(stability_threshold, 3)
+    stable = np.ones(len(labels), dtype=bool)
+    for lag in range(1, window):
+        stable[lag:] &= labels[lag:] == labels[:-lag]
+    stable[:stability_threshold - 1] = False
+
+    # Carry the last stable label forward ("none" before the first one)
+    last = np.where(stable, np.arange(len(labels)), -1)
+    np.maximum.accumulate(last, out=last)
+    return np.where(last >= 0, labels[np.maximum(last, 0)], 0).astype(labels.dtype)
+
+
+def label_names(labels, table):
+    """Convert label indices back to gesture names"""
+    return np.asarray(table, dtype=object)[labels]
+
+
+def _scalar_labels(trace, frame_width, frame_height):
+    """Reference labels from the per-frame rules in gestures.py"""
+    from gestures import detect_gesture, detect_hand_gesture, classify_advanced_gesture, GestureStabilizer
+    from hand_landmarks import landmarks_to_pixels
+
+    mouse = np.zeros(len(trace), dtype=np.uint8)
+    overlay = np.zeros((len(trace), trace.landmarks.shape[1]), dtype=np.uint8)
+    advanced = np.zeros(len(trace), dtype=np.uint8)
+    stabilizer = GestureStabilizer(stability_threshold=5)
+    for index in range(len(trace)):
+        num_hands = int(trace.num_hands[index])
+        for slot in range(num_hands):
+            landmarks = np.array(trace.landmarks[index, slot])
+            overlay[index, slot] = OVERLAY_GESTURES.index(detect_hand_gesture(landmarks))
+        if num_hands:
+            landmarks = np.array(trace.landmarks[index, 0])
+            positions = landmarks_to_pixels(landmarks, frame_width, frame_height)
+            mouse[index] = MOUSE_GESTURES.index(detect_gesture(positions)[0])
+            advanced[index] = ADVANCED_GESTURES.index(
+                stabilizer.update(classify_advanced_gesture(landmarks)))
+    return mouse, overlay, advanced
+
+
+def _coverage(labels, names):
+    """Per-label counts, so an equivalence check shows which rules it actually exercised"""
+    counts = np.bincount(labels.ravel(), minlength=len(names))
+    summary = ", ".join(f"{name}: {count}" for name, count in zip(names, counts))
+    missing = [name for name, count in zip(names, counts) if count == 0]
+    return summary + (f" (never produced: {', '.join(missing)})" if missing else "")
+
+
+def main():
+    import argparse
+    import os
+    import tempfile
+    from landmark_trace import LandmarkTrace, generate_synthetic_trace
+
+    parser = argparse.ArgumentParser(description="Batch gesture classification benchmark")
+    parser.add_argument("trace", nargs="?", default=None,
+                        help="landmark trace (a synthetic one is generated if omitted)")
+    parser.add_argument("--frames", type=int, default=20000,
+                        help="frames in the generated synthetic trace")
+    parser.add_argument("--sweep", action="store_true",
+                        help="sweep the mouse pinch threshold and print label counts")
+    args = parser.parse_args()
+
+    path = args.trace
+    if path is None:
+        # Outside the working tree (the trace is memory-mapped, so it is not deleted afterwards)
+        path = os.path.join(tempfile.gettempdir(), "synthetic_trace.vmt")
+        generate_synthetic_trace(path, num_frames=args.frames)
+    trace = LandmarkTrace(path)
+    frame_width = trace.frame_width or 1280
+    frame_height = trace.frame_height or 720
+    mask = trace.hand_mask()
+    first_hand = trace.landmarks[:, 0]
+    present = mask[:, 0]
+
+    # Scalar reference
+    start = time.perf_counter()
+    ref_mouse, ref_overlay, ref_advanced = _scalar_labels(trace, frame_width, frame_height)
+    scalar_time = time.perf_counter() - start
+
+    # Batched
+    start = time.perf_counter()
+    mouse, _ = classify_mouse_batch(first_hand, frame_width, frame_height, valid=present)
+    overlay, _ = classify_overlay_batch(trace.landmarks, valid=mask)
+    raw_advanced, _ = classify_advanced_batch(first_hand[present])
+    advanced = np.zeros(len(trace), dtype=np.uint8)
+    advanced[present] = stabilize_labels(raw_advanced)
+    batch_time = time.perf_counter() - start
+
+    matches = (np.array_equal(mouse, ref_mouse) and np.array_equal(overlay, ref_overlay)
+               and np.array_equal(advanced, ref_advanced))
+    print(f"Frames: {len(trace)}")
+    print(f"Scalar rules:  {scalar_time:.3f}s ({len(trace) / max(scalar_time, 1e-9):,.0f} frames/s)")
+    print(f"Batch engine:  {batch_time:.4f}s ({len(trace) / max(batch_time, 1e-9):,.0f} frames/s)")
+    print(f"Speedup: {scalar_time / max(batch_time, 1e-9):.0f}x, labels identical: {matches}")
+    print(f"  mouse:    {_coverage(ref_mouse[present], MOUSE_GESTURES)}")
+    print(f"  overlay:  {_coverage(ref_overlay[mask], OVERLAY_GESTURES)}")
+    print(f"  advanced: {_coverage(ref_advanced[present], ADVANCED_GESTURES)}")
+
+    if args.sweep:
+        print("Mouse pinch threshold sweep:")
+        for threshold in range(15, 45, 5):
+            labels, _ = classify_mouse_batch(first_hand, frame_width, frame_height,
+                                             gesture_threshold=threshold, valid=present)
+            counts = np.bincount(labels[present], minlength=len(MOUSE_GESTURES))
+            summary = ", ".join(f"{name}: {count}" for name, count in zip(MOUSE_GESTURES, counts))
+            print(f"  {threshold}px -> {summary}")
+
+
+if __name__ == "__main__":
+    main()
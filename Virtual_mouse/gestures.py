@@ -0,0 +1,168 @@
+import math
+import numpy as np
+from hand_landmarks import (
+    THUMB_IP, THUMB_TIP, INDEX_FINGER_MCP, INDEX_FINGER_PIP, INDEX_FINGER_TIP,
+    MIDDLE_FINGER_MCP, MIDDLE_FINGER_PIP, MIDDLE_FINGER_TIP, RING_FINGER_MCP,
+    RING_FINGER_PIP, RING_FINGER_TIP, PINKY_MCP, PINKY_PIP, PINKY_TIP
+)
+
+# The per-frame rules below pull the hand array into Python floats with a single
+# tolist() call; indexing NumPy scalars one at a time costs more than the rules.
+
+# Virtual mouse pinch threshold in pixels
+MOUSE_GESTURE_THRESHOLD = 25
+
+# Finger (index, middle, ring, pinky) tip and base joints
+FINGER_TIPS = [INDEX_FINGER_TIP, MIDDLE_FINGER_TIP, RING_FINGER_TIP, PINKY_TIP]
+FINGER_MCPS = [INDEX_FINGER_MCP, MIDDLE_FINGER_MCP, RING_FINGER_MCP, PINKY_MCP]
+FINGER_PIPS = [INDEX_FINGER_PIP, MIDDLE_FINGER_PIP, RING_FINGER_PIP, PINKY_PIP]
+
+
+# ----- Virtual mouse (virtual_mouse.py) -----
+
+def pinch_distance(positions, a, b):
+    """Pixel distance between landmarks a and b used by the virtual mouse
+
+    The original calculate_distance had (p2[1] - p2[1]) as its y term, so the mouse
+    has always measured horizontal separation only. That is kept so the tuned
+    thresholds keep behaving exactly as before.
+    """
+    return np.abs(positions[..., b, 0] - positions[..., a, 0]).astype(np.float64)
+
+
+def detect_gesture(positions, gesture_threshold=MOUSE_GESTURE_THRESHOLD):
+    """Detect various hand gestures from (21, 2) pixel positions"""
+    pts = positions.tolist()
+    thumb_x = pts[THUMB_TIP][0]
+
+    # Calculate distances (see pinch_distance)
+    thumb_index_dist = float(abs(pts[INDEX_FINGER_TIP][0] - thumb_x))
+    thumb_middle_dist = float(abs(pts[MIDDLE_FINGER_TIP][0] - thumb_x))
+    thumb_pinky_dist = float(abs(pts[PINKY_TIP][0] - thumb_x))
+    index_middle_dist = float(abs(pts[MIDDLE_FINGER_TIP][0] - pts[INDEX_FINGER_TIP][0]))
+
+    # Check which fingers are up (index, middle, ring, pinky)
+    fingers_up = [pts[tip][1] < pts[mcp][1] for tip, mcp in zip(FINGER_TIPS, FINGER_MCPS)]
+
+    gesture = "none"
+
+    # More restrictive gesture detection - only trigger on actual pinches
+    if thumb_pinky_dist < gesture_threshold and thumb_pinky_dist > 10:  # Avoid false positives
+        gesture = "double_click"
+    elif thumb_index_dist < gesture_threshold and thumb_index_dist > 10:
+        gesture = "left_click"
+    elif thumb_middle_dist < gesture_threshold and thumb_middle_dist > 10:
+        gesture = "right_click"
+    elif fingers_up == [True, True, False, False] and index_middle_dist < 50:
+        gesture = "scroll"
+    elif fingers_up == [True, False, False, False]:
+        gesture = "cursor"
+    elif sum(fingers_up) == 0:
+        gesture = "fist"
+
+    return gesture, thumb_index_dist, thumb_middle_dist, thumb_pinky_dist
+
+
+# ----- Keyboards -----
+
+def _distance(p1, p2):
+    """2D distance between two [x, y, z] points"""
+    return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+
+
+# ----- Multi-hand overlay keyboard (multi_hand_virtual_keyboard.py) -----
+
+def detect_hand_gesture(landmarks):
+    """Detect gesture for a single (21, 3) hand with improved accuracy"""
+    if landmarks is None:
+        return "none"
+
+    pts = landmarks.tolist()
+    index_tip = pts[INDEX_FINGER_TIP]
+
+    # Calculate relative positions (more robust than absolute y coordinates)
+    index_extended = (index_tip[1] < pts[INDEX_FINGER_PIP][1]) and (index_tip[1] < pts[INDEX_FINGER_MCP][1])
+    middle_extended = pts[MIDDLE_FINGER_TIP][1] < pts[MIDDLE_FINGER_PIP][1]
+    ring_extended = pts[RING_FINGER_TIP][1] < pts[RING_FINGER_PIP][1]
+    pinky_extended = pts[PINKY_TIP][1] < pts[PINKY_PIP][1]
+
+    # Calculate thumb-index distance for pinch
+    thumb_index_dist = _distance(pts[THUMB_TIP], index_tip)
+
+    # Gesture classification with improved logic
+    if thumb_index_dist < 0.06:  # Slightly more lenient pinch threshold
+        return "pinch"
+    elif index_extended and not middle_extended and not ring_extended and not pinky_extended:
+        # Only index finger extended - POINT gesture
+        return "point"
+    elif not index_extended and not middle_extended and not ring_extended and not pinky_extended:
+        # All fingers closed - FIST gesture
+        return "fist"
+    else:
+        return "none"
+
+
+# ----- Advanced gesture keyboard (virtual_keyboard.py) -----
+
+def classify_advanced_gesture(landmarks):
+    """Classify a single (21, 3) hand for the advanced keyboard (no stability filtering)"""
+    if landmarks is None:
+        return "none"
+
+    pts = landmarks.tolist()
+    thumb_tip = pts[THUMB_TIP]
+
+    # Calculate finger states (thumb, index, middle, ring, pinky)
+    # Thumb: the original left/right test (tip.x > ip.x -> tip.x > ip.x, else
+    # tip.x < ip.x) counts the thumb as up whenever tip and IP are not level
+    fingers = [thumb_tip[0] != pts[THUMB_IP][0]]
+
+    # Other fingers
+    fingers += [pts[tip][1] < pts[pip][1] for tip, pip in zip(FINGER_TIPS, FINGER_PIPS)]
+
+    # Calculate distances for pinch detection
+    thumb_index_dist = _distance(thumb_tip, pts[INDEX_FINGER_TIP])
+    thumb_middle_dist = _distance(thumb_tip, pts[MIDDLE_FINGER_TIP])
+
+    # Gesture classification
+    total_fingers = sum(fingers)
+
+    if thumb_index_dist < 0.04:  # Tight pinch
+        return "select"
+    elif thumb_middle_dist < 0.04:  # Middle finger pinch
+        return "right_click"
+    elif total_fingers == 1 and fingers[1]:  # Index finger only
+        return "point"
+    elif total_fingers == 2 and fingers[1] and fingers[2]:  # Peace sign
+        return "scroll"
+    elif total_fingers == 3 and fingers[1] and fingers[2] and fingers[3]:
+        return "drag"
+    elif total_fingers == 5:  # Open hand
+        return "open"
+    elif total_fingers == 0:  # Fist
+        return "fist"
+    return "none"
+
+
+class GestureStabilizer:
+    """Only report a gesture once it has been seen on the last few frames"""
+
+    def __init__(self, stability_threshold=5):
+        self.gesture_history = []
+        self.gesture_stability_threshold = stability_threshold
+        self.last_stable_gesture = "none"
+
+    def update(self, gesture):
+        """Add a frame's gesture and return the current stable gesture"""
+        # Add to history for stability
+        self.gesture_history.append(gesture)
+        if len(self.gesture_history) > self.gesture_stability_threshold:
+            self.gesture_history.pop(0)
+
+        # Check for stable gesture
+        if len(self.gesture_history) >= self.gesture_stability_threshold:
+            if all(g == gesture for g in self.gesture_history[-3:]):
+                self.last_stable_gesture = gesture
+                return gesture
+
+        return self.last_stable_gesture
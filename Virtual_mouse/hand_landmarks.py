@@ -0,0 +1,76 @@
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+INDEX_FINGER_MCP = 5
+INDEX_FINGER_PIP = 6
+INDEX_FINGER_TIP = 8
+MIDDLE_FINGER_MCP = 9
+MIDDLE_FINGER_PIP = 10
+MIDDLE_FINGER_TIP = 12
+RING_FINGER_MCP = 13
+RING_FINGER_PIP = 14
+RING_FINGER_TIP = 16
+PINKY_MCP = 17
+PINKY_PIP = 18
+PINKY_TIP = 20
+
+FINGERTIPS = [THUMB_TIP, INDEX_FINGER_TIP, MIDDLE_FINGER_TIP, RING_FINGER_TIP, PINKY_TIP]
+
+
+def landmarks_to_array(hand_landmarks, out=None):
+    """Convert a MediaPipe landmark list into a (21, 3) float32 array"""
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, 3), dtype=np.float32)
+
+    # Replayed traces already carry their landmarks as an array
+    array = getattr(hand_landmarks, 'array', None)
+    if array is not None:
+        out[:] = array
+        return out
+
+    points = getattr(hand_landmarks, 'landmark', hand_landmarks)
+    out[:] = [(lm.x, lm.y, lm.z) for lm in points]
+    return out
+
+
+class LandmarkBuffer:
+    """Preallocated (max_hands, 21, 3) landmark storage reused every frame"""
+
+    def __init__(self, max_hands=2):
+        self.max_hands = max_hands
+        self.landmarks = np.zeros((max_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.count = 0
+
+    def update(self, results):
+        """Convert a Hands.process() result and return one (21, 3) view per hand"""
+        hands = results.multi_hand_landmarks or []
+        self.count = min(len(hands), self.max_hands)
+        for index in range(self.count):
+            landmarks_to_array(hands[index], out=self.landmarks[index])
+        return [self.landmarks[index] for index in range(self.count)]
+
+
+def landmarks_to_pixels(landmarks, frame_width, frame_height):
+    """Convert normalized landmarks (..., 21, 3) to integer pixel coordinates (..., 21, 2)"""
+    # float64 keeps the truncation identical to int(landmark.x * frame_width)
+    scale = np.array([frame_width, frame_height], dtype=np.float64)
+    return (landmarks[..., :2].astype(np.float64) * scale).astype(np.int32)
+
+
+def landmark_distance(landmarks, a, b):
+    """2D distance between landmarks a and b for one hand or a batch of hands"""
+    delta = landmarks[..., a, :2].astype(np.float64) - landmarks[..., b, :2]
+    return np.sqrt(delta[..., 0]**2 + delta[..., 1]**2)
+
+
+def pointing_position(landmarks, frame_shape, offset_x=0.0, offset_y=0.0):
+    """Index fingertip position in pixels as an (x, y) tuple"""
+    h, w = frame_shape[:2]
+    x = float(landmarks[INDEX_FINGER_TIP, 0]) + offset_x
+    y = float(landmarks[INDEX_FINGER_TIP, 1]) + offset_y
+    return (int(x * w), int(y * h))
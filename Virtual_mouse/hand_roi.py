@@ -0,0 +1,259 @@
+import time
+import numpy as np
+from frame_buffers import FramePool
+from hand_landmarks import WRIST, landmarks_to_array
+from landmark_trace import ReplayHandedness, ReplayHandLandmarks, ReplayResults
+
+ROI_PADDING = 0.5          # Crop side = hand extent * (1 + 2 * padding)
+ROI_MIN_SIZE = 0.2         # Smallest crop side, as a fraction of the shorter frame side
+ROI_MARGIN = 0.1           # Keep the crop while the hand stays this far inside it
+REDETECT_INTERVAL = 15     # Full-frame search for missing hands every N frames
+DUPLICATE_DISTANCE = 0.05  # Two crops whose wrists are closer than this track the same hand
+
+
+def roi_box(landmarks, frame_shape, padding=ROI_PADDING, min_size=ROI_MIN_SIZE):
+    """Square crop (x0, y0, x1, y1) in pixels, end exclusive, around normalized landmarks"""
+    h, w = frame_shape[:2]
+    xs = landmarks[:, 0] * w
+    ys = landmarks[:, 1] * h
+    cx = (float(xs.min()) + float(xs.max())) / 2
+    cy = (float(ys.min()) + float(ys.max())) / 2
+    extent = max(float(xs.max() - xs.min()), float(ys.max() - ys.min()))
+    side = int(min(max(extent * (1 + 2 * padding), min_size * min(w, h)), w, h))
+
+    # Shift the box inside the frame rather than shrinking it
+    x0 = int(min(max(cx - side / 2, 0), w - side))
+    y0 = int(min(max(cy - side / 2, 0), h - side))
+    return x0, y0, x0 + side, y0 + side
+
+
+def box_contains(box, inner, margin=ROI_MARGIN):
+    """True if inner lies inside box shrunk by margin (fraction of the box side) on every side"""
+    x0, y0, x1, y1 = box
+    pad_x = (x1 - x0) * margin
+    pad_y = (y1 - y0) * margin
+    return (inner[0] >= x0 + pad_x and inner[1] >= y0 + pad_y and
+            inner[2] <= x1 - pad_x and inner[3] <= y1 - pad_y)
+
+
+class HandRoi:
+    """One tracked hand: its crop box and the detector that runs on the crop"""
+
+    def __init__(self, hands):
+        self.hands = hands
+        self.box = None
+        self.landmarks = None
+
+
+class RoiTracker:
+    """Run hand detection on crops around the hands of the previous frame
+
+    After a full-frame detection every hand gets a padded square crop of its
+    own (one detector per hand, so MediaPipe's tracking state stays with its
+    hand), and the following frames only run hands.process on those crops.
+    Landmarks are mapped back to the full frame, so results look exactly like
+    a full-frame Hands.process() result. A crop is kept while the hand stays
+    well inside it, which keeps its size (and buffer) stable. When a hand is
+    lost, leaves its crop or two crops lock onto the same hand, the frame is
+    detected again on the full image; while fewer than max_hands are tracked
+    the full frame is also searched every redetect_interval frames to pick up
+    a new hand.
+    """
+
+    def __init__(self, create_hands, max_hands=2, buffers=None, padding=ROI_PADDING,
+                 min_size=ROI_MIN_SIZE, redetect_interval=REDETECT_INTERVAL):
+        self.create_hands = create_hands    # () -> single-hand detector for one crop
+        self.max_hands = max_hands
+        self.buffers = buffers if buffers is not None else FramePool()
+        self.padding = padding
+        self.min_size = min_size
+        self.redetect_interval = redetect_interval
+        self.slots = []                     # HandRoi per hand, detectors are kept across losses
+        self.rois = []                      # Currently tracked
+        self.frames_since_detect = 0
+
+        # Counters
+        self.frames = 0
+        self.crop_frames = 0
+        self.detect_frames = 0
+        self.losses = 0
+        self.crop_pixels = 0
+        self.frame_pixels = 0
+        self.crop_time = 0.0
+        self.detect_time = 0.0
+
+    def reset(self):
+        """Forget the tracked hands; the next frame is detected on the full image"""
+        self.rois = []
+
+    def process(self, image, detector):
+        """Hands.process() on the crops, or on the full image with detector"""
+        self.frames += 1
+        self.frame_pixels += image.shape[0] * image.shape[1]
+        if self.rois and (len(self.rois) >= self.max_hands or
+                          self.frames_since_detect < self.redetect_interval):
+            start = time.perf_counter()
+            results = self._track(image)
+            self.crop_time += time.perf_counter() - start
+            if results is not None:
+                self.crop_frames += 1
+                self.frames_since_detect += 1
+                return results
+            self.losses += 1
+        return self._detect(image, detector)
+
+    def _detect(self, image, detector):
+        start = time.perf_counter()
+        results = detector.process(image)
+        self.detect_frames += 1
+        self.frames_since_detect = 0
+        self.rois = []
+        for hand_landmarks in (results.multi_hand_landmarks or [])[:self.max_hands]:
+            if len(self.slots) <= len(self.rois):
+                self.slots.append(HandRoi(self.create_hands()))
+            roi = self.slots[len(self.rois)]
+            roi.landmarks = landmarks_to_array(hand_landmarks)
+            roi.box = roi_box(roi.landmarks, image.shape, self.padding, self.min_size)
+            self.rois.append(roi)
+        self.detect_time += time.perf_counter() - start
+        return results
+
+    def _track(self, image):
+        # Landmarks of every tracked hand, or None to fall back to a full-frame detection
+        h, w = image.shape[:2]
+        hand_landmarks = []
+        handedness = []
+        for slot, roi in enumerate(self.rois):
+            x0, y0, x1, y1 = roi.box
+            crop = self.buffers.copy(f"roi{slot}", image[y0:y1, x0:x1])
+            self.crop_pixels += crop.shape[0] * crop.shape[1]
+            results = roi.hands.process(crop)
+            if not results.multi_hand_landmarks:
+                return None
+            local = landmarks_to_array(results.multi_hand_landmarks[0])
+
+            # The hand left the crop (unless that crop edge is the frame edge)
+            lo = local[:, :2].min(axis=0)
+            hi = local[:, :2].max(axis=0)
+            if ((lo[0] < 0 and x0 > 0) or (lo[1] < 0 and y0 > 0) or
+                    (hi[0] > 1 and x1 < w) or (hi[1] > 1 and y1 < h)):
+                return None
+
+            # Crop-normalized -> frame-normalized (z is relative to the wrist, scaled like x)
+            local[:, 0] = (x0 + local[:, 0] * (x1 - x0)) / w
+            local[:, 1] = (y0 + local[:, 1] * (y1 - y0)) / h
+            local[:, 2] *= (x1 - x0) / w
+            roi.landmarks = local
+            hand_landmarks.append(ReplayHandLandmarks(local))
+
+            classification = results.multi_handedness[0].classification[0] if results.multi_handedness else None
+            handedness.append(ReplayHandedness(classification.label if classification else "Right",
+                                               classification.score if classification else 0.0))
+
+        # Two crops that drifted onto the same hand
+        for a in range(len(self.rois)):
+            for b in range(a + 1, len(self.rois)):
+                wrist_a = self.rois[a].landmarks[WRIST, :2]
+                wrist_b = self.rois[b].landmarks[WRIST, :2]
+                if np.linalg.norm(wrist_a - wrist_b) < DUPLICATE_DISTANCE:
+                    return None
+
+        # Follow the hands, but keep a crop (and its size) while the hand stays well inside it
+        for roi in self.rois:
+            box = roi_box(roi.landmarks, image.shape, self.padding, self.min_size)
+            hand = roi_box(roi.landmarks, image.shape, 0.0, 0.0)
+            side, new_side = roi.box[2] - roi.box[0], box[2] - box[0]
+            if not box_contains(roi.box, hand) or not 0.8 <= new_side / side <= 1.25:
+                roi.box = box
+        return ReplayResults(hand_landmarks, handedness)
+
+    def get_stats(self):
+        """Return the share of frames run on crops, their pixel share and the time per frame"""
+        return {
+            'frames': self.frames,
+            'crop_frames': self.crop_frames,
+            'detect_frames': self.detect_frames,
+            'losses': self.losses,
+            'crop_share': self.crop_frames / max(self.frames, 1),
+            'pixel_share': self.crop_pixels / max(self.frame_pixels, 1),
+            'crop_ms': self.crop_time * 1000.0 / max(self.crop_frames, 1),
+            'detect_ms': self.detect_time * 1000.0 / max(self.detect_frames, 1),
+            'ms_per_frame': (self.crop_time + self.detect_time) * 1000.0 / max(self.frames, 1)
+        }
+
+    def print_report(self, title="Hand ROI"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['frames']} frames, {stats['crop_share']:.0%} on crops "
+              f"({stats['crop_ms']:.2f} ms, {stats['pixel_share']:.0%} of the pixels), "
+              f"{stats['detect_frames']} full-frame ({stats['detect_ms']:.2f} ms), "
+              f"{stats['losses']} lost, {stats['ms_per_frame']:.2f} ms/frame")
+
+
+def add_roi_arguments(parser):
+    """Add the --hand-roi option to an argparse parser"""
+    parser.add_argument("--hand-roi", action="store_true",
+                        help="run hand detection on a crop around each tracked hand "
+                             "(full-frame detection when a hand is lost)")
+    return parser
+
+
+def main():
+    import argparse
+    import mediapipe as mp
+    from frame_sources import REPLAY_FAST, add_source_arguments, open_source
+    from frame_preprocess import FramePreprocessor
+    from inference_report import compare_landmarks
+
+    parser = add_source_arguments(argparse.ArgumentParser(
+        description="Full-frame hand detection vs ROI crops on a recorded session"))
+    parser.set_defaults(replay=REPLAY_FAST)
+    parser.add_argument("--frames", type=int, default=0, help="frames to replay (0 = all)")
+    parser.add_argument("--max-hands", type=int, default=2)
+    parser.add_argument("--padding", type=float, default=ROI_PADDING)
+    args = parser.parse_args()
+
+    def create_hands(max_hands):
+        return mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=max_hands,
+                                        min_detection_confidence=0.7, min_tracking_confidence=0.5)
+
+    runs = {}
+    for name in ("full", "roi"):
+        cap = open_source(args.source, mode=args.replay)
+        preprocess = FramePreprocessor()
+        detector = create_hands(args.max_hands)
+        tracker = RoiTracker(lambda: create_hands(1), args.max_hands, padding=args.padding)
+        landmarks, times = [], []
+        frame_shape = None
+        while cap.isOpened() and (not args.frames or len(landmarks) < args.frames):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_shape = frame.shape
+            rgb = preprocess.inference_input(frame)
+            start = time.perf_counter()
+            results = detector.process(rgb) if name == "full" else tracker.process(rgb, detector)
+            times.append(time.perf_counter() - start)
+            detected = results.multi_hand_landmarks or []
+            landmarks.append(np.array([landmarks_to_array(hand) for hand in detected],
+                                      dtype=np.float32).reshape(-1, 21, 3))
+        cap.release()
+        runs[name] = (landmarks, frame_shape, np.array(times), tracker)
+
+    reference, frame_shape, full_times, _ = runs["full"]
+    landmarks, _, roi_times, tracker = runs["roi"]
+    if frame_shape is None:
+        print(f"No frames read from {args.source}")
+        return
+
+    report = compare_landmarks(reference, landmarks, frame_shape)
+    print(f"{len(reference)} frames of {frame_shape[1]}x{frame_shape[0]} from {args.source}")
+    print(f"full frame {full_times.mean() * 1000.0:.2f} ms/frame, ROI {roi_times.mean() * 1000.0:.2f} ms/frame "
+          f"({1 - roi_times.mean() / full_times.mean():.0%} less), p95 {np.percentile(full_times, 95) * 1000.0:.2f} "
+          f"vs {np.percentile(roi_times, 95) * 1000.0:.2f} ms")
+    print(f"landmark error vs full frame: mean {report['mean_px']:.1f}px, p95 {report['p95_px']:.1f}px, "
+          f"index tip {report['index_tip_px']:.1f}px, same hand count on {report['agreement']:.0%} of frames")
+    tracker.print_report("  ROI tracker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from landmark_trace import FRAME_DTYPE, ReplayResults, pack_results, unpack_results
+
+WORKER_POLL = 1.0   # Seconds between checks that the workers are still alive while waiting
+
+
+def create_mediapipe_hands(max_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.5):
+    """MediaPipe Hands for a worker process (imported there, so the parent never loads a model for it)"""
+    import mediapipe as mp
+    return mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=max_hands,
+                                    min_detection_confidence=min_detection_confidence,
+                                    min_tracking_confidence=min_tracking_confidence)
+
+
+class SimulatedHands:
+    """Detector stand-in that does a fixed amount of OpenCV work and finds no hands
+
+    Used by the benchmark to measure the pool's own overhead where MediaPipe is
+    not installed. The work is calibrated once to take about ms on an idle
+    core, so it scales with free cores like real inference does.
+    """
+
+    def __init__(self, ms=20.0):
+        self.image = np.random.default_rng(0).integers(0, 256, size=(240, 320, 3), dtype=np.uint8)
+        cv2.GaussianBlur(self.image, (15, 15), 0)
+        start = time.perf_counter()
+        for _ in range(5):
+            cv2.GaussianBlur(self.image, (15, 15), 0)
+        blur_ms = (time.perf_counter() - start) * 1000.0 / 5
+        self.repeats = max(int(round(ms / blur_ms)), 1)
+
+    def process(self, image):
+        for _ in range(self.repeats):
+            cv2.GaussianBlur(self.image, (15, 15), 0)
+        return ReplayResults()
+
+    def close(self):
+        pass
+
+
+def create_simulated_hands(ms=20.0):
+    return SimulatedHands(ms)
+
+
+def _worker_loop(ring_name, shape, slots, tasks, results, create_hands, hands_args):
+    # Runs in the worker process: frames are read straight from the shared ring
+    ring = shared_memory.SharedMemory(name=ring_name)
+    frames = np.ndarray((slots,) + shape, dtype=np.uint8, buffer=ring.buf)
+    hands = create_hands(*hands_args)
+    record = np.zeros(1, dtype=FRAME_DTYPE)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            frame_id, slot = task
+            start = time.perf_counter()
+            pack_results(hands.process(frames[slot]), record[0])
+            results.put((frame_id, slot, record.tobytes(), time.perf_counter() - start))
+    finally:
+        hands.close()
+        del frames
+        ring.close()
+
+
+class InferencePool:
+    """Hand inference in worker processes fed through a shared-memory frame ring
+
+    Frames are written into slots of one shared-memory array (acquire() hands
+    out the slot itself, so preprocessing can write straight into it) and
+    workers read them in place; only the frame id and slot go through the task
+    queue, and only a compact landmark record (the landmark trace's
+    FRAME_DTYPE) comes back. A slot is reused once its result is back.
+    Workers finish frames in any order; get() returns them in frame order.
+    Each worker has its own detector and sees every workers-th frame, so
+    MediaPipe's tracking between frames is less effective than in one process.
+    Workers are spawned (not forked), which is safe from threaded apps and
+    works the same on Windows.
+    """
+
+    def __init__(self, workers=2, slots=None, create_hands=create_mediapipe_hands, hands_args=(2,),
+                 start_method="spawn"):
+        self.workers = workers
+        self.slots = slots or 2 * workers     # One being processed and one queued per worker
+        self.create_hands = create_hands
+        self.hands_args = tuple(hands_args)
+        self.context = multiprocessing.get_context(start_method)
+        self.shape = None
+        self.ring = None
+        self.frames = None
+        self.tasks = None
+        self.results = None
+        self.processes = []
+        self.free = []
+        self.acquired = None                  # (frame_id, slot) between acquire() and commit()
+        self.contexts = {}                    # frame_id -> caller data returned with the result
+        self.done = {}                        # frame_id -> results that arrived ahead of their turn
+        self.next_id = 0
+        self.next_result = 0
+
+        # Counters
+        self.completed = 0
+        self.out_of_order = 0
+        self.worker_time = 0.0
+        self.slot_wait_time = 0.0
+        self.result_wait_time = 0.0
+
+    @property
+    def in_flight(self):
+        return self.next_id - self.next_result
+
+    def start(self, shape):
+        """Allocate the ring for frames of this (height, width, 3) shape and start the workers"""
+        self.shape = tuple(shape)
+        self.ring = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * self.slots)
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=self.ring.buf)
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.free = list(range(self.slots))
+        for index in range(self.workers):
+            process = self.context.Process(target=_worker_loop, name=f"inference-{index}", daemon=True,
+                                           args=(self.ring.name, self.shape, self.slots, self.tasks,
+                                                 self.results, self.create_hands, self.hands_args))
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def acquire(self, shape):
+        """Return the ring slot to write the next frame into (waits while every slot is busy)"""
+        if self.ring is None:
+            self.start(shape)
+        elif tuple(shape) != self.shape:
+            raise ValueError(f"frame shape {tuple(shape)} does not match the ring's {self.shape}")
+        start = time.perf_counter()
+        while not self.free:
+            self._collect()
+        self.slot_wait_time += time.perf_counter() - start
+        slot = self.free.pop()
+        self.acquired = (self.next_id, slot)
+        return self.frames[slot]
+
+    def commit(self, context=None):
+        """Queue the frame written into the acquired slot; context comes back with its result"""
+        frame_id, slot = self.acquired
+        self.acquired = None
+        self.contexts[frame_id] = context
+        self.next_id += 1
+        self.tasks.put((frame_id, slot))
+        return frame_id
+
+    def submit(self, image, context=None):
+        """Copy a frame into the ring and queue it"""
+        np.copyto(self.acquire(image.shape), image)
+        return self.commit(context)
+
+    def _collect(self, block=True):
+        # Take one result off the queue; False if none was waiting
+        while True:
+            try:
+                frame_id, slot, data, seconds = self.results.get(block=block, timeout=WORKER_POLL)
+                break
+            except queue.Empty:
+                if not block:
+                    return False
+                if any(not process.is_alive() for process in self.processes):
+                    raise RuntimeError("an inference worker exited; see its error above")
+        self.free.append(slot)
+        self.done[frame_id] = unpack_results(np.frombuffer(data, dtype=FRAME_DTYPE)[0])
+        self.completed += 1
+        self.worker_time += seconds
+        if frame_id != self.next_result:
+            self.out_of_order += 1
+        return True
+
+    def ready(self):
+        """True if the next result in frame order is available"""
+        while self.next_result not in self.done and self._collect(block=False):
+            pass
+        return self.next_result in self.done
+
+    def get(self):
+        """Return (frame_id, results, context) for the oldest frame, waiting for it if needed"""
+        if self.in_flight == 0:
+            raise RuntimeError("no frames in flight")
+        start = time.perf_counter()
+        while self.next_result not in self.done:
+            self._collect()
+        self.result_wait_time += time.perf_counter() - start
+        frame_id = self.next_result
+        self.next_result += 1
+        return frame_id, self.done.pop(frame_id), self.contexts.pop(frame_id)
+
+    def close(self):
+        """Stop the workers and free the ring (results still in flight are dropped)"""
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        if self.ring is not None:
+            self.frames = None
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_stats(self):
+        """Return completed frames, worker time per frame and how long the caller waited"""
+        return {
+            'workers': self.workers,
+            'slots': self.slots,
+            'completed': self.completed,
+            'out_of_order': self.out_of_order,
+            'worker_ms': self.worker_time * 1000.0 / max(self.completed, 1),
+            'slot_wait_ms': self.slot_wait_time * 1000.0 / max(self.next_id, 1),
+            'result_wait_ms': self.result_wait_time * 1000.0 / max(self.next_result, 1)
+        }
+
+    def print_report(self, title="Inference pool"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['workers']} workers, {stats['slots']} ring slots, {stats['completed']} frames "
+              f"({stats['out_of_order']} finished out of order), {stats['worker_ms']:.2f} ms/frame in the workers, "
+              f"waited {stats['slot_wait_ms']:.2f} ms/frame for a slot and "
+              f"{stats['result_wait_ms']:.2f} ms/frame for results")
+
+
+def add_pool_arguments(parser):
+    """Add the --inference-workers option to an argparse parser"""
+    parser.add_argument("--inference-workers", type=int, default=0,
+                        help="run hand detection in this many worker processes (0 = in the app); "
+                             "landmarks arrive a few frames late")
+    return parser
+
+
+def main():
+    import argparse
+    import os
+    from frame_sources import REPLAY_FAST, add_source_arguments, open_source
+    from frame_preprocess import mirror_to_rgb
+
+    parser = add_source_arguments(argparse.ArgumentParser(
+        description="Hand inference throughput in-process and with 1, 2 and 4 worker processes"))
+    parser.set_defaults(replay=REPLAY_FAST)
+    parser.add_argument("--frames", type=int, default=300, help="frames to replay")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--max-hands", type=int, default=2)
+    parser.add_argument("--simulate-ms", type=float, default=0.0,
+                        help="replace MediaPipe with this much busy work per frame (0 = real MediaPipe)")
+    args = parser.parse_args()
+
+    # Decode and convert up front so only inference is measured
+    source = open_source(args.source, mode=args.replay)
+    frames = []
+    while source.isOpened() and len(frames) < args.frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(mirror_to_rgb(frame))
+    source.release()
+    if not frames:
+        print(f"No frames read from {args.source}")
+        return
+
+    if args.simulate_ms > 0:
+        create_hands, hands_args = create_simulated_hands, (args.simulate_ms,)
+    else:
+        create_hands, hands_args = create_mediapipe_hands, (args.max_hands,)
+
+    hands = create_hands(*hands_args)
+    start = time.perf_counter()
+    reference = [hands.process(frame) for frame in frames]
+    in_process = len(frames) / (time.perf_counter() - start)
+    hands.close()
+
+    shape = frames[0].shape
+    print(f"{len(frames)} frames of {shape[1]}x{shape[0]} from {args.source} on {os.cpu_count()} CPUs, "
+          f"{'simulated %.0f ms' % args.simulate_ms if args.simulate_ms > 0 else 'MediaPipe'} inference")
+    print(f"in-process {in_process:.1f} FPS")
+    for workers in args.workers:
+        with InferencePool(workers, create_hands=create_hands, hands_args=hands_args) as pool:
+            pool.start(shape)
+            # Warm up: workers start and load their models before the clock starts
+            pool.submit(frames[0])
+            pool.get()
+            pool.completed = pool.out_of_order = 0
+            pool.worker_time = 0.0
+
+            order = []
+            hands_found = 0
+            start = time.perf_counter()
+            for index, frame in enumerate(frames):
+                pool.submit(frame, index)
+                while pool.ready():
+                    _, results, context = pool.get()
+                    order.append(context)
+                    hands_found += len(results.multi_hand_landmarks or [])
+            while pool.in_flight:
+                _, results, context = pool.get()
+                order.append(context)
+                hands_found += len(results.multi_hand_landmarks or [])
+            elapsed = time.perf_counter() - start
+
+            expected = sum(len(results.multi_hand_landmarks or []) for results in reference)
+            fps = len(frames) / elapsed
+            print(f"{workers} worker{'s' if workers > 1 else ' '} {fps:6.1f} FPS ({fps / in_process:.2f}x), "
+                  f"in order: {order == list(range(len(frames)))}, hands {hands_found} (in-process {expected})")
+            pool.print_report("  pool")
+
+
+if __name__ == "__main__":
+    main()
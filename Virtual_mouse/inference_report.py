@@ -0,0 +1,117 @@
+import time
+import numpy as np
+from frame_sources import REPLAY_FAST, add_source_arguments, open_source
+from frame_preprocess import FramePreprocessor, parse_inference_size
+from hand_landmarks import FINGERTIPS, INDEX_FINGER_TIP, WRIST, landmarks_to_array
+
+
+def run_inference(source, inference_size, max_frames=0, max_hands=2, replay=REPLAY_FAST):
+    """Run MediaPipe Hands over a source at one inference size
+
+    Returns the per-frame landmark arrays ((hands, 21, 3), normalized), the
+    frame shape and the per-frame preprocessing and inference times.
+    """
+    import mediapipe as mp
+
+    hands = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=max_hands,
+                                     min_detection_confidence=0.7, min_tracking_confidence=0.5)
+    cap = open_source(source, mode=replay)
+    preprocess = FramePreprocessor(inference_size=inference_size)
+    landmarks, preprocess_times, inference_times = [], [], []
+    frame_shape = None
+    while cap.isOpened() and (not max_frames or len(landmarks) < max_frames):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_shape = frame.shape
+
+        start = time.perf_counter()
+        rgb = preprocess.inference_input(frame)
+        preprocess_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = hands.process(rgb)
+        inference_times.append(time.perf_counter() - start)
+
+        detected = results.multi_hand_landmarks or []
+        landmarks.append(np.array([landmarks_to_array(hand) for hand in detected],
+                                  dtype=np.float32).reshape(-1, 21, 3))
+    cap.release()
+    hands.close()
+    return landmarks, frame_shape, np.array(preprocess_times), np.array(inference_times)
+
+
+def compare_landmarks(reference, landmarks, frame_shape):
+    """Landmark error in full-resolution pixels against the reference run
+
+    Hands are paired by nearest wrist. Returns detection agreement, mean and
+    95th percentile error over all landmarks and the mean fingertip and index
+    fingertip errors.
+    """
+    h, w = frame_shape[:2]
+    scale = np.array([w, h], dtype=np.float64)
+    errors = []
+    agreed = 0
+    for ref_hands, hands in zip(reference, landmarks):
+        agreed += len(ref_hands) == len(hands)
+        available = list(range(len(hands)))
+        for ref in ref_hands:
+            if not available:
+                break
+            wrists = [np.linalg.norm((hands[i, WRIST, :2] - ref[WRIST, :2]) * scale) for i in available]
+            match = available.pop(int(np.argmin(wrists)))
+            errors.append(np.linalg.norm((hands[match, :, :2] - ref[:, :2]) * scale, axis=1))
+
+    if not errors:
+        return {'agreement': agreed / max(len(reference), 1), 'matched': 0,
+                'mean_px': float('nan'), 'p95_px': float('nan'),
+                'fingertip_px': float('nan'), 'index_tip_px': float('nan')}
+    errors = np.array(errors)
+    return {
+        'agreement': agreed / max(len(reference), 1),
+        'matched': len(errors),
+        'mean_px': float(errors.mean()),
+        'p95_px': float(np.percentile(errors, 95)),
+        'fingertip_px': float(errors[:, FINGERTIPS].mean()),
+        'index_tip_px': float(errors[:, INDEX_FINGER_TIP].mean())
+    }
+
+
+def main():
+    import argparse
+
+    parser = add_source_arguments(argparse.ArgumentParser(
+        description="Hand landmark accuracy vs throughput at several inference resolutions"))
+    parser.set_defaults(replay=REPLAY_FAST)
+    parser.add_argument("--sizes", nargs="+", default=["full", "960", "640", "480", "320"],
+                        help="inference sizes (WxH, W or full); the first one is the reference")
+    parser.add_argument("--frames", type=int, default=0, help="frames to replay (0 = all)")
+    parser.add_argument("--max-hands", type=int, default=2)
+    args = parser.parse_args()
+
+    runs = []
+    for size in args.sizes:
+        runs.append((size, run_inference(args.source, parse_inference_size(size), args.frames,
+                                         args.max_hands, args.replay)))
+    reference = runs[0][1][0]
+    frame_shape = runs[0][1][1]
+    if frame_shape is None:
+        print(f"No frames read from {args.source}")
+        return
+
+    print(f"{len(reference)} frames of {frame_shape[1]}x{frame_shape[0]} from {args.source}, "
+          f"reference: {args.sizes[0]}")
+    print(f"{'size':<10}{'prep':>8}{'infer':>9}{'FPS':>7}{'detected':>10}{'agree':>7}"
+          f"{'mean':>8}{'p95':>8}{'tips':>8}{'index':>8}")
+    for size, (landmarks, _, preprocess_times, inference_times) in runs:
+        report = compare_landmarks(reference, landmarks, frame_shape)
+        detected = np.mean([len(hands) > 0 for hands in landmarks]) if landmarks else 0.0
+        total = preprocess_times.mean() + inference_times.mean()
+        print(f"{size:<10}{preprocess_times.mean() * 1000.0:>6.2f}ms{inference_times.mean() * 1000.0:>7.2f}ms"
+              f"{1.0 / total:>7.1f}{detected:>10.0%}{report['agreement']:>7.0%}"
+              f"{report['mean_px']:>6.1f}px{report['p95_px']:>6.1f}px"
+              f"{report['fingertip_px']:>6.1f}px{report['index_tip_px']:>6.1f}px")
+
+
+if __name__ == "__main__":
+    main()
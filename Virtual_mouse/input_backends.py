@@ -0,0 +1,416 @@
+import threading
+import time
+from collections import deque
+
+# Special keys the apps send by name
+SPECIAL_KEYS = ('space', 'backspace', 'enter')
+
+
+class InputBackend:
+    """Base class for mouse/keyboard injection backends
+
+    Buttons are 'left', 'right' or 'middle'; keys are single characters or
+    one of SPECIAL_KEYS.
+    """
+
+    name = "base"
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def click(self, button='left', count=1):
+        for _ in range(count):
+            self.mouse_down(button)
+            self.mouse_up(button)
+
+    def mouse_down(self, button='left'):
+        raise NotImplementedError
+
+    def mouse_up(self, button='left'):
+        raise NotImplementedError
+
+    def scroll(self, amount):
+        raise NotImplementedError
+
+    def press_key(self, key):
+        raise NotImplementedError
+
+    def type_text(self, text):
+        for char in text:
+            self.press_key(char)
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    """pyautogui without its per-call PAUSE sleep"""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        pyautogui.FAILSAFE = False
+        self.pyautogui = pyautogui
+
+    def move_to(self, x, y):
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, button='left', count=1):
+        self.pyautogui.click(button=button, clicks=count, _pause=False)
+
+    def mouse_down(self, button='left'):
+        self.pyautogui.mouseDown(button=button, _pause=False)
+
+    def mouse_up(self, button='left'):
+        self.pyautogui.mouseUp(button=button, _pause=False)
+
+    def scroll(self, amount):
+        self.pyautogui.scroll(amount, _pause=False)
+
+    def press_key(self, key):
+        self.pyautogui.press(key, _pause=False)
+
+    def type_text(self, text):
+        self.pyautogui.write(text, _pause=False)
+
+
+class PynputBackend(InputBackend):
+    """pynput mouse and keyboard controllers"""
+
+    name = "pynput"
+
+    def __init__(self):
+        from pynput import keyboard, mouse
+        self.mouse = mouse.Controller()
+        self.keyboard = keyboard.Controller()
+        self.buttons = {'left': mouse.Button.left, 'right': mouse.Button.right,
+                        'middle': mouse.Button.middle}
+        self.special_keys = {name: getattr(keyboard.Key, name) for name in SPECIAL_KEYS}
+
+    def move_to(self, x, y):
+        self.mouse.position = (int(x), int(y))
+
+    def click(self, button='left', count=1):
+        self.mouse.click(self.buttons[button], count)
+
+    def mouse_down(self, button='left'):
+        self.mouse.press(self.buttons[button])
+
+    def mouse_up(self, button='left'):
+        self.mouse.release(self.buttons[button])
+
+    def scroll(self, amount):
+        self.mouse.scroll(0, amount)
+
+    def press_key(self, key):
+        key = self.special_keys.get(key, key)
+        self.keyboard.press(key)
+        self.keyboard.release(key)
+
+    def type_text(self, text):
+        self.keyboard.type(text)
+
+
+class UInputBackend(InputBackend):
+    """Linux kernel uinput device via python-evdev (no X server round trips)
+
+    Needs write access to /dev/uinput. The pointer is an absolute device
+    spanning screen_size, so moves land on the same pixels as the other
+    backends.
+    """
+
+    name = "uinput"
+
+    # Characters reachable without a keymap lookup: (key name, needs shift)
+    PUNCTUATION = {
+        ' ': ('KEY_SPACE', False), '.': ('KEY_DOT', False), ',': ('KEY_COMMA', False),
+        '-': ('KEY_MINUS', False), '=': ('KEY_EQUAL', False), '/': ('KEY_SLASH', False),
+        ';': ('KEY_SEMICOLON', False), "'": ('KEY_APOSTROPHE', False),
+        '!': ('KEY_1', True), '?': ('KEY_SLASH', True), ':': ('KEY_SEMICOLON', True)
+    }
+
+    def __init__(self, screen_size=(1920, 1080)):
+        from evdev import AbsInfo, UInput, ecodes
+        self.ecodes = ecodes
+        self.special_keys = {'space': ecodes.KEY_SPACE, 'backspace': ecodes.KEY_BACKSPACE,
+                             'enter': ecodes.KEY_ENTER}
+        self.buttons = {'left': ecodes.BTN_LEFT, 'right': ecodes.BTN_RIGHT,
+                        'middle': ecodes.BTN_MIDDLE}
+
+        keys = [code for name, code in ecodes.ecodes.items()
+                if name.startswith('KEY_') and code < ecodes.KEY_MAX]
+        width, height = screen_size
+        capabilities = {
+            ecodes.EV_KEY: sorted(set(keys + list(self.buttons.values()))),
+            ecodes.EV_ABS: [(ecodes.ABS_X, AbsInfo(0, 0, width - 1, 0, 0, 0)),
+                            (ecodes.ABS_Y, AbsInfo(0, 0, height - 1, 0, 0, 0))],
+            ecodes.EV_REL: [ecodes.REL_WHEEL]
+        }
+        self.device = UInput(capabilities, name="virtual-mouse-gestures")
+
+    def _key_code(self, char):
+        """(keycode, needs shift) for a character, or None if it cannot be typed"""
+        if char in self.special_keys:
+            return self.special_keys[char], False
+        if char in self.PUNCTUATION:
+            name, shift = self.PUNCTUATION[char]
+            return getattr(self.ecodes, name), shift
+        if len(char) == 1 and char.isalnum() and char.isascii():
+            return getattr(self.ecodes, 'KEY_' + char.upper()), char.isupper()
+        return None
+
+    def move_to(self, x, y):
+        self.device.write(self.ecodes.EV_ABS, self.ecodes.ABS_X, int(x))
+        self.device.write(self.ecodes.EV_ABS, self.ecodes.ABS_Y, int(y))
+        self.device.syn()
+
+    def mouse_down(self, button='left'):
+        self.device.write(self.ecodes.EV_KEY, self.buttons[button], 1)
+        self.device.syn()
+
+    def mouse_up(self, button='left'):
+        self.device.write(self.ecodes.EV_KEY, self.buttons[button], 0)
+        self.device.syn()
+
+    def scroll(self, amount):
+        self.device.write(self.ecodes.EV_REL, self.ecodes.REL_WHEEL, int(amount))
+        self.device.syn()
+
+    def press_key(self, key):
+        code = self._key_code(key)
+        if code is None:
+            print(f"uinput: cannot type {key!r}")
+            return
+        code, shift = code
+        if shift:
+            self.device.write(self.ecodes.EV_KEY, self.ecodes.KEY_LEFTSHIFT, 1)
+        self.device.write(self.ecodes.EV_KEY, code, 1)
+        self.device.write(self.ecodes.EV_KEY, code, 0)
+        if shift:
+            self.device.write(self.ecodes.EV_KEY, self.ecodes.KEY_LEFTSHIFT, 0)
+        self.device.syn()
+
+    def close(self):
+        self.device.close()
+
+
+class RecorderBackend(InputBackend):
+    """Record calls in memory instead of touching the real mouse and keyboard"""
+
+    name = "recorder"
+
+    def __init__(self):
+        self.events = []
+        self.position = None
+
+    def move_to(self, x, y):
+        self.position = (x, y)
+        self.events.append(('move_to', (x, y)))
+
+    def click(self, button='left', count=1):
+        self.events.append(('click', (button, count)))
+
+    def mouse_down(self, button='left'):
+        self.events.append(('mouse_down', (button,)))
+
+    def mouse_up(self, button='left'):
+        self.events.append(('mouse_up', (button,)))
+
+    def scroll(self, amount):
+        self.events.append(('scroll', (amount,)))
+
+    def press_key(self, key):
+        self.events.append(('press_key', (key,)))
+
+    def type_text(self, text):
+        self.events.append(('type_text', (text,)))
+
+    def count(self, method):
+        return sum(1 for name, _ in self.events if name == method)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "pynput": PynputBackend,
+    "uinput": UInputBackend,
+    "recorder": RecorderBackend
+}
+
+
+def create_backend(name, screen_size=None):
+    """Create an input backend by name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if name == "uinput" and screen_size is not None:
+        return UInputBackend(screen_size)
+    return BACKENDS[name]()
+
+
+class InputWorker:
+    """Run backend calls on a worker thread so the vision loop never blocks
+
+    Calls are queued in order. A move queued right behind another move replaces
+    it, since only the newest cursor position matters; clicks and key presses
+    are never dropped and still happen at the position queued before them.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.events = deque()
+        self.condition = threading.Condition()
+
+        # Counters
+        self.queued = 0
+        self.coalesced = 0
+        self.call_stats = {}     # method -> [count, total seconds, max seconds]
+        self.queue_delay = 0.0   # Total time events waited before running
+        self.executed = 0
+
+        self.running = True
+        self.busy = False
+        self.thread = threading.Thread(target=self.worker_loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, method, *args):
+        """Queue a backend call"""
+        with self.condition:
+            self.queued += 1
+            if method == 'move_to' and self.events and self.events[-1][0] == 'move_to':
+                self.events[-1] = (method, args, time.perf_counter())
+                self.coalesced += 1
+            else:
+                self.events.append((method, args, time.perf_counter()))
+            self.condition.notify()
+
+    def move_to(self, x, y):
+        self.submit('move_to', x, y)
+
+    def click(self, button='left', count=1):
+        self.submit('click', button, count)
+
+    def mouse_down(self, button='left'):
+        self.submit('mouse_down', button)
+
+    def mouse_up(self, button='left'):
+        self.submit('mouse_up', button)
+
+    def scroll(self, amount):
+        self.submit('scroll', amount)
+
+    def press_key(self, key):
+        self.submit('press_key', key)
+
+    def type_text(self, text):
+        self.submit('type_text', text)
+
+    def worker_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.events or not self.running)
+                if not self.events:
+                    break
+                method, args, queued_at = self.events.popleft()
+                self.busy = True
+
+            start = time.perf_counter()
+            try:
+                getattr(self.backend, method)(*args)
+            except Exception as e:
+                print(f"Input backend {self.backend.name} failed on {method}: {e}")
+            end = time.perf_counter()
+
+            with self.condition:
+                stats = self.call_stats.setdefault(method, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += end - start
+                stats[2] = max(stats[2], end - start)
+                self.queue_delay += start - queued_at
+                self.executed += 1
+                self.busy = False
+                self.condition.notify_all()
+
+    def flush(self, timeout=1.0):
+        """Wait until every queued call has run"""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.events and not self.busy, timeout)
+
+    def report(self):
+        """Return per-method call latency (ms) and queue counters"""
+        with self.condition:
+            calls = {method: {'count': count, 'mean_ms': total * 1000.0 / max(count, 1),
+                              'max_ms': worst * 1000.0}
+                     for method, (count, total, worst) in self.call_stats.items()}
+            return {
+                'backend': self.backend.name,
+                'queued': self.queued,
+                'coalesced': self.coalesced,
+                'executed': self.executed,
+                'queue_delay_ms': self.queue_delay * 1000.0 / max(self.executed, 1),
+                'calls': calls
+            }
+
+    def print_report(self, title="Input"):
+        report = self.report()
+        print(f"{title} ({report['backend']}): {report['queued']} queued, "
+              f"{report['coalesced']} moves coalesced, "
+              f"{report['queue_delay_ms']:.2f} ms mean queue delay")
+        for method, stats in report['calls'].items():
+            print(f"  {method}: {stats['count']} calls, {stats['mean_ms']:.3f} ms mean, "
+                  f"{stats['max_ms']:.3f} ms max")
+
+    def close(self):
+        """Run the remaining calls, stop the worker and close the backend"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=2.0)
+        self.backend.close()
+
+
+def add_input_arguments(parser, default="pyautogui"):
+    """Add the --input-backend option to an argparse parser"""
+    parser.add_argument("--input-backend", default=default, choices=list(BACKENDS),
+                        help="how mouse/keyboard events are injected")
+    return parser
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Input backend latency benchmark")
+    parser.add_argument("--backend", nargs="+", default=["recorder"], choices=list(BACKENDS),
+                        help="backends to measure (real backends move the mouse!)")
+    parser.add_argument("--moves", type=int, default=500)
+    args = parser.parse_args()
+
+    for name in args.backend:
+        try:
+            backend = create_backend(name)
+        except Exception as e:
+            print(f"{name}: unavailable ({e})")
+            continue
+
+        # Direct, synchronous calls
+        start = time.perf_counter()
+        for index in range(args.moves):
+            backend.move_to(200 + index % 400, 300)
+        sync_ms = (time.perf_counter() - start) * 1000.0 / args.moves
+
+        # Through the worker: the caller only pays for queueing
+        worker = InputWorker(backend)
+        start = time.perf_counter()
+        for index in range(args.moves):
+            worker.move_to(200 + index % 400, 300)
+            if index % 100 == 0:
+                worker.scroll(0)
+        caller_ms = (time.perf_counter() - start) * 1000.0 / args.moves
+        worker.flush(timeout=10.0)
+        worker.close()
+
+        print(f"{name}: {sync_ms:.4f} ms per direct move, {caller_ms:.4f} ms per queued move")
+        worker.print_report("  worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from overlay_renderer import draw_item, item_bounds, op_bounds
+
+SPRITE_CACHE_SIZE = 256
+
+
+def _shift_op(op, dx, dy):
+    if op[0] == 'rect':
+        kind, (x0, y0), (x1, y1), color, thickness = op
+        return kind, (x0 + dx, y0 + dy), (x1 + dx, y1 + dy), color, thickness
+    kind, text, (x, y), font, font_scale, color, thickness = op
+    return kind, text, (x + dx, y + dy), font, font_scale, color, thickness
+
+
+def _mask_op(op):
+    # Same shape drawn in full white, to record which pixels the op touches
+    if op[0] == 'rect':
+        return op[:3] + ((255, 255, 255),) + op[4:]
+    return op[:5] + ((255, 255, 255),) + op[6:]
+
+
+def _self_contained(item):
+    # putText blends its edges with what is underneath, so a tile is only exact
+    # when every text op lies on a filled rectangle of the same item
+    fills = []
+    for op in item:
+        if op[0] == 'rect':
+            if op[4] < 0:
+                (x0, y0), (x1, y1) = op[1], op[2]
+                fills.append((min(x0, x1), min(y0, y1), max(x0, x1) + 1, max(y0, y1) + 1))
+            continue
+        tx0, ty0, tx1, ty1 = op_bounds(op)
+        if not any(x0 <= tx0 and y0 <= ty0 and tx1 <= x1 and ty1 <= y1 for x0, y0, x1, y1 in fills):
+            return False
+    return True
+
+
+class Sprite:
+    """One rasterized item: its pixels and the mask of pixels it covers"""
+
+    def __init__(self, local_item):
+        _, _, width, height = item_bounds(local_item)
+        self.pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        self.mask = np.zeros((height, width), dtype=np.uint8)
+        draw_item(self.pixels, local_item)
+        draw_item(self.mask, tuple(_mask_op(op) for op in local_item))
+
+    def blit(self, image, x, y):
+        """Draw the sprite with its tile origin at (x, y), clipped to image"""
+        h, w = image.shape[:2]
+        th, tw = self.mask.shape
+        sx, sy = max(-x, 0), max(-y, 0)
+        ex, ey = min(w - x, tw), min(h - y, th)
+        if sx >= ex or sy >= ey:
+            return
+        target = image[y + sy:y + ey, x + sx:x + ex]
+        # Masked copy in C (numpy's copyto(where=) is an order of magnitude slower)
+        result = cv2.copyTo(self.pixels[sy:ey, sx:ex], self.mask[sy:ey, sx:ex], target)
+        if result is not target:
+            target[...] = result
+
+
+class SpriteAtlas:
+    """LRU cache of pre-rasterized overlay items (key tiles)
+
+    An item (tuple of rect_op/text_op draw ops) is rasterized once on a tile
+    the size of its bounds, with a mask of the pixels it covers so the black
+    tile padding never overwrites neighbouring keys. Tiles are keyed by the
+    item moved to the origin, i.e. by label, key size and state colours, so a
+    key that keeps its look is never drawn again and blit() is a masked copy.
+    The least recently used tiles are dropped once max_sprites is exceeded
+    (e.g. after a layout or size change). Items with text that is not on a
+    key of their own (e.g. labels drawn over the keyboard) are drawn directly.
+    """
+
+    def __init__(self, max_sprites=SPRITE_CACHE_SIZE):
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()     # Item at the origin -> Sprite
+        self.placements = {}             # Item -> (x, y, item at the origin), None if drawn directly
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.direct = 0
+        self.build_time = 0.0
+
+    def sprite(self, item):
+        """Return (x, y, Sprite) for an item, rasterizing it on a miss (None if it cannot be cached)"""
+        if item in self.placements:
+            placement = self.placements[item]
+        else:
+            placement = None
+            if _self_contained(item):
+                x0, y0, x1, y1 = item_bounds(item)
+                placement = (x0, y0, tuple(_shift_op(op, -x0, -y0) for op in item))
+            if len(self.placements) >= 4 * self.max_sprites:
+                self.placements.clear()
+            self.placements[item] = placement
+        if placement is None:
+            return None
+        x0, y0, local = placement
+
+        tile = self.sprites.get(local)
+        if tile is not None:
+            self.sprites.move_to_end(local)
+            self.hits += 1
+            return x0, y0, tile
+
+        start = time.perf_counter()
+        tile = Sprite(local)
+        self.sprites[local] = tile
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+            self.evictions += 1
+        self.misses += 1
+        self.build_time += time.perf_counter() - start
+        return x0, y0, tile
+
+    def blit(self, image, item, offset=(0, 0)):
+        """Copy an item's tile into image; same pixels as draw_item(image, item, offset)"""
+        sprite = self.sprite(item)
+        if sprite is None:
+            self.direct += 1
+            draw_item(image, item, offset)
+            return
+        x, y, tile = sprite
+        tile.blit(image, x - offset[0], y - offset[1])
+
+    def clear(self):
+        self.sprites.clear()
+        self.placements.clear()
+
+    def get_stats(self):
+        """Return cache hit/miss counts and rasterization time"""
+        lookups = self.hits + self.misses
+        return {
+            'sprites': len(self.sprites),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'direct': self.direct,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'build_ms': self.build_time * 1000.0
+        }
+
+    def print_report(self, title="Key sprites"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['sprites']} cached, {stats['hit_rate']:.0%} hit rate "
+              f"({stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evicted, "
+              f"{stats['direct']} drawn directly), "
+              f"{stats['build_ms']:.1f} ms rasterizing")
+
+
+def add_sprite_arguments(parser):
+    """Add the --key-sprites option to an argparse parser"""
+    parser.add_argument("--key-sprites", action="store_true",
+                        help="copy overlay keys from pre-rasterized tiles instead of drawing them "
+                             "(a small gain, since only changed keys are redrawn anyway)")
+    return parser
+
+
+def main():
+    import argparse
+    from keyboard_layout import OVERLAY_LAYOUTS, overlay_geometry
+    from overlay_renderer import sample_key_items
+
+    parser = argparse.ArgumentParser(description="Overlay build time with and without the key sprite atlas")
+    parser.add_argument("--builds", type=int, default=200, help="overlay builds per resolution")
+    parser.add_argument("--keyboard-size", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    atlas = SpriteAtlas()
+    for shape in [(480, 640, 3), (720, 1280, 3), (1080, 1920, 3)]:
+        for layout in OVERLAY_LAYOUTS:
+            geometry = overlay_geometry(OVERLAY_LAYOUTS[layout], shape, args.keyboard_size)
+            selections = [{geometry.keys[i] for i in rng.integers(len(geometry), size=2)}
+                          for _ in range(args.builds)]
+            sequence = [sample_key_items(geometry, selected) for selected in selections]
+
+            # One reused buffer per method; only the key drawing is timed
+            drawn = np.zeros(shape, dtype=np.uint8)
+            blitted = np.zeros(shape, dtype=np.uint8)
+            draw_time = blit_time = 0.0
+            identical = True
+            for items in sequence:
+                drawn[:] = 0
+                start = time.perf_counter()
+                for item in items:
+                    draw_item(drawn, item)
+                draw_time += time.perf_counter() - start
+
+                blitted[:] = 0
+                start = time.perf_counter()
+                for item in items:
+                    atlas.blit(blitted, item)
+                blit_time += time.perf_counter() - start
+                identical &= np.array_equal(drawn, blitted)
+
+            print(f"{shape[1]}x{shape[0]} {layout:<8} putText {draw_time * 1000.0 / args.builds:5.2f} ms, "
+                  f"sprites {blit_time * 1000.0 / args.builds:5.2f} ms/build "
+                  f"({draw_time / blit_time:4.1f}x) | identical: {identical}")
+    atlas.print_report()
+
+
+if __name__ == "__main__":
+    main()
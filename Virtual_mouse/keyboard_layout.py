@@ -0,0 +1,314 @@
+import cv2
+import math
+import time
+import numpy as np
+from functools import lru_cache
+
+# Overlay keyboard layouts (multi_hand_virtual_keyboard.py)
+OVERLAY_LAYOUTS = {
+    "letters": [
+        ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P'],
+        ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L'],
+        ['Z', 'X', 'C', 'V', 'B', 'N', 'M'],
+        ['SPACE', 'BACKSPACE', 'ENTER', 'NUMBERS'],
+        ['POINT', 'PINCH', 'BOTH', 'QUIT']
+    ],
+    "numbers": [
+        ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0'],
+        ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')'],
+        ['-', '=', '[', ']', ';', "'", ',', '.', '/'],
+        ['SPACE', 'BACKSPACE', 'ENTER', 'LETTERS'],
+        ['POINT', 'PINCH', 'BOTH', 'QUIT']
+    ]
+}
+
+# Advanced gesture keyboard layouts (virtual_keyboard.py)
+ADVANCED_LAYOUTS = {
+    "qwerty": [
+        ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0'],
+        ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P'],
+        ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L'],
+        ['Z', 'X', 'C', 'V', 'B', 'N', 'M'],
+        ['SPACE', 'BACKSPACE', 'ENTER', 'SHIFT', 'CTRL']
+    ],
+    "symbols": [
+        ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')'],
+        ['-', '=', '[', ']', '\\', ';', "'", ',', '.', '/'],
+        ['<', '>', '?', ':', '"', '{', '}', '|'],
+        ['SPACE', 'BACKSPACE', 'ENTER', 'QWERTY']
+    ]
+}
+
+# Overlay key selection: bottom rows are easier to hit, nothing beyond the cutoff
+MAX_KEY_DISTANCE = 50
+BOTTOM_ROW_WEIGHT = 1.3
+BOTTOM_ROWS = 2
+
+# Compiled geometries kept per (layout, frame size, keyboard size)
+GEOMETRY_CACHE_SIZE = 16
+
+
+def _freeze(array):
+    array.flags.writeable = False
+    return array
+
+
+def _layout_key(layout):
+    return tuple(tuple(row) for row in layout)
+
+
+class OverlayGeometry:
+    """Compiled, read-only key geometry of the overlay keyboard
+
+    keys, rects (K, 4: x, y, width, height), centers (K, 2), rows and cols are
+    in drawing order. Build it with overlay_geometry() so equal inputs share
+    one cached instance; the pixel -> key image is built on first use.
+    """
+
+    def __init__(self, layout, frame_shape, keyboard_size):
+        h, w = frame_shape[:2]
+        self.frame_shape = (h, w)
+        self.keyboard_size = keyboard_size
+        self.total_rows = len(layout)
+
+        # Calculate keyboard dimensions with better spacing
+        keyboard_height = int(h * keyboard_size)
+        keyboard_width = int(w * 0.95)  # Slightly wider for better key spacing
+
+        # Move keyboard up to ensure bottom rows are more accessible
+        keyboard_start_y = int(h * 0.35)  # Start at 35% from top instead of bottom-based
+        keyboard_start_x = (w - keyboard_width) // 2
+
+        # Calculate key dimensions with improved spacing
+        key_height = (keyboard_height - 20) // self.total_rows  # Account for row spacing
+
+        keys, rects, rows, cols = [], [], [], []
+        for row_idx, row in enumerate(layout):
+            # Add spacing between rows
+            row_y = keyboard_start_y + (row_idx * (key_height + 4))
+
+            # Calculate key width for this specific row
+            row_key_width = (keyboard_width - 20) // len(row)  # Account for key spacing
+
+            # Center the row
+            row_start_x = keyboard_start_x + (keyboard_width - (len(row) * row_key_width)) // 2
+
+            for col_idx, key in enumerate(row):
+                key_x = row_start_x + (col_idx * row_key_width)
+                keys.append(key)
+                rects.append((key_x + 2, row_y + 2, row_key_width - 4, key_height - 4))
+                rows.append(row_idx)
+                cols.append(col_idx)
+
+        self.keys = tuple(keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.rects = _freeze(np.array(rects, dtype=np.int32).reshape(-1, 4))
+        self.rows = _freeze(np.array(rows, dtype=np.int16))
+        self.cols = _freeze(np.array(cols, dtype=np.int16))
+        self.centers = _freeze(self.rects[:, :2] + self.rects[:, 2:] / 2)
+        self.weights = _freeze(np.where(self.rows >= self.total_rows - BOTTOM_ROWS, BOTTOM_ROW_WEIGHT, 1.0))
+        self._hit_map = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def hit_map(self):
+        """Pixel -> key lookup for this geometry"""
+        if self._hit_map is None:
+            self._hit_map = KeyHitMap(self)
+        return self._hit_map
+
+    def key_at(self, point):
+        return self.hit_map.lookup(point)
+
+
+class GridGeometry:
+    """Compiled camera-view key grid of the advanced gesture keyboard
+
+    Rows split the frame height into len(layout) + 1 bands and every row is
+    split evenly across the width. Row/column lookup tables replace the
+    per-call division and the grid lines are stored as pixel indices.
+    """
+
+    def __init__(self, layout, frame_shape):
+        h, w = frame_shape[:2]
+        self.frame_shape = (h, w)
+        self.layout = tuple(tuple(row) for row in layout)
+        self.total_rows = len(layout)
+
+        # Row for every y (same arithmetic as the original per-call mapping)
+        row_height = h / (self.total_rows + 1)
+        ys = np.arange(h, dtype=np.float64)
+        row_for_y = ((ys - row_height / 2) / row_height).astype(np.int64)
+        self.row_for_y = _freeze(np.clip(row_for_y, 0, self.total_rows - 1).astype(np.int16))
+
+        # Column for every x, per row
+        xs = np.arange(w, dtype=np.float64)
+        col_for_x = np.empty((self.total_rows, w), dtype=np.int16)
+        for row_idx, row in enumerate(layout):
+            col_width = w / len(row)
+            col_for_x[row_idx] = np.clip((xs / col_width).astype(np.int64), 0, len(row) - 1)
+        self.col_for_x = _freeze(col_for_x)
+
+        # Grid lines, drawn once and kept as pixel coordinates
+        grid = np.zeros((h, w), dtype=np.uint8)
+        line_row_height = h // (self.total_rows + 1)
+        for i in range(1, self.total_rows + 1):
+            y = i * line_row_height
+            cv2.line(grid, (0, y), (w, y), 1, 1)
+        for row_idx, row in enumerate(layout):
+            y = (row_idx + 1) * line_row_height
+            col_width = w // len(row)
+            for i in range(1, len(row)):
+                x = i * col_width
+                cv2.line(grid, (x, y - line_row_height // 2), (x, y + line_row_height // 2), 1, 1)
+        grid_ys, grid_xs = np.nonzero(grid)
+        self.grid_ys = _freeze(grid_ys)
+        self.grid_xs = _freeze(grid_xs)
+
+    def key_at(self, point):
+        """Key for an integer (x, y) point; points off the frame clamp to the edge keys"""
+        h, w = self.frame_shape
+        x = min(max(int(point[0]), 0), w - 1)
+        y = min(max(int(point[1]), 0), h - 1)
+        row_idx = self.row_for_y[y]
+        return self.layout[row_idx][self.col_for_x[row_idx, x]]
+
+    def draw_grid(self, frame, color=(100, 100, 100)):
+        """Draw the grid lines onto a frame of this geometry's size"""
+        frame[self.grid_ys, self.grid_xs] = color
+
+
+@lru_cache(maxsize=GEOMETRY_CACHE_SIZE)
+def _overlay_geometry(layout, h, w, keyboard_size):
+    return OverlayGeometry(layout, (h, w), keyboard_size)
+
+
+@lru_cache(maxsize=GEOMETRY_CACHE_SIZE)
+def _grid_geometry(layout, h, w):
+    return GridGeometry(layout, (h, w))
+
+
+def overlay_geometry(layout, frame_shape, keyboard_size):
+    """Cached OverlayGeometry for a layout (list of rows), frame shape and keyboard size"""
+    return _overlay_geometry(_layout_key(layout), frame_shape[0], frame_shape[1], keyboard_size)
+
+
+def grid_geometry(layout, frame_shape):
+    """Cached GridGeometry for a layout (list of rows) and frame shape"""
+    return _grid_geometry(_layout_key(layout), frame_shape[0], frame_shape[1])
+
+
+def nearest_key(geometry, point, max_distance=MAX_KEY_DISTANCE):
+    """Closest key centre to point by row-weighted distance (None beyond max_distance)"""
+    x, y = point
+    closest_key = None
+    min_distance = float('inf')
+
+    for key, (key_center_x, key_center_y), weight in zip(geometry.keys, geometry.centers.tolist(),
+                                                         geometry.weights.tolist()):
+        distance = math.sqrt((x - key_center_x)**2 + (y - key_center_y)**2)
+        weighted_distance = distance / weight
+        if weighted_distance < min_distance:
+            min_distance = weighted_distance
+            closest_key = key
+
+    if min_distance <= max_distance:
+        return closest_key
+    return None
+
+
+class KeyHitMap:
+    """Pixel -> key label image so hit-testing is a single array lookup
+
+    Every pixel holds the index (into keys, 0 = no key) that nearest_key
+    returns for it, including the bottom-row weighting and the distance cutoff.
+    Points outside the frame fall back to nearest_key.
+    """
+
+    def __init__(self, geometry, max_distance=MAX_KEY_DISTANCE):
+        h, w = geometry.frame_shape
+        self.geometry = geometry
+        self.max_distance = max_distance
+        self.keys = (None,) + geometry.keys
+        self.shape = (h, w)
+
+        dtype = np.uint8 if len(self.keys) <= 255 else np.uint16
+        self.labels = np.zeros((h, w), dtype=dtype)
+        best = np.full((h, w), np.inf)
+
+        # Each key can only win within max_distance * weight of its centre, so
+        # only that window is evaluated. Keys are visited in the same order as
+        # nearest_key and only a strictly smaller distance wins, so ties match.
+        for index, ((center_x, center_y), weight) in enumerate(
+                zip(geometry.centers.tolist(), geometry.weights.tolist()), start=1):
+            radius = int(math.ceil(max_distance * weight)) + 1
+
+            x0 = max(int(center_x) - radius, 0)
+            x1 = min(int(center_x) + radius + 1, w)
+            y0 = max(int(center_y) - radius, 0)
+            y1 = min(int(center_y) + radius + 1, h)
+            if x0 >= x1 or y0 >= y1:
+                continue
+
+            xs = np.arange(x0, x1, dtype=np.float64) - center_x
+            ys = np.arange(y0, y1, dtype=np.float64)[:, None] - center_y
+            distance = np.sqrt(xs**2 + ys**2) / weight
+
+            window = best[y0:y1, x0:x1]
+            closer = distance < window
+            window[closer] = distance[closer]
+            self.labels[y0:y1, x0:x1][closer] = index
+
+        self.labels[best > max_distance] = 0
+        _freeze(self.labels)
+
+    def lookup(self, point):
+        """Key under point, or None"""
+        x, y = point
+        if 0 <= x < self.shape[1] and 0 <= y < self.shape[0]:
+            return self.keys[self.labels[int(y), int(x)]]
+        return nearest_key(self.geometry, point, self.max_distance)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Key hit-test benchmark: distance loop vs label image")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--keyboard-size", type=float, default=0.6)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for (w, h) in [(640, 480), (1280, 720), (1920, 1080)]:
+        for name, layout in OVERLAY_LAYOUTS.items():
+            start = time.perf_counter()
+            geometry = overlay_geometry(layout, (h, w), args.keyboard_size)
+            hit_map = geometry.hit_map
+            build_ms = (time.perf_counter() - start) * 1000.0
+
+            # Later rebuilds of the same geometry come from the cache
+            start = time.perf_counter()
+            overlay_geometry(layout, (h, w), args.keyboard_size).hit_map
+            cached_us = (time.perf_counter() - start) * 1e6
+
+            # Integer fingertip positions, a few of them just outside the frame
+            points = np.column_stack([rng.integers(-20, w + 20, args.points),
+                                      rng.integers(-20, h + 20, args.points)]).tolist()
+
+            start = time.perf_counter()
+            expected = [nearest_key(geometry, p) for p in points]
+            loop_us = (time.perf_counter() - start) * 1e6 / len(points)
+
+            start = time.perf_counter()
+            found = [hit_map.lookup(p) for p in points]
+            map_us = (time.perf_counter() - start) * 1e6 / len(points)
+
+            print(f"{w}x{h} {name:<8} build {build_ms:5.1f} ms (cached {cached_us:4.1f} us) | "
+                  f"loop {loop_us:5.2f} us, label image {map_us:4.2f} us "
+                  f"({loop_us / max(map_us, 1e-9):3.0f}x) | identical: {expected == found}")
+
+
+if __name__ == "__main__":
+    main()
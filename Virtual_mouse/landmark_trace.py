@@ -0,0 +1,358 @@
+import numpy as np
+import os
+import time
+from hand_landmarks import NUM_LANDMARKS, landmarks_to_array
+
+# Binary trace layout: one fixed-size header followed by fixed-size frame records
+TRACE_MAGIC = b'VMTRACE1'
+MAX_HANDS = 2
+
+# Handedness codes stored per hand slot
+HAND_NONE = 0
+HAND_LEFT = 1
+HAND_RIGHT = 2
+HANDEDNESS_LABELS = {HAND_LEFT: "Left", HAND_RIGHT: "Right"}
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('max_hands', '<u4'),
+    ('num_landmarks', '<u4'),
+    ('frame_width', '<u4'),
+    ('frame_height', '<u4'),
+    ('reserved', '<u4', (2,))
+])
+
+FRAME_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('num_hands', 'u1'),
+    ('handedness', 'u1', (MAX_HANDS,)),
+    ('score', '<f4', (MAX_HANDS,)),
+    ('landmarks', '<f4', (MAX_HANDS, NUM_LANDMARKS, 3))
+])
+
+
+class ReplayLandmark:
+    """Stand-in for a MediaPipe NormalizedLandmark"""
+
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def HasField(self, name):
+        # Recorded traces carry no visibility/presence, which drawing_utils checks for
+        return False
+
+
+class ReplayHandLandmarks:
+    """Stand-in for a MediaPipe NormalizedLandmarkList"""
+
+    def __init__(self, points):
+        self.array = np.asarray(points, dtype=np.float32)
+        self._landmark = None
+
+    @property
+    def landmark(self):
+        # Built on first use; array consumers never need the per-point objects
+        if self._landmark is None:
+            self._landmark = [ReplayLandmark(float(x), float(y), float(z)) for x, y, z in self.array]
+        return self._landmark
+
+
+class ReplayClassification:
+    def __init__(self, label, score):
+        self.label = label
+        self.score = score
+
+
+class ReplayHandedness:
+    def __init__(self, label, score):
+        self.classification = [ReplayClassification(label, score)]
+
+
+class ReplayResults:
+    """Stand-in for the result of Hands.process()"""
+
+    def __init__(self, multi_hand_landmarks=None, multi_handedness=None, timestamp=0.0):
+        self.multi_hand_landmarks = multi_hand_landmarks
+        self.multi_handedness = multi_handedness
+        self.timestamp = timestamp
+
+
+def pack_results(results, record):
+    """Write a Hands.process() result into one FRAME_DTYPE record (timestamp untouched)"""
+    record['num_hands'] = 0
+    record['handedness'] = HAND_NONE
+    record['score'] = 0.0
+
+    hands = results.multi_hand_landmarks or []
+    handedness = results.multi_handedness or []
+    for slot, hand_landmarks in enumerate(hands[:MAX_HANDS]):
+        landmarks_to_array(hand_landmarks, out=record['landmarks'][slot])
+        if slot < len(handedness) and handedness[slot].classification:
+            classification = handedness[slot].classification[0]
+            record['handedness'][slot] = HAND_LEFT if classification.label == "Left" else HAND_RIGHT
+            record['score'][slot] = classification.score
+        record['num_hands'] = slot + 1
+    return record
+
+
+def unpack_results(record):
+    """Rebuild a Hands.process()-style result object from one FRAME_DTYPE record"""
+    num_hands = int(record['num_hands'])
+    if num_hands == 0:
+        return ReplayResults(timestamp=float(record['timestamp']))
+
+    hand_landmarks = []
+    handedness = []
+    for slot in range(num_hands):
+        hand_landmarks.append(ReplayHandLandmarks(record['landmarks'][slot]))
+        label = HANDEDNESS_LABELS.get(int(record['handedness'][slot]), "Right")
+        handedness.append(ReplayHandedness(label, float(record['score'][slot])))
+    return ReplayResults(hand_landmarks, handedness, float(record['timestamp']))
+
+
+class TraceRecorder:
+    """Append Hands.process() results to a binary landmark trace"""
+
+    def __init__(self, path, frame_width=0, frame_height=0, flush_every=256):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.header = np.zeros(1, dtype=HEADER_DTYPE)
+        self.header['magic'] = TRACE_MAGIC
+        self.header['max_hands'] = MAX_HANDS
+        self.header['num_landmarks'] = NUM_LANDMARKS
+        self.header['frame_width'] = frame_width
+        self.header['frame_height'] = frame_height
+        self.file.write(self.header.tobytes())
+
+        self.pending = np.zeros(flush_every, dtype=FRAME_DTYPE)
+        self.pending_count = 0
+        self.frames_recorded = 0
+
+    def record(self, results, timestamp=None):
+        """Record one frame of hand results"""
+        record = self.pending[self.pending_count]
+        record['timestamp'] = time.time() if timestamp is None else timestamp
+        pack_results(results, record)
+
+        self.pending_count += 1
+        self.frames_recorded += 1
+        if self.pending_count == len(self.pending):
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to disk"""
+        if self.pending_count:
+            self.file.write(self.pending[:self.pending_count].tobytes())
+            self.pending_count = 0
+        self.file.flush()
+
+    def close(self):
+        """Flush and close the trace file"""
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+        print(f"Recorded {self.frames_recorded} frames to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkTrace:
+    """Memory-mapped read access to a recorded landmark trace"""
+
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header['magic'][0] != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a landmark trace")
+        if header['max_hands'][0] != MAX_HANDS or header['num_landmarks'][0] != NUM_LANDMARKS:
+            raise ValueError(f"{path} uses an unsupported trace layout")
+
+        self.frame_width = int(header['frame_width'][0])
+        self.frame_height = int(header['frame_height'][0])
+
+        # Ignore a partially written trailing record
+        data_size = os.path.getsize(path) - HEADER_DTYPE.itemsize
+        count = data_size // FRAME_DTYPE.itemsize
+        if count > 0:
+            self.frames = np.memmap(path, dtype=FRAME_DTYPE, mode='r',
+                                    offset=HEADER_DTYPE.itemsize, shape=(count,))
+        else:
+            self.frames = np.zeros(0, dtype=FRAME_DTYPE)
+
+        # Column views (no copies)
+        self.timestamps = self.frames['timestamp']
+        self.num_hands = self.frames['num_hands']
+        self.handedness = self.frames['handedness']
+        self.scores = self.frames['score']
+        self.landmarks = self.frames['landmarks']
+
+    def __len__(self):
+        return len(self.frames)
+
+    def hand_mask(self):
+        """Return a (frames, MAX_HANDS) boolean mask of populated hand slots"""
+        return np.arange(MAX_HANDS)[None, :] < self.num_hands[:, None]
+
+    def results(self, index):
+        """Rebuild a Hands.process()-style result object for one frame"""
+        return unpack_results(self.frames[index])
+
+    def iter_results(self):
+        """Yield result objects for every frame"""
+        for index in range(len(self)):
+            yield self.results(index)
+
+
+class ReplayHands:
+    """Drop-in replacement for mp.solutions.hands.Hands that replays a trace"""
+
+    def __init__(self, trace, loop=False):
+        self.trace = trace if isinstance(trace, LandmarkTrace) else LandmarkTrace(trace)
+        self.loop = loop
+        self.index = 0
+
+    def process(self, image):
+        """Return the next recorded result (the image is ignored)"""
+        if self.index >= len(self.trace):
+            if not self.loop or len(self.trace) == 0:
+                return ReplayResults()
+            self.index = 0
+        results = self.trace.results(self.index)
+        self.index += 1
+        return results
+
+    def close(self):
+        pass
+
+
+def add_trace_arguments(parser):
+    """Add the common --record-trace/--replay-trace options to an argparse parser"""
+    parser.add_argument("--record-trace", default=None,
+                        help="record hand landmarks of this session to a trace file")
+    parser.add_argument("--replay-trace", default=None,
+                        help="replay hand landmarks from a trace file instead of running MediaPipe")
+    return parser
+
+
+def generate_synthetic_trace(path, num_frames=1000, frame_width=1280, frame_height=720, seed=0):
+    """Write a trace of randomly posed hands for testing without a camera"""
+    rng = np.random.default_rng(seed)
+
+    # Rough open right hand, normalized to a unit-ish box around the wrist
+    template = np.array([
+        [0.00, 0.00], [-0.06, -0.04], [-0.10, -0.09], [-0.13, -0.13], [-0.15, -0.17],
+        [-0.05, -0.18], [-0.05, -0.26], [-0.05, -0.31], [-0.05, -0.35],
+        [0.00, -0.19], [0.00, -0.28], [0.00, -0.33], [0.00, -0.38],
+        [0.04, -0.18], [0.04, -0.26], [0.04, -0.31], [0.04, -0.35],
+        [0.08, -0.16], [0.08, -0.22], [0.08, -0.26], [0.08, -0.29]
+    ], dtype=np.float32)
+    finger_joints = [(5, 6, 7, 8), (9, 10, 11, 12), (13, 14, 15, 16), (17, 18, 19, 20)]
+    # Curled fingers of the poses the mouse rules look for: pointing (cursor) and two fingers (scroll)
+    pointing = np.array([False, True, True, True])
+    two_fingers = np.array([False, False, True, True])
+
+    def random_pose():
+        draw = rng.random()
+        if draw < 0.2:
+            return pointing
+        if draw < 0.4:
+            return two_fingers
+        return rng.random(4) < 0.5
+
+    with TraceRecorder(path, frame_width, frame_height) as recorder:
+        wrist = np.array([0.5, 0.8], dtype=np.float32)
+        curled = random_pose()
+        pinch = -1
+        for index in range(num_frames):
+            # Random walk of the wrist and occasional pose changes
+            wrist = np.clip(wrist + rng.normal(0, 0.01, 2), [0.2, 0.5], [0.8, 0.95])
+            if rng.random() < 0.05:
+                curled = random_pose()
+                pinch = rng.integers(0, 4) if rng.random() < 0.3 else -1
+
+            points = template.copy()
+            for finger, (mcp, pip, dip, tip) in enumerate(finger_joints):
+                if curled[finger]:
+                    # Fold the finger back so its tip ends up below the knuckle (MCP)
+                    points[dip] = points[pip] + [0.0, 0.03]
+                    points[tip] = points[mcp] + [0.0, 0.04]
+            if np.array_equal(curled, two_fingers):
+                # Index and middle held together, as for scrolling
+                points[12, 0] = points[8, 0] + 0.02
+            if pinch >= 0:
+                points[4] = points[finger_joints[pinch][3]] + rng.normal(0, 0.005, 2)
+
+            points = points + wrist + rng.normal(0, 0.002, points.shape)
+            hand = ReplayHandLandmarks(np.column_stack([points, np.zeros(len(points))]))
+            results = ReplayResults([hand], [ReplayHandedness("Right", 0.99)])
+            recorder.record(results, timestamp=index / 30.0)
+
+
+def evaluate_trace(trace):
+    """Run the existing per-frame gesture rules over a trace and report label counts"""
+    from gestures import detect_gesture, detect_hand_gesture, classify_advanced_gesture, GestureStabilizer
+    from hand_landmarks import landmarks_to_pixels
+
+    frame_width = trace.frame_width or 1280
+    frame_height = trace.frame_height or 720
+    stabilizer = GestureStabilizer(stability_threshold=5)
+    counts = {'mouse': {}, 'overlay': {}, 'advanced': {}}
+
+    start = time.perf_counter()
+    for index in range(len(trace)):
+        for slot in range(int(trace.num_hands[index])):
+            landmarks = trace.landmarks[index, slot]
+            overlay_gesture = detect_hand_gesture(landmarks)
+            counts['overlay'][overlay_gesture] = counts['overlay'].get(overlay_gesture, 0) + 1
+            if slot > 0:
+                continue
+            # The mouse and advanced keyboard track a single hand
+            positions = landmarks_to_pixels(landmarks, frame_width, frame_height)
+            mouse_gesture = detect_gesture(positions)[0]
+            counts['mouse'][mouse_gesture] = counts['mouse'].get(mouse_gesture, 0) + 1
+            advanced_gesture = stabilizer.update(classify_advanced_gesture(landmarks))
+            counts['advanced'][advanced_gesture] = counts['advanced'].get(advanced_gesture, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    return counts, elapsed
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Landmark trace tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="write a synthetic trace")
+    generate_parser.add_argument("path")
+    generate_parser.add_argument("--frames", type=int, default=1000)
+    generate_parser.add_argument("--seed", type=int, default=0)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="run gesture rules over a trace")
+    evaluate_parser.add_argument("path")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate_synthetic_trace(args.path, num_frames=args.frames, seed=args.seed)
+    elif args.command == "evaluate":
+        trace = LandmarkTrace(args.path)
+        counts, elapsed = evaluate_trace(trace)
+        print(f"Evaluated {len(trace)} frames in {elapsed:.3f}s "
+              f"({len(trace) / max(elapsed, 1e-9):.0f} frames/s)")
+        for app, labels in counts.items():
+            summary = ", ".join(f"{label}: {count}" for label, count in sorted(labels.items()))
+            print(f"  {app}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import time
+import cv2
+import numpy as np
+from frame_buffers import FramePool
+from hand_landmarks import NUM_LANDMARKS, landmarks_to_array
+from landmark_trace import ReplayHandedness, ReplayHandLandmarks, ReplayResults
+
+TRACK_INTERVAL = 3       # Run hand detection on every Nth frame
+FLOW_WINDOW = 21         # Lucas-Kanade window (pixels)
+FLOW_LEVELS = 3          # Pyramid levels, for fast hand motion
+MAX_FB_ERROR = 1.5       # Forward-backward error (pixels) above which a landmark is lost
+MIN_CONFIDENCE = 0.8     # Share of a hand's landmarks flow must follow to skip detection
+
+
+class LandmarkTracker:
+    """Propagate hand landmarks with optical flow between hand detections
+
+    Detection (run) is called on every interval-th frame; in between, the 21
+    landmarks of each hand are moved with sparse Lucas-Kanade flow on the
+    grayscale frame and returned as a Hands.process()-style result, so gesture
+    and drawing code cannot tell the difference. Every point is tracked forward
+    and back again; a point whose round trip misses by more than max_fb_error
+    is lost and follows the median motion of its hand instead. If fewer than
+    min_confidence of a hand's points survive (fast motion, occlusion, the
+    hand leaving the frame), the frame is detected instead. Without a hand to
+    follow every frame is detected, so new hands are found right away.
+    """
+
+    def __init__(self, interval=TRACK_INTERVAL, min_confidence=MIN_CONFIDENCE,
+                 max_fb_error=MAX_FB_ERROR, buffers=None):
+        self.interval = interval
+        self.min_confidence = min_confidence
+        self.max_fb_error = max_fb_error
+        self.buffers = buffers if buffers is not None else FramePool()
+        self.flow_params = dict(winSize=(FLOW_WINDOW, FLOW_WINDOW), maxLevel=FLOW_LEVELS,
+                                criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.previous_gray = None
+        self.points = None            # (hands * 21, 1, 2) float32 pixel positions
+        self.landmarks = []           # (21, 3) normalized landmarks per hand
+        self.handedness = []
+        self.since_detect = 0
+        self.last_confidence = 1.0
+
+        # Counters
+        self.frames = 0
+        self.detected = 0
+        self.tracked = 0
+        self.refreshes = 0            # Detections forced by low flow confidence
+        self.flow_time = 0.0
+        self.detect_time = 0.0
+
+    def reset(self):
+        """Detect on the next frame"""
+        self.landmarks = []
+        self.points = None
+
+    def process(self, image, run):
+        """Return run(image) on detection frames and flow-propagated landmarks in between"""
+        self.frames += 1
+        # Two alternating buffers, so the previous frame survives this conversion
+        gray = self.buffers.cvt_color(f"flow_gray{self.frames % 2}", image, cv2.COLOR_RGB2GRAY, channels=1)
+
+        if self.landmarks and self.since_detect < self.interval - 1:
+            start = time.perf_counter()
+            results = self._track(gray)
+            self.flow_time += time.perf_counter() - start
+            if results is not None:
+                self.tracked += 1
+                self.since_detect += 1
+                self.previous_gray = gray
+                return results
+            self.refreshes += 1
+
+        start = time.perf_counter()
+        results = run(image)
+        self.detect_time += time.perf_counter() - start
+        self.detected += 1
+        self.since_detect = 0
+        self.previous_gray = gray
+
+        hands = results.multi_hand_landmarks or []
+        handedness = results.multi_handedness or []
+        h, w = image.shape[:2]
+        self.landmarks = [landmarks_to_array(hand) for hand in hands]
+        self.handedness = []
+        for index in range(len(hands)):
+            classification = handedness[index].classification[0] if index < len(handedness) else None
+            self.handedness.append(ReplayHandedness(classification.label if classification else "Right",
+                                                    classification.score if classification else 0.0))
+        if self.landmarks:
+            scale = np.array([w, h], dtype=np.float32)
+            self.points = np.concatenate([landmarks[:, :2] * scale for landmarks in self.landmarks])
+            self.points = np.ascontiguousarray(self.points.reshape(-1, 1, 2), dtype=np.float32)
+        return results
+
+    def _track(self, gray):
+        # Propagated result, or None when flow lost too much of a hand
+        h, w = gray.shape[:2]
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self.previous_gray, gray, self.points, None,
+                                                    **self.flow_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.previous_gray, moved, None,
+                                                        **self.flow_params)
+        fb_error = np.linalg.norm((back - self.points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+        good = good.reshape(-1, NUM_LANDMARKS)
+        confidence = good.mean(axis=1)
+        self.last_confidence = float(confidence.min())
+        if self.last_confidence < self.min_confidence:
+            return None
+
+        previous = self.points.reshape(-1, NUM_LANDMARKS, 2)
+        moved = moved.reshape(-1, NUM_LANDMARKS, 2)
+        hand_landmarks = []
+        for index, landmarks in enumerate(self.landmarks):
+            # Lost points follow the hand's median motion
+            lost = ~good[index]
+            if lost.any():
+                shift = np.median(moved[index][~lost] - previous[index][~lost], axis=0)
+                moved[index][lost] = previous[index][lost] + shift
+            landmarks = landmarks.copy()
+            landmarks[:, 0] = moved[index, :, 0] / w
+            landmarks[:, 1] = moved[index, :, 1] / h
+            self.landmarks[index] = landmarks
+            hand_landmarks.append(ReplayHandLandmarks(landmarks))
+        self.points = np.ascontiguousarray(moved.reshape(-1, 1, 2))
+        return ReplayResults(hand_landmarks, list(self.handedness))
+
+    def get_stats(self):
+        """Return the share of tracked frames and the time per detection and per flow step"""
+        return {
+            'frames': self.frames,
+            'detected': self.detected,
+            'tracked': self.tracked,
+            'refreshes': self.refreshes,
+            'tracked_share': self.tracked / max(self.frames, 1),
+            'detect_ms': self.detect_time * 1000.0 / max(self.detected, 1),
+            'flow_ms': self.flow_time * 1000.0 / max(self.tracked + self.refreshes, 1),
+            'ms_per_frame': (self.detect_time + self.flow_time) * 1000.0 / max(self.frames, 1)
+        }
+
+    def print_report(self, title="Landmark tracking"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['frames']} frames, {stats['tracked_share']:.0%} tracked by flow "
+              f"({stats['flow_ms']:.2f} ms), {stats['detected']} detected ({stats['detect_ms']:.2f} ms, "
+              f"{stats['refreshes']} after low flow confidence), {stats['ms_per_frame']:.2f} ms/frame")
+
+
+def add_tracking_arguments(parser):
+    """Add the --track-interval option to an argparse parser"""
+    parser.add_argument("--track-interval", type=int, default=0,
+                        help="run hand detection every N frames and follow the landmarks with "
+                             "optical flow in between (0 = detect every frame)")
+    return parser
+
+
+def create_landmark_tracker(args, buffers=None):
+    """LandmarkTracker from parsed --track-interval, or None when it is off"""
+    if args.track_interval <= 1:
+        return None
+    return LandmarkTracker(args.track_interval, buffers=buffers)
+
+
+def main():
+    import argparse
+    import mediapipe as mp
+    from frame_sources import REPLAY_FAST, add_source_arguments, open_source
+    from frame_preprocess import FramePreprocessor
+    from inference_report import compare_landmarks
+
+    parser = add_source_arguments(argparse.ArgumentParser(
+        description="Effective FPS and landmark drift of optical-flow tracking on a recorded session"))
+    parser.set_defaults(replay=REPLAY_FAST)
+    parser.add_argument("--frames", type=int, default=0, help="frames to replay (0 = all)")
+    parser.add_argument("--max-hands", type=int, default=2)
+    parser.add_argument("--intervals", type=int, nargs="+", default=[1, 2, 3, 5],
+                        help="detection intervals to compare; 1 (detect every frame) is the reference")
+    args = parser.parse_args()
+
+    runs = []
+    for interval in sorted(set([1] + args.intervals)):
+        cap = open_source(args.source, mode=args.replay)
+        preprocess = FramePreprocessor()
+        hands = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=args.max_hands,
+                                         min_detection_confidence=0.7, min_tracking_confidence=0.5)
+        tracker = LandmarkTracker(interval)
+        landmarks = []
+        elapsed = 0.0
+        frame_shape = None
+        while cap.isOpened() and (not args.frames or len(landmarks) < args.frames):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_shape = frame.shape
+            start = time.perf_counter()
+            results = tracker.process(preprocess.inference_input(frame), hands.process)
+            elapsed += time.perf_counter() - start
+            detected = results.multi_hand_landmarks or []
+            landmarks.append(np.array([landmarks_to_array(hand) for hand in detected],
+                                      dtype=np.float32).reshape(-1, NUM_LANDMARKS, 3))
+        cap.release()
+        hands.close()
+        runs.append((interval, landmarks, frame_shape, elapsed, tracker))
+
+    _, reference, frame_shape, _, _ = runs[0]
+    if frame_shape is None:
+        print(f"No frames read from {args.source}")
+        return
+
+    print(f"{len(reference)} frames of {frame_shape[1]}x{frame_shape[0]} from {args.source}")
+    print(f"{'interval':<10}{'FPS':>8}{'tracked':>9}{'refresh':>9}{'agree':>7}{'drift':>9}{'p95':>8}{'index':>8}")
+    for interval, landmarks, _, elapsed, tracker in runs:
+        report = compare_landmarks(reference, landmarks, frame_shape)
+        stats = tracker.get_stats()
+        print(f"{interval:<10}{len(landmarks) / max(elapsed, 1e-9):>8.1f}{stats['tracked_share']:>9.0%}"
+              f"{stats['refreshes']:>9}{report['agreement']:>7.0%}{report['mean_px']:>7.1f}px"
+              f"{report['p95_px']:>6.1f}px{report['index_tip_px']:>6.1f}px")
+
+
+if __name__ == "__main__":
+    main()
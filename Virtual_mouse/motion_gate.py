@@ -0,0 +1,176 @@
+import time
+import cv2
+import numpy as np
+
+MOTION_WIDTH = 80          # Width of the grayscale thumbnail the gate compares
+PIXEL_NOISE = 12           # Gray levels of change ignored as sensor noise
+MOTION_THRESHOLD = 0.002   # Changed share of thumbnail pixels that counts as motion
+MAX_SKIP = 10              # Never reuse a result for more than this many frames in a row
+
+
+class MotionGate:
+    """Skip hand inference on frames that did not change since the last inference
+
+    Every frame is shrunk to a small grayscale thumbnail. If less than
+    threshold of its pixels differ by more than pixel_noise from the thumbnail
+    of the last frame that ran inference, the previous result is reused
+    instead. Comparing against the last inferred frame (not the previous one)
+    means slow motion still adds up and triggers inference, and max_skip
+    bounds how old a reused result can get. The gate costs a resize, a colour
+    conversion and a difference on a thumbnail, a small fraction of
+    hands.process.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, max_skip=MAX_SKIP, width=MOTION_WIDTH,
+                 pixel_noise=PIXEL_NOISE):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.width = width
+        self.pixel_noise = pixel_noise
+        self.reference = None
+        self.thumbnail = None
+        self.gray = None
+        self.diff = None
+        self.results = None
+        self.skipped_in_row = 0
+        self.last_motion = 0.0
+
+        # Counters
+        self.frames = 0
+        self.skipped = 0
+        self.forced = 0
+        self.gate_time = 0.0
+
+    def motion(self, image):
+        """Changed share of thumbnail pixels since the last inferred frame (1.0 without one)"""
+        h, w = image.shape[:2]
+        size = (self.width, max(int(round(h * self.width / w)), 1))
+        if self.thumbnail is None or self.thumbnail.shape[:2] != size[::-1]:
+            self.thumbnail = np.empty((size[1], size[0]) + image.shape[2:], dtype=image.dtype)
+            self.gray = np.empty(size[::-1], dtype=np.uint8)
+            self.diff = np.empty(size[::-1], dtype=np.uint8)
+            self.reference = None
+        cv2.resize(image, size, dst=self.thumbnail, interpolation=cv2.INTER_LINEAR)
+        if self.thumbnail.ndim == 3:
+            # Channel order does not matter for a difference
+            cv2.cvtColor(self.thumbnail, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        else:
+            self.gray[...] = self.thumbnail
+        if self.reference is None:
+            return 1.0
+        cv2.absdiff(self.gray, self.reference, dst=self.diff)
+        cv2.threshold(self.diff, self.pixel_noise, 255, cv2.THRESH_BINARY, dst=self.diff)
+        return cv2.countNonZero(self.diff) / self.diff.size
+
+    def process(self, image, run):
+        """Return run(image), or the previous result when the frame has not changed"""
+        start = time.perf_counter()
+        self.frames += 1
+        self.last_motion = self.motion(image)
+        skip = self.results is not None and self.last_motion < self.threshold
+        if skip and self.skipped_in_row >= self.max_skip:
+            skip = False
+            self.forced += 1
+        self.gate_time += time.perf_counter() - start
+        if skip:
+            self.skipped += 1
+            self.skipped_in_row += 1
+            return self.results
+
+        self.skipped_in_row = 0
+        if self.reference is None:
+            self.reference = self.gray.copy()
+        else:
+            self.reference[...] = self.gray
+        self.results = run(image)
+        return self.results
+
+    def reset(self):
+        """Run inference on the next frame whatever it looks like"""
+        self.results = None
+
+    def get_stats(self):
+        """Return the skipped-frame ratio and the gate's own cost per frame"""
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'forced': self.forced,
+            'skip_ratio': self.skipped / max(self.frames, 1),
+            'gate_ms': self.gate_time * 1000.0 / max(self.frames, 1)
+        }
+
+    def print_report(self, title="Motion gate"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['skipped']}/{stats['frames']} frames skipped ({stats['skip_ratio']:.0%}), "
+              f"{stats['forced']} forced after {self.max_skip} skips, {stats['gate_ms']:.3f} ms/frame gating")
+
+
+def add_motion_arguments(parser):
+    """Add the --motion-gate options to an argparse parser"""
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="skip hand detection on frames without motion and reuse the last result")
+    parser.add_argument("--motion-threshold", type=float, default=MOTION_THRESHOLD,
+                        help="share of changed pixels that counts as motion")
+    parser.add_argument("--max-skip", type=int, default=MAX_SKIP,
+                        help="most frames in a row that may reuse a result")
+    return parser
+
+
+def create_motion_gate(args):
+    """MotionGate from parsed --motion-gate options, or None when it is off"""
+    if not args.motion_gate:
+        return None
+    return MotionGate(args.motion_threshold, args.max_skip)
+
+
+def main():
+    import argparse
+    from frame_sources import add_source_arguments, open_source
+
+    parser = add_source_arguments(argparse.ArgumentParser(
+        description="Skipped-frame ratio and cost of the motion gate on idle and moving frames"))
+    parser.set_defaults(source="synthetic:1280x720", replay="fast")
+    parser.add_argument("--idle-frames", type=int, default=150,
+                        help="frames of an empty scene (the first frame plus sensor noise) before the source")
+    parser.add_argument("--noise", type=float, default=3.0, help="sensor noise (standard deviation in gray levels)")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.001, MOTION_THRESHOLD, 0.005, 0.02])
+    parser.add_argument("--max-skip", type=int, default=MAX_SKIP)
+    args = parser.parse_args()
+
+    source = open_source(args.source, mode=args.replay)
+    frames = []
+    while source.isOpened():
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(frame)
+    source.release()
+    if not frames:
+        print(f"No frames read from {args.source}")
+        return
+
+    rng = np.random.default_rng(0)
+
+    def noisy(frame):
+        noise = rng.normal(0, args.noise, size=frame.shape)
+        return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+    idle = [noisy(frames[0]) for _ in range(args.idle_frames)]
+    moving = [noisy(frame) for frame in frames]
+    print(f"{len(idle)} idle + {len(moving)} moving frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"noise {args.noise}")
+    for threshold in args.thresholds:
+        gate = MotionGate(threshold, args.max_skip)
+        skipped = []
+        for part in (idle, moving):
+            before = gate.skipped
+            for frame in part:
+                gate.process(frame, lambda image: image.shape)
+            skipped.append((gate.skipped - before) / max(len(part), 1))
+        stats = gate.get_stats()
+        print(f"threshold {threshold:<6} idle skipped {skipped[0]:4.0%}, moving skipped {skipped[1]:4.0%}, "
+              f"gate {stats['gate_ms']:.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
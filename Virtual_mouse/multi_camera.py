@@ -0,0 +1,389 @@
+import json
+import threading
+import time
+import numpy as np
+from frame_sources import REPLAY_REALTIME, open_source
+from frame_preprocess import FramePreprocessor
+from hand_landmarks import landmarks_to_array
+from landmark_trace import ReplayHandedness, ReplayHandLandmarks, ReplayResults
+from pipeline import END, Pipeline
+
+MERGE_DISTANCE = 0.08    # Hands from two cameras whose centres are closer than this (normalized) are one hand
+MAX_AGE = 0.2            # Seconds a camera's last hands still count once another camera has newer ones
+
+
+class MergedHand:
+    """One physical hand in the merged stream: the best detection and the cameras that saw it"""
+
+    def __init__(self, landmarks, label, score, camera, timestamp):
+        self.landmarks = landmarks      # (21, 3) in the shared normalized space
+        self.label = label
+        self.score = score
+        self.camera = camera            # Camera whose detection is used
+        self.timestamp = timestamp      # Source timestamp of that detection
+        self.cameras = [camera]
+        self.centre = landmarks[:, :2].mean(axis=0)
+
+
+def merge_hands(detections, distance=MERGE_DISTANCE, max_hands=2):
+    """Merge (camera, timestamp, landmarks, label, score) detections into one MergedHand per hand
+
+    Detections are taken best score first; one from another camera with the
+    same handedness whose landmark centre is within distance of an accepted
+    hand is the same hand seen twice and only adds its camera to that hand.
+    """
+    merged = []
+    for camera, timestamp, landmarks, label, score in sorted(detections, key=lambda d: -d[4]):
+        centre = landmarks[:, :2].mean(axis=0)
+        for hand in merged:
+            if (camera not in hand.cameras and hand.label == label
+                    and np.linalg.norm(hand.centre - centre) < distance):
+                hand.cameras.append(camera)
+                break
+        else:
+            merged.append(MergedHand(landmarks, label, score, camera, timestamp))
+    return merged[:max_hands]
+
+
+class CameraPipeline:
+    """Capture, hand detection and publishing for one camera, each stage on its own thread"""
+
+    def __init__(self, index, source, hands, publish, mode=REPLAY_REALTIME, inference_size=None,
+                 transform=None):
+        self.index = index
+        self.cap = open_source(source, mode=mode)
+        self.hands = hands
+        self.publish = publish
+        self.preprocess = FramePreprocessor(inference_size=inference_size)
+        self.transform = None if transform is None else np.asarray(transform, dtype=np.float32)
+        self.pipeline = Pipeline([("capture", self.capture_stage),
+                                  ("inference", self.inference_stage),
+                                  ("publish", self.publish_stage)])
+        self.thread = None
+        self.running = False
+        self.error = None
+
+        # Counters
+        self.frames = 0
+        self.latency_time = 0.0
+
+    def capture_stage(self, _):
+        ret, frame, timestamp = self.cap.read_timestamped()
+        if not ret:
+            return END if not self.cap.isOpened() else None
+        return frame, timestamp, time.perf_counter()
+
+    def inference_stage(self, item):
+        frame, timestamp, captured = item
+        results = self.hands.process(self.preprocess.inference_input(frame))
+        detections = []
+        handedness = results.multi_handedness or []
+        for index, hand in enumerate(results.multi_hand_landmarks or []):
+            landmarks = landmarks_to_array(hand)
+            if self.transform is not None:
+                # Camera's normalized frame -> shared space
+                landmarks[:, :2] = landmarks[:, :2] @ self.transform[:, :2].T + self.transform[:, 2]
+            classification = handedness[index].classification[0] if index < len(handedness) else None
+            detections.append((self.index, timestamp, landmarks,
+                               classification.label if classification else "Right",
+                               classification.score if classification else 0.0))
+        return frame, timestamp, captured, detections
+
+    def publish_stage(self, item):
+        frame, timestamp, captured, detections = item
+        self.frames += 1
+        self.latency_time += time.perf_counter() - captured
+        self.publish(self.index, frame, timestamp, captured, detections)
+        return item
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"camera-{self.index}", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.pipeline.run()
+        except Exception as e:
+            # A failing camera stops alone; the others keep the merged stream going
+            self.error = e
+            print(f"Camera {self.index} stopped: {e}")
+        finally:
+            self.running = False
+            self.publish(self.index, None, None, None, None)
+
+    def stop(self):
+        self.pipeline.stop()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        self.cap.release()
+        self.hands.close()
+
+    def get_stats(self):
+        """Return this camera's frame rate and capture-to-publish latency"""
+        stats = self.pipeline.get_stats()
+        return {
+            'frames': self.frames,
+            'fps': stats['fps'],
+            'latency_ms': self.latency_time * 1000.0 / max(self.frames, 1),
+            'inference_ms': stats['stages']['inference']['ms_per_item'],
+            'bottleneck': stats['bottleneck']
+        }
+
+
+class MultiCameraHands:
+    """One capture + hand-detection pipeline per camera, merged into a single hand stream
+
+    Each camera runs its own Pipeline (capture, inference and publishing
+    overlap) with its own detector, so cameras never wait for each other.
+    Every published result replaces that camera's previous one; read() waits
+    for any new result and merges the newest hands of every camera whose last
+    result is at most max_age older than the newest, so a stalled camera drops
+    out instead of holding on to old hands. The object also behaves like a
+    VideoCapture (read() returns a frame to display) and like Hands (process()
+    returns the hands of the last read), so an app loop can use it for both.
+
+    With transforms (one 2x3 affine per camera mapping its normalized frame
+    into the first camera's), the hands of all cameras are merged in that
+    shared space (see merge_hands) and the first camera's frame is shown.
+    Without them, coordinates from different viewpoints cannot be compared,
+    so nothing is merged: the hands of one camera are used at a time (the
+    current one while it sees a hand, otherwise the one with the best
+    detection) and that camera's frame is shown, so the landmarks always
+    match the frame they are drawn on.
+    """
+
+    def __init__(self, sources, create_hands, hands_args=(), mode=REPLAY_REALTIME, inference_size=None,
+                 transforms=None, max_hands=2, merge_distance=MERGE_DISTANCE, max_age=MAX_AGE):
+        self.max_hands = max_hands
+        self.merge_distance = merge_distance
+        self.max_age = max_age
+        self.condition = threading.Condition()
+        self.latest = {}          # camera -> (frame, timestamp, captured, detections)
+        self.version = 0
+        self.read_version = 0
+        self.results = ReplayResults()
+        self.hands = []           # MergedHand list of the last read
+        self.aligned = transforms is not None
+        self.active_camera = 0    # Camera whose hands and frame are used when not aligned
+        transforms = transforms or [None] * len(sources)
+        self.cameras = [CameraPipeline(index, source, create_hands(*hands_args), self.publish, mode,
+                                       inference_size, transform)
+                        for index, (source, transform) in enumerate(zip(sources, transforms))]
+
+        # Counters
+        self.reads = 0
+        self.merged_away = 0      # Detections dropped as another camera's view of a kept hand
+        self.stale = 0            # Camera results left out for being older than max_age
+        self.switches = 0         # Changes of the active camera when not aligned
+        self.age_time = 0.0
+
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.elapsed = None
+        self.cpu = None
+        for camera in self.cameras:
+            camera.start()
+
+    @property
+    def live(self):
+        return self.cameras[0].cap.live
+
+    def publish(self, camera, frame, timestamp, captured, detections):
+        """Called by a camera pipeline with its newest result (frame None when the camera stopped)"""
+        with self.condition:
+            if frame is None:
+                self.latest.pop(camera, None)
+            else:
+                self.latest[camera] = (frame, timestamp, captured, detections)
+            self.version += 1
+            self.condition.notify_all()
+
+    def read_timestamped(self, timeout=1.0):
+        """Wait for a new result from any camera; (ret, frame to display, newest timestamp)"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.version > self.read_version or not self.isOpened(),
+                                           timeout):
+                return False, None, 0.0
+            self.read_version = self.version
+            if not self.latest:
+                return False, None, 0.0
+            latest = dict(self.latest)
+
+        newest = max(timestamp for _, timestamp, _, _ in latest.values())
+        current = {}
+        for camera, (_, timestamp, _, camera_detections) in latest.items():
+            if newest - timestamp > self.max_age:
+                self.stale += 1
+                continue
+            current[camera] = camera_detections
+
+        if self.aligned:
+            detections = [detection for camera_detections in current.values() for detection in camera_detections]
+            display = latest.get(0) or latest[min(latest)]
+        else:
+            if not current.get(self.active_camera):
+                # Switch to the camera with the best detection, if any camera sees a hand
+                seeing = [camera for camera in current if current[camera]]
+                if seeing:
+                    best = max(seeing, key=lambda camera: max(d[4] for d in current[camera]))
+                    if best != self.active_camera:
+                        self.active_camera = best
+                        self.switches += 1
+            detections = current.get(self.active_camera, [])
+            display = latest.get(self.active_camera) or latest[min(latest)]
+
+        self.hands = merge_hands(detections, self.merge_distance, self.max_hands)
+        self.merged_away += sum(len(hand.cameras) - 1 for hand in self.hands)
+        self.results = ReplayResults([ReplayHandLandmarks(hand.landmarks) for hand in self.hands],
+                                     [ReplayHandedness(hand.label, hand.score) for hand in self.hands],
+                                     timestamp=newest)
+
+        self.reads += 1
+        self.age_time += time.perf_counter() - max(captured for _, _, captured, _ in latest.values())
+        return True, display[0], newest
+
+    def read(self):
+        ret, frame, _ = self.read_timestamped()
+        return ret, frame
+
+    def process(self, image):
+        """Merged hands of the last read (detection already ran in the camera pipelines)"""
+        return self.results
+
+    def isOpened(self):
+        return any(camera.running for camera in self.cameras) or self.version > self.read_version
+
+    def get(self, prop):
+        # Properties of the camera whose frames are shown
+        return self.cameras[0 if self.aligned else self.active_camera].cap.get(prop)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        """Stop every camera pipeline"""
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.start_time
+            self.cpu = time.process_time() - self.start_cpu
+        for camera in self.cameras:
+            camera.stop()
+
+    def get_stats(self):
+        """Return per-camera FPS and latency, merged reads, dedup counts and process CPU use"""
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.start_time
+        cpu = self.cpu if self.cpu is not None else time.process_time() - self.start_cpu
+        return {
+            'cameras': [camera.get_stats() for camera in self.cameras],
+            'reads': self.reads,
+            'read_fps': self.reads / elapsed if elapsed > 0 else 0.0,
+            'age_ms': self.age_time * 1000.0 / max(self.reads, 1),
+            'merged_away': self.merged_away,
+            'stale': self.stale,
+            'switches': self.switches,
+            'cpu_percent': cpu * 100.0 / elapsed if elapsed > 0 else 0.0
+        }
+
+    def print_report(self, title="Cameras"):
+        stats = self.get_stats()
+        print(f"{title}: {len(self.cameras)} cameras, {stats['reads']} merged reads ({stats['read_fps']:.1f}/s), "
+              f"{stats['age_ms']:.1f} ms from capture to merge, "
+              + (f"{stats['merged_away']} duplicate hands merged, " if self.aligned else
+                 f"not aligned (one camera at a time, {stats['switches']} switches), ")
+              + f"{stats['stale']} stale results left out, {stats['cpu_percent']:.0f}% CPU")
+        for index, camera in enumerate(stats['cameras']):
+            print(f"  camera {index}: {camera['frames']} frames ({camera['fps']:.1f} FPS), "
+                  f"{camera['inference_ms']:.2f} ms inference, {camera['latency_ms']:.1f} ms capture to publish, "
+                  f"bottleneck: {camera['bottleneck']}")
+
+
+def load_camera_transforms(path, count):
+    """Read per-camera 2x3 affine transforms from a JSON list (null = the camera needs none)
+
+    Each transform maps a camera's normalized landmark coordinates into the
+    first camera's, so the first entry is normally null.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or len(entries) != count:
+        raise ValueError(f"{path}: expected a list of {count} transforms, one per camera")
+    transforms = []
+    for index, entry in enumerate(entries):
+        if entry is None:
+            transforms.append(None)
+            continue
+        matrix = np.asarray(entry, dtype=np.float64)
+        if matrix.shape != (2, 3):
+            raise ValueError(f"{path}: transform {index} must be a 2x3 matrix or null")
+        transforms.append(matrix)
+    return transforms
+
+
+def add_camera_arguments(parser):
+    """Add the --cameras and --camera-transforms options to an argparse parser"""
+    parser.add_argument("--cameras", nargs="+", default=None, metavar="SOURCE",
+                        help="run one capture and hand-detection pipeline per source (camera index, "
+                             "video file, ...); replaces --source")
+    parser.add_argument("--camera-transforms", default=None, metavar="FILE",
+                        help="JSON list with a 2x3 affine per camera (null for none) mapping its normalized "
+                             "coordinates into the first camera's; with it hands from all cameras are merged, "
+                             "without it one camera is used at a time")
+    return parser
+
+
+def create_multi_camera(args, create_hands, hands_args=(), max_hands=2):
+    """MultiCameraHands from parsed --cameras, or None when it is not given"""
+    if not args.cameras:
+        return None
+    transforms = None
+    if getattr(args, "camera_transforms", None):
+        transforms = load_camera_transforms(args.camera_transforms, len(args.cameras))
+    return MultiCameraHands(args.cameras, create_hands, hands_args, mode=args.replay,
+                            inference_size=getattr(args, "inference_size", None), transforms=transforms,
+                            max_hands=max_hands)
+
+
+def main():
+    import argparse
+    import os
+    from frame_sources import REPLAY_FAST
+    from inference_pool import create_mediapipe_hands, create_simulated_hands
+
+    parser = argparse.ArgumentParser(description="CPU use and latency as cameras are added")
+    parser.add_argument("--cameras", nargs="+", default=["synthetic:640x480"] * 3, metavar="SOURCE",
+                        help="sources to add one at a time (video files stand in for cameras)")
+    parser.add_argument("--replay", choices=[REPLAY_REALTIME, REPLAY_FAST], default=REPLAY_REALTIME,
+                        help="pace recordings like cameras, or read them as fast as possible")
+    parser.add_argument("--max-hands", type=int, default=2)
+    parser.add_argument("--simulate-ms", type=float, default=0.0,
+                        help="replace MediaPipe with this much busy work per frame (0 = real MediaPipe)")
+    args = parser.parse_args()
+
+    if args.simulate_ms > 0:
+        create_hands, hands_args = create_simulated_hands, (args.simulate_ms,)
+    else:
+        create_hands, hands_args = create_mediapipe_hands, (args.max_hands,)
+
+    print(f"{os.cpu_count()} CPUs, {args.replay} replay, "
+          f"{'simulated %.0f ms' % args.simulate_ms if args.simulate_ms > 0 else 'MediaPipe'} inference")
+    print(f"{'cameras':<9}{'FPS/camera':>11}{'frames/s':>10}{'latency':>10}{'to merge':>10}{'CPU':>7}{'+CPU':>7}")
+    previous_cpu = 0.0
+    for count in range(1, len(args.cameras) + 1):
+        cameras = MultiCameraHands(args.cameras[:count], create_hands, hands_args, mode=args.replay,
+                                   max_hands=args.max_hands)
+        while cameras.isOpened():
+            cameras.read_timestamped()
+        cameras.release()
+        stats = cameras.get_stats()
+        per_camera = stats['cameras']
+        fps = [camera['fps'] for camera in per_camera]
+        latency = sum(camera['latency_ms'] for camera in per_camera) / count
+        print(f"{count:<9}{sum(fps) / count:>11.1f}{sum(fps):>10.1f}{latency:>8.1f}ms{stats['age_ms']:>8.1f}ms"
+              f"{stats['cpu_percent']:>6.0f}%{stats['cpu_percent'] - previous_cpu:>+6.0f}%")
+        previous_cpu = stats['cpu_percent']
+
+
+if __name__ == "__main__":
+    main()
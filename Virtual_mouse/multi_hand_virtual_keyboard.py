@@ -1,35 +1,70 @@
 import cv2
 import mediapipe as mp
-import numpy as np
 import time
-from pynput.keyboard import Key, Controller as KeyboardController
-import math
 import threading
 import tkinter as tk
 from tkinter import ttk
 import json
 import os
+from frame_capture import create_capture
+from frame_sources import add_source_arguments
+from perf_stats import StageTimer
+from display import create_window, set_window_property, show_frame, poll_key, close_window
+from landmark_trace import add_trace_arguments, ReplayHands, TraceRecorder
+from input_backends import add_input_arguments, create_backend, InputWorker
+from gestures import detect_hand_gesture
+from hand_landmarks import LandmarkBuffer, pointing_position, THUMB_TIP, THUMB_IP
+from keyboard_layout import OVERLAY_LAYOUTS, overlay_geometry
+from overlay_renderer import OverlayRenderer, rect_op, text_op, text_size
+from key_sprites import add_sprite_arguments, SpriteAtlas
+from overlay_compositor import OverlayCompositor
+from frame_buffers import FramePool
+from frame_preprocess import add_inference_arguments, FramePreprocessor
+from hand_roi import add_roi_arguments, RoiTracker
+from motion_gate import add_motion_arguments, create_motion_gate
+from landmark_tracker import add_tracking_arguments, LandmarkTracker
+from pipeline import add_pipeline_arguments, END, Pipeline
 
 class MultiHandOverlayKeyboard:
-    def __init__(self):
-        # Initialize MediaPipe with multi-hand support
+    def __init__(self, source=0, replay="realtime", record_trace=None, replay_trace=None,
+                 input_backend="pynput", inference_size=None, hand_roi=False,
+                 motion_gate=None, track_interval=0, pipelined=False, key_sprites=False, engine=None):
+        # MediaPipe hand solution (the detector is created below, only when this app runs detection)
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,  # Track both hands
-            min_detection_confidence=0.7,  # Slightly lower for better detection
-            min_tracking_confidence=0.5    # Lower for more stable tracking
-        )
         self.mp_draw = mp.solutions.drawing_utils
         
-        # Initialize keyboard controller
-        self.keyboard = KeyboardController()
+        # Reused (hands, 21, 3) landmark arrays
+        self.landmark_buffer = LandmarkBuffer(max_hands=2)
+        
+        # Initialize keyboard controller (key events run on a worker thread)
+        self.keyboard = InputWorker(create_backend(input_backend))
         
-        # Camera setup
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        # Camera setup (live sources are read on a background thread)
+        self.shared_engine = engine is not None
+        if self.shared_engine:
+            # Frames and hands from a VisionEngine shared with the other apps
+            self.cap = engine.subscribe("overlay keyboard")
+            self.hands = self.cap
+        else:
+            self.cap = create_capture(source, mode=replay, width=1280, height=720, fps=30)
+        
+        # Landmark trace recording / replay
+        self.replaying_trace = bool(replay_trace)
+        if replay_trace:
+            self.hands = ReplayHands(replay_trace)
+        elif not self.shared_engine:
+            # Initialize MediaPipe with multi-hand support
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=2,  # Track both hands
+                min_detection_confidence=0.7,  # Slightly lower for better detection
+                min_tracking_confidence=0.5    # Lower for more stable tracking
+            )
+        self.trace_recorder = None
+        if record_trace:
+            self.trace_recorder = TraceRecorder(record_trace,
+                                                int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                                int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
         
         # Multi-hand settings
         self.multi_hand_settings = {
@@ -49,22 +84,7 @@ class MultiHandOverlayKeyboard:
         
         # Keyboard layouts
         self.current_layout = "letters"
-        self.keyboard_layouts = {
-            "letters": [
-                ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P'],
-                ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L'],
-                ['Z', 'X', 'C', 'V', 'B', 'N', 'M'],
-                ['SPACE', 'BACKSPACE', 'ENTER', 'NUMBERS'],
-                ['POINT', 'PINCH', 'BOTH', 'QUIT']
-            ],
-            "numbers": [
-                ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0'],
-                ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')'],
-                ['-', '=', '[', ']', ';', "'", ',', '.', '/'],
-                ['SPACE', 'BACKSPACE', 'ENTER', 'LETTERS'],
-                ['POINT', 'PINCH', 'BOTH', 'QUIT']
-            ]
-        }
+        self.keyboard_layouts = OVERLAY_LAYOUTS
         
         # Display settings with full overlay support
         self.display_settings = {
@@ -110,6 +130,43 @@ class MultiHandOverlayKeyboard:
         # Stable overlay to prevent flickering
         self.overlay_cache = None
         self.overlay_dirty = True
+        self.key_sprites = SpriteAtlas() if key_sprites else None  # Pre-rasterized key tiles (opt-in)
+        self.overlay_renderer = OverlayRenderer(sprites=self.key_sprites)  # Redraws only the keys whose state changed
+        self.frame_buffers = FramePool()  # Per-frame arrays are reused instead of reallocated
+        self.preprocess = FramePreprocessor(self.frame_buffers, inference_size)  # Mirror + RGB in one pass
+        self.overlay_compositor = OverlayCompositor(self.frame_buffers)  # Blends only where the overlay has content
+        
+        # Detection on a crop around each tracked hand (not needed when replaying landmarks)
+        self.hand_roi = None
+        if hand_roi and not self.replaying_trace and not self.shared_engine:
+            self.hand_roi = RoiTracker(lambda: self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=1,
+                min_detection_confidence=0.7,
+                min_tracking_confidence=0.5
+            ), max_hands=2, buffers=self.frame_buffers)
+        
+        # Reuse the last result on frames without motion (replayed landmarks must stay in step)
+        self.motion_gate = motion_gate if not self.replaying_trace and not self.shared_engine else None
+        
+        # Optical-flow landmarks between detections every track_interval frames
+        self.landmark_tracker = None
+        if track_interval > 1 and not self.replaying_trace and not self.shared_engine:
+            self.landmark_tracker = LandmarkTracker(track_interval, buffers=self.frame_buffers)
+        
+        # Capture / inference / decision / render on their own threads (see run())
+        self.pipelined = pipelined
+        self.pipeline = Pipeline([
+            ("capture", self.capture_stage),
+            ("inference", self.inference_stage),
+            ("decision", self.decision_stage),
+            ("render", self.render_stage)
+        ])
+        self.preprocessors = [self.preprocess]
+        self.frames_captured = 0
+
+        # Compiled key geometry (cached per layout, frame size and keyboard size)
+        self.key_geometry = None
         
         # Control flags
         self.running = True
@@ -375,6 +432,9 @@ KEYBOARD SHORTCUTS:
     def toggle_multi_hand(self):
         """Toggle multi-hand tracking"""
         self.multi_hand_settings["enabled"] = self.multi_hand_var.get()
+        if self.replaying_trace or self.shared_engine:
+            # Recorded or shared landmarks are used as-is
+            return
         # Update MediaPipe settings
         max_hands = 2 if self.multi_hand_settings["enabled"] else 1
         self.hands = self.mp_hands.Hands(
@@ -383,6 +443,13 @@ KEYBOARD SHORTCUTS:
             min_detection_confidence=0.7,
             min_tracking_confidence=0.5
         )
+        if self.hand_roi:
+            self.hand_roi.max_hands = max_hands
+            self.hand_roi.reset()
+        if self.motion_gate:
+            self.motion_gate.reset()
+        if self.landmark_tracker:
+            self.landmark_tracker.reset()
         print(f"Multi-hand tracking: {self.multi_hand_settings['enabled']}")
     
     def toggle_simultaneous_typing(self):
@@ -449,12 +516,19 @@ KEYBOARD SHORTCUTS:
         """Recalibrate hand tracking parameters"""
         print("Recalibrating hand tracking...")
         # Recreate the hands object with adjusted parameters
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
-        )
+        if not self.replaying_trace and not self.shared_engine:
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=2,
+                min_detection_confidence=0.7,
+                min_tracking_confidence=0.5
+            )
+        if self.hand_roi:
+            self.hand_roi.reset()
+        if self.motion_gate:
+            self.motion_gate.reset()
+        if self.landmark_tracker:
+            self.landmark_tracker.reset()
         # Reset hand states
         for hand_label in ["left", "right"]:
             self.hand_states[hand_label]["gesture"] = "none"
@@ -462,60 +536,29 @@ KEYBOARD SHORTCUTS:
         
         self.status_label.config(text="Recalibrated hand tracking")
     
-    def calculate_distance(self, point1, point2):
-        """Calculate distance between two points"""
-        return math.sqrt((point1.x - point2.x)**2 + (point1.y - point2.y)**2)
+    def detect_hands(self, rgb_frame):
+        """Run hand detection on the full frame or on the tracked hand crops"""
+        if self.hand_roi:
+            return self.hand_roi.process(rgb_frame, self.hands)
+        return self.hands.process(rgb_frame)
+    
+    def track_hands(self, rgb_frame):
+        """Detect hands, or follow the last detected landmarks with optical flow"""
+        if self.landmark_tracker:
+            return self.landmark_tracker.process(rgb_frame, self.detect_hands)
+        return self.detect_hands(rgb_frame)
     
     def detect_hand_gesture(self, landmarks):
         """Detect gesture for a single hand with improved accuracy"""
-        if not landmarks:
-            return "none"
-        
-        # Get key points
-        thumb_tip = landmarks[4]
-        thumb_ip = landmarks[3]
-        index_tip = landmarks[8]
-        index_pip = landmarks[6]
-        index_mcp = landmarks[5]
-        middle_tip = landmarks[12]
-        middle_pip = landmarks[10]
-        ring_tip = landmarks[16]
-        ring_pip = landmarks[14]
-        pinky_tip = landmarks[20]
-        pinky_pip = landmarks[18]
-        
-        # Calculate relative positions (more robust than absolute y coordinates)
-        index_extended = (index_tip.y < index_pip.y) and (index_tip.y < index_mcp.y)
-        middle_extended = middle_tip.y < middle_pip.y
-        ring_extended = ring_tip.y < ring_pip.y
-        pinky_extended = pinky_tip.y < pinky_pip.y
-        
-        # Calculate thumb-index distance for pinch
-        thumb_index_dist = self.calculate_distance(thumb_tip, index_tip)
-        
-        # Gesture classification with improved logic
-        if thumb_index_dist < 0.06:  # Slightly more lenient pinch threshold
-            return "pinch"
-        elif index_extended and not middle_extended and not ring_extended and not pinky_extended:
-            # Only index finger extended - POINT gesture
-            return "point"
-        elif not index_extended and not middle_extended and not ring_extended and not pinky_extended:
-            # All fingers closed - FIST gesture
-            return "fist"
-        else:
-            return "none"
+        return detect_hand_gesture(landmarks)
     
     def get_hand_pointing_position(self, landmarks, frame_shape):
-        """Get index finger tip position for a hand"""
-        if landmarks:
-            index_tip = landmarks[8]
-            h, w = frame_shape[:2]
-            x = int(index_tip.x * w)
-            y = int(index_tip.y * h)
-            return (x, y)
+        """Get index finger tip position for a (21, 3) hand"""
+        if landmarks is not None:
+            return pointing_position(landmarks, frame_shape)
         return None
     
-    def determine_hand_label(self, hand_landmarks, handedness):
+    def determine_hand_label(self, landmarks, handedness):
         """Determine if hand is left or right"""
         if handedness and len(handedness.classification) > 0:
             # MediaPipe returns "Left" or "Right" from camera perspective
@@ -524,117 +567,80 @@ KEYBOARD SHORTCUTS:
             return label.lower()
         
         # Fallback: determine by thumb position
-        thumb_tip = hand_landmarks.landmark[4]
-        thumb_ip = hand_landmarks.landmark[3]
-        
-        if thumb_tip.x > thumb_ip.x:
+        if landmarks[THUMB_TIP, 0] > landmarks[THUMB_IP, 0]:
             return "right"
         else:
             return "left"
     
     def create_fullscreen_overlay(self, frame_shape):#here5/10/2025
         """Create fullscreen keyboard overlay with multi-hand indicators and improved bottom row detection"""
+        return self.overlay_renderer.render(frame_shape, self.overlay_items(frame_shape))
+    
+    def overlay_items(self, frame_shape):
+        """Draw ops of every key and indicator, one item each, in drawing order"""
         h, w = frame_shape[:2]
-        overlay = np.zeros((h, w, 3), dtype=np.uint8)
+        items = []
         
         layout = self.keyboard_layouts[self.current_layout]
         
-        # Calculate keyboard dimensions with better spacing
-        keyboard_height = int(h * self.display_settings["keyboard_size"])
-        keyboard_width = int(w * 0.95)  # Slightly wider for better key spacing
-        
-        # Move keyboard up to ensure bottom rows are more accessible
-        keyboard_start_y = int(h * 0.35)  # Start at 35% from top instead of bottom-based
-        keyboard_start_x = (w - keyboard_width) // 2
+        # Key rectangles (cached, so only a new layout or size recomputes them)
+        geometry = overlay_geometry(layout, frame_shape, self.display_settings["keyboard_size"])
+        self.key_geometry = geometry
+        total_rows = geometry.total_rows
         
-        # Calculate key dimensions with improved spacing
-        total_rows = len(layout)
-        key_height = (keyboard_height - 20) // total_rows  # Account for row spacing
-        
-        self.key_positions = {}
-        
-        for row_idx, row in enumerate(layout):
-            # Add spacing between rows
-            row_y = keyboard_start_y + (row_idx * (key_height + 4))
+        for key, (key_x, key_y, key_w, key_h), row_idx in zip(geometry.keys, geometry.rects.tolist(),
+                                                              geometry.rows.tolist()):
             
-            # Calculate key width for this specific row
-            row_key_width = (keyboard_width - 20) // len(row)  # Account for key spacing
+            # Determine key color based on selection state
+            color = (50, 50, 50)  # Default gray
+            border_color = (255, 255, 255)  # Default white border
             
-            # Center the row
-            row_start_x = keyboard_start_x + (keyboard_width - (len(row) * row_key_width)) // 2
+            # Check if key is selected by either hand
+            left_selected = self.hand_states["left"]["selected_key"] == key
+            right_selected = self.hand_states["right"]["selected_key"] == key
             
-            for col_idx, key in enumerate(row):
-                key_x = row_start_x + (col_idx * row_key_width)
-                
-                # Store key position with improved bounds
-                self.key_positions[key] = {
-                    'x': key_x + 2,
-                    'y': row_y + 2,
-                    'width': row_key_width - 4,
-                    'height': key_height - 4,
-                    'row': row_idx,  # Store row index for better mapping
-                    'col': col_idx   # Store column index for better mapping
-                }
-                
-                # Determine key color based on selection state
-                color = (50, 50, 50)  # Default gray
-                border_color = (255, 255, 255)  # Default white border
-                
-                # Check if key is selected by either hand
-                left_selected = self.hand_states["left"]["selected_key"] == key
-                right_selected = self.hand_states["right"]["selected_key"] == key
-                
-                if left_selected and right_selected:
-                    color = (128, 0, 128)  # Purple for both hands
-                    border_color = (255, 0, 255)
-                elif left_selected:
-                    color = (100, 0, 0)  # Dark blue for left hand
-                    border_color = (255, 0, 0)
-                elif right_selected:
-                    color = (0, 0, 100)  # Dark red for right hand
-                    border_color = (0, 0, 255)
-                elif key in ['POINT', 'PINCH', 'BOTH']:
-                    if (key.lower() == self.current_input_mode or 
-                        (key == 'BOTH' and self.current_input_mode == 'both')):
-                        color = (0, 255, 0)  # Green for active mode
-                        border_color = (0, 255, 0)
-                    else:
-                        color = (100, 100, 0)  # Dark yellow for mode buttons
-                elif key == 'QUIT':
-                    color = (0, 0, 150)  # Dark red for quit
-                elif key in ['SPACE', 'BACKSPACE', 'ENTER']:
-                    color = (100, 100, 100)  # Gray for special keys
-                elif key in ['NUMBERS', 'LETTERS']:
-                    color = (0, 100, 200)  # Blue for layout switch
-                
-                # Make bottom row keys more visible
-                if row_idx >= total_rows - 2:  # Last two rows
-                    border_color = (0, 255, 255)  # Cyan border for bottom rows
-                    # Slightly brighter color for bottom rows
-                    color = (min(color[0] + 30, 255), min(color[1] + 30, 255), min(color[2] + 30, 255))
-                
-                # Draw key background
-                cv2.rectangle(overlay, 
-                            (key_x + 2, row_y + 2), 
-                            (key_x + row_key_width - 2, row_y + key_height - 2), 
-                            color, -1)
-                
-                # Draw key border
-                cv2.rectangle(overlay, 
-                            (key_x + 2, row_y + 2), 
-                            (key_x + row_key_width - 2, row_y + key_height - 2), 
-                            border_color, 3)  # Thicker border for better visibility
-                
-                # Draw key text with better sizing
-                font_scale = min(row_key_width, key_height) / 100.0
-                font_scale = max(0.5, min(font_scale, 1.2))
-                
-                text_size = cv2.getTextSize(key, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 2)[0]
-                text_x = key_x + (row_key_width - text_size[0]) // 2
-                text_y = row_y + (key_height + text_size[1]) // 2
-                
-                cv2.putText(overlay, key, (text_x, text_y), 
-                          cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 2)
+            if left_selected and right_selected:
+                color = (128, 0, 128)  # Purple for both hands
+                border_color = (255, 0, 255)
+            elif left_selected:
+                color = (100, 0, 0)  # Dark blue for left hand
+                border_color = (255, 0, 0)
+            elif right_selected:
+                color = (0, 0, 100)  # Dark red for right hand
+                border_color = (0, 0, 255)
+            elif key in ['POINT', 'PINCH', 'BOTH']:
+                if (key.lower() == self.current_input_mode or 
+                    (key == 'BOTH' and self.current_input_mode == 'both')):
+                    color = (0, 255, 0)  # Green for active mode
+                    border_color = (0, 255, 0)
+                else:
+                    color = (100, 100, 0)  # Dark yellow for mode buttons
+            elif key == 'QUIT':
+                color = (0, 0, 150)  # Dark red for quit
+            elif key in ['SPACE', 'BACKSPACE', 'ENTER']:
+                color = (100, 100, 100)  # Gray for special keys
+            elif key in ['NUMBERS', 'LETTERS']:
+                color = (0, 100, 200)  # Blue for layout switch
+            
+            # Make bottom row keys more visible
+            if row_idx >= total_rows - 2:  # Last two rows
+                border_color = (0, 255, 255)  # Cyan border for bottom rows
+                # Slightly brighter color for bottom rows
+                color = (min(color[0] + 30, 255), min(color[1] + 30, 255), min(color[2] + 30, 255))
+            
+            # Key text with better sizing
+            font_scale = min(key_w + 4, key_h + 4) / 100.0
+            font_scale = max(0.5, min(font_scale, 1.2))
+            
+            text_w, text_h = text_size(key, font_scale, 2)[0]
+            text_x = key_x - 2 + (key_w + 4 - text_w) // 2
+            text_y = key_y - 2 + (key_h + 4 + text_h) // 2
+            
+            items.append((
+                rect_op(key_x, key_y, key_x + key_w, key_y + key_h, color, -1),  # Key background
+                rect_op(key_x, key_y, key_x + key_w, key_y + key_h, border_color, 3),  # Thicker border for better visibility
+                text_op(key, text_x, text_y, font_scale, (255, 255, 255), 2)
+            ))
         
         # Draw mode and multi-hand indicators
         if self.show_mode_indicator:
@@ -643,61 +649,24 @@ KEYBOARD SHORTCUTS:
             duration_text = f"Hold Duration: {self.selection_duration}s"
             bg_mode_text = f"Background: {'ON' if self.display_settings['background_mode'] else 'OFF'}"
             
-            cv2.putText(overlay, mode_text, (20, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-            cv2.putText(overlay, multi_hand_text, (20, 60), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-            cv2.putText(overlay, duration_text, (20, 90), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-            cv2.putText(overlay, bg_mode_text, (20, 120), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if self.display_settings['background_mode'] else (255, 0, 0), 2)
+            items.append((text_op(mode_text, 20, 30, 0.8, (0, 255, 255), 2),))
+            items.append((text_op(multi_hand_text, 20, 60, 0.7, (255, 255, 0), 2),))
+            items.append((text_op(duration_text, 20, 90, 0.6, (255, 255, 0), 2),))
+            items.append((text_op(bg_mode_text, 20, 120, 0.6,
+                                  (0, 255, 0) if self.display_settings['background_mode'] else (255, 0, 0), 2),))
             
             # Add help text for recalibration
-            cv2.putText(overlay, "Press 'R' to recalibrate hand tracking", (w - 400, h - 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
+            items.append((text_op("Press 'R' to recalibrate hand tracking", w - 400, h - 30, 0.6, (200, 200, 200), 2),))
         
-        return overlay
+        return items
     
     def map_point_to_key(self, point):
         """Map screen point to keyboard key with improved accuracy for all rows"""
-        if not point or not hasattr(self, 'key_positions'):
+        if not point or self.key_geometry is None:
             return None
         
-        x, y = point
-        
-        # Find the closest key to the pointing position
-        closest_key = None
-        min_distance = float('inf')
-        
-        for key, pos in self.key_positions.items():
-            # Calculate center of key
-            key_center_x = pos['x'] + pos['width'] / 2
-            key_center_y = pos['y'] + pos['height'] / 2
-            
-            # Calculate distance to key center
-            distance = math.sqrt((x - key_center_x)**2 + (y - key_center_y)**2)
-            
-            # Apply row-based weighting (give more weight to bottom rows)
-            row_weight = 1.0
-            if 'row' in pos:
-                # Bottom rows get more weight (easier to select)
-                if pos['row'] >= len(self.keyboard_layouts[self.current_layout]) - 2:
-                    row_weight = 1.3  # 30% easier to select bottom rows
-            
-            # Apply weighted distance
-            weighted_distance = distance / row_weight
-            
-            # Update closest key if this one is closer
-            if weighted_distance < min_distance:
-                min_distance = weighted_distance
-                closest_key = key
-        
-        # Only return the key if it's within a reasonable distance
-        max_distance = 50  # Maximum distance to consider a key selection
-        if min_distance <= max_distance:
-            return closest_key
-        
-        return None
+        # Label image lookup (row weighting and the 50 px cutoff are built in)
+        return self.key_geometry.key_at(point)
     
     def can_type_key(self, key):
         """Check if key can be typed"""
@@ -746,14 +715,11 @@ KEYBOARD SHORTCUTS:
         
         try:
             if key == 'SPACE':
-                self.keyboard.press(Key.space)
-                self.keyboard.release(Key.space)
+                self.keyboard.press_key('space')
             elif key == 'BACKSPACE':
-                self.keyboard.press(Key.backspace)
-                self.keyboard.release(Key.backspace)
+                self.keyboard.press_key('backspace')
             elif key == 'ENTER':
-                self.keyboard.press(Key.enter)
-                self.keyboard.release(Key.enter)
+                self.keyboard.press_key('enter')
             elif key == 'NUMBERS':
                 self.current_layout = "numbers"
                 self.overlay_dirty = True
@@ -763,7 +729,7 @@ KEYBOARD SHORTCUTS:
                 self.overlay_dirty = True
                 return True
             else:
-                self.keyboard.type(key.lower())
+                self.keyboard.type_text(key.lower())
             
             # Update last typed key info
             self.last_typed_key = key
@@ -1015,6 +981,218 @@ KEYBOARD SHORTCUTS:
                     self.hand_states[hand_label]["selected_key"] = None
                     self.overlay_dirty = True
     
+    def capture_stage(self, item=None):
+        """Read the next frame; None if none is ready, END when the source is finished"""
+        if not self.running:
+            return END
+        ret, frame = self.cap.read()
+        if not ret:
+            # Recorded source finished
+            return None if self.cap.isOpened() else END
+        
+        if self.shared_engine:
+            # The engine's frame is already mirrored and is what its hands are looked up by
+            # (render_stage only reads it)
+            return {"frame": frame, "rgb": frame}
+        
+        # Mirrored RGB for inference in one pass, mirrored BGR for display
+        preprocess = self.preprocessors[self.frames_captured % len(self.preprocessors)]
+        self.frames_captured += 1
+        rgb_frame = preprocess.inference_input(frame)
+        return {"frame": preprocess.display_frame(), "rgb": rgb_frame}
+    
+    def inference_stage(self, item):
+        """Run hand detection on a captured frame"""
+        with self.timer.stage("inference"):
+            if self.motion_gate:
+                results = self.motion_gate.process(item["rgb"], self.track_hands)
+            else:
+                results = self.track_hands(item["rgb"])
+        if self.trace_recorder:
+            self.trace_recorder.record(results)
+        item["results"] = results
+        return item
+    
+    def decision_stage(self, item):
+        """Classify each hand's gesture and act on it (typing, key selection)"""
+        results = item["results"]
+        frame = item["frame"]
+        hand_data = []
+        
+        if results.multi_hand_landmarks and results.multi_handedness:
+            hand_arrays = self.landmark_buffer.update(results)
+            for hand_landmarks, handedness, landmarks in zip(results.multi_hand_landmarks,
+                                                             results.multi_handedness, hand_arrays):
+                # Determine hand label
+                hand_label = self.determine_hand_label(landmarks, handedness)
+                
+                # Detect gesture and pointing position
+                gesture = self.detect_hand_gesture(landmarks)
+                pointing_pos = self.get_hand_pointing_position(landmarks, frame.shape)
+                
+                hand_data.append({
+                    "label": hand_label,
+                    "gesture": gesture,
+                    "pointing_pos": pointing_pos,
+                    "landmarks": landmarks,
+                    "hand_landmarks": hand_landmarks
+                })
+        
+        # Update status labels
+        left_gesture = "none"
+        right_gesture = "none"
+        
+        for hand_info in hand_data:
+            if hand_info["label"] == "left":
+                left_gesture = hand_info["gesture"]
+            elif hand_info["label"] == "right":
+                right_gesture = hand_info["gesture"]
+        
+        self.left_hand_status.config(text=f"Left Hand: {left_gesture}")
+        self.right_hand_status.config(text=f"Right Hand: {right_gesture}")
+        
+        # Process multi-hand gestures
+        if self.multi_hand_settings["enabled"]:
+            self.process_multi_hand_gestures(hand_data)
+        else:
+            # Single hand mode - use first detected hand
+            if hand_data:
+                self.process_multi_hand_gestures([hand_data[0]])
+        
+        item["hand_data"] = hand_data
+        return item
+    
+    def render_stage(self, item):
+        """Compose, show and handle keys for one frame; END when the user quits"""
+        timer = self.timer
+        frame = item["frame"]
+        hand_data = item["hand_data"]
+        h, w = frame.shape[:2]
+        
+        # Create a transparent base frame for background mode
+        if self.display_settings["background_mode"]:
+            # Create transparent background
+            display_frame = self.frame_buffers.zeros("background", (h, w, 4))  # RGBA
+            display_frame[:, :, 3] = int(255 * self.display_settings["window_transparency"])  # Alpha channel
+        else:
+            # Use camera feed with adjusted transparency
+            display_frame = self.frame_buffers.copy("display", frame)
+        
+        # Draw hand landmarks if camera is visible
+        if self.display_settings["show_camera"]:
+            for hand_info in hand_data:
+                # Use different colors for different hands
+                if hand_info["label"] == "left":
+                    landmark_color = (255, 0, 0)  # Blue for left
+                    connection_color = (200, 0, 0)
+                else:
+                    landmark_color = (0, 0, 255)  # Red for right
+                    connection_color = (0, 0, 200)
+                
+                self.mp_draw.draw_landmarks(
+                    display_frame, hand_info["hand_landmarks"], self.mp_hands.HAND_CONNECTIONS,
+                    landmark_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
+                        color=landmark_color, thickness=1, circle_radius=1),
+                    connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
+                        color=connection_color, thickness=1)
+                )
+        
+        # Create or update overlay if needed (cleared first, so a key typed meanwhile redraws it again)
+        if self.overlay_dirty or self.overlay_cache is None:
+            self.overlay_dirty = False
+            with timer.stage("overlay"):
+                self.overlay_cache = self.create_fullscreen_overlay(frame.shape)
+                self.overlay_compositor.set_overlay(self.overlay_cache)
+        
+        # Handle display modes
+        if self.display_settings["background_mode"]:
+            # Background mode - show only keyboard overlay with transparency
+            if not self.display_settings["show_camera"]:
+                # Blend overlay with a black background
+                alpha = self.display_settings["window_alpha"]
+                with timer.stage("composite"):
+                    display_frame = self.overlay_compositor.composite(None, alpha)
+            else:
+                # Blend camera with overlay
+                alpha = self.display_settings["window_alpha"]
+                display_frame = cv2.addWeighted(display_frame, 1-alpha, self.overlay_cache, alpha, 0)
+        else:
+            # Normal mode - blend overlay with camera (None shows only the overlay)
+            background = frame if self.display_settings["show_camera"] else None
+            
+            if self.keyboard_visible:
+                alpha = self.display_settings["window_alpha"]
+                with timer.stage("composite"):
+                    display_frame = self.overlay_compositor.composite(background, alpha)
+            elif background is not None:
+                display_frame = self.frame_buffers.copy("display", frame)
+            else:
+                display_frame = self.frame_buffers.zeros("display", frame.shape)
+        
+        # Draw multi-hand indicators
+        if hand_data:
+            self.draw_multi_hand_indicators(display_frame, hand_data)
+        
+        # Draw status information
+        self.draw_status_info(display_frame)
+        
+        # Show frame
+        show_frame('Multi-Hand Gesture Keyboard Overlay', display_frame)
+        
+        # Set window properties
+        if self.display_settings["always_on_top"]:
+            set_window_property('Multi-Hand Gesture Keyboard Overlay', cv2.WND_PROP_TOPMOST, 1)
+        
+        # Update window transparency (platform-specific)
+        try:
+            # For Windows
+            import ctypes
+            hwnd = ctypes.windll.user32.FindWindowW(None, 'Multi-Hand Gesture Keyboard Overlay')
+            if hwnd:
+                ctypes.windll.user32.SetLayeredWindowAttributes(
+                    hwnd, 0, int(255 * self.display_settings["window_transparency"]), 2)  # LWA_ALPHA
+        except:
+            pass  # Silently fail if not supported
+        
+        timer.frame_done()
+        self.frame_buffers.frame_done()
+        
+        # Handle key presses
+        key_pressed = poll_key('Multi-Hand Gesture Keyboard Overlay', 1)
+        if key_pressed == ord('q'):
+            return END
+        elif key_pressed == ord('h'):
+            self.show_help = not self.show_help
+        elif key_pressed == ord('k'):
+            self.keyboard_visible = not self.keyboard_visible
+        elif key_pressed == ord('t'):
+            # Toggle transparency with hotkey
+            new_transparency = 0.3 if self.display_settings["window_transparency"] > 0.5 else 0.8
+            self.display_settings["window_transparency"] = new_transparency
+            self.window_transparency_var.set(new_transparency)#here 8/10/2025
+        elif key_pressed == ord('r'):
+            self.recalibrate_hand_tracking()
+        elif key_pressed == ord('b'):
+            # Toggle background mode
+            self.display_settings["background_mode"] = not self.display_settings["background_mode"]
+            self.bg_mode_var.set(self.display_settings["background_mode"])
+            print(f"Background mode: {self.display_settings['background_mode']}")
+        elif key_pressed == ord('c'):
+            # Toggle camera display
+            self.display_settings["show_camera"] = not self.display_settings["show_camera"]
+            self.show_camera_var.set(self.display_settings["show_camera"])
+            print(f"Show camera: {self.display_settings['show_camera']}")
+        elif key_pressed == ord('m'):
+            # Toggle multi-hand mode
+            self.multi_hand_settings["enabled"] = not self.multi_hand_settings["enabled"]
+            self.multi_hand_var.set(self.multi_hand_settings["enabled"])
+            self.toggle_multi_hand()
+        elif key_pressed == ord('d'):
+            # Toggle debug mode
+            self.debug_mode = not self.debug_mode
+            print(f"Debug mode: {self.debug_mode}")
+        return item
+    
     def run(self):
         """Main application loop with multi-hand overlay support"""
         print("Starting Multi-Hand Overlay Gesture Keyboard...")
@@ -1023,10 +1201,10 @@ KEYBOARD SHORTCUTS:
         print("Use the control window to change settings!")
         
         # Create camera window with transparency support
-        cv2.namedWindow('Multi-Hand Gesture Keyboard Overlay', cv2.WINDOW_NORMAL)
+        create_window('Multi-Hand Gesture Keyboard Overlay', cv2.WINDOW_NORMAL)
         
         # Set initial window properties
-        cv2.setWindowProperty('Multi-Hand Gesture Keyboard Overlay', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_NORMAL)
+        set_window_property('Multi-Hand Gesture Keyboard Overlay', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_NORMAL)
         
         # Enable transparency (platform-specific)
         try:
@@ -1040,184 +1218,71 @@ KEYBOARD SHORTCUTS:
         except Exception as e:
             print(f"Window transparency might not be fully supported on this platform: {e}")
             print("Using alternative transparency method...")
+        self.timer = StageTimer()
         #here 7/10/2025 4:51
-        while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                continue
-            
-            # Flip frame for mirror effect
-            frame = cv2.flip(frame, 1)
-            h, w = frame.shape[:2]
-            
-            # Create a transparent base frame for background mode
-            if self.display_settings["background_mode"]:
-                # Create transparent background
-                display_frame = np.zeros((h, w, 4), dtype=np.uint8)  # RGBA
-                display_frame[:, :, 3] = int(255 * self.display_settings["window_transparency"])  # Alpha channel
-            else:
-                # Use camera feed with adjusted transparency
-                display_frame = frame.copy()
-            
-            # Process hand detection
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.hands.process(rgb_frame)
-            
-            hand_data = []
-            
-            if results.multi_hand_landmarks and results.multi_handedness:
-                for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-                    # Determine hand label
-                    hand_label = self.determine_hand_label(hand_landmarks, handedness)
-                    
-                    # Draw hand landmarks if camera is visible
-                    if self.display_settings["show_camera"]:
-                        # Use different colors for different hands
-                        if hand_label == "left":
-                            landmark_color = (255, 0, 0)  # Blue for left
-                            connection_color = (200, 0, 0)
-                        else:
-                            landmark_color = (0, 0, 255)  # Red for right
-                            connection_color = (0, 0, 200)
-                        
-                        self.mp_draw.draw_landmarks(
-                            display_frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS,
-                            landmark_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                                color=landmark_color, thickness=1, circle_radius=1),
-                            connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
-                                color=connection_color, thickness=1)
-                        )
-                    
-                    # Detect gesture and pointing position
-                    gesture = self.detect_hand_gesture(hand_landmarks.landmark)
-                    pointing_pos = self.get_hand_pointing_position(hand_landmarks.landmark, frame.shape)
-                    
-                    hand_data.append({
-                        "label": hand_label,
-                        "gesture": gesture,
-                        "pointing_pos": pointing_pos,
-                        "landmarks": hand_landmarks
-                    })
-            
-            # Update status labels
-            left_gesture = "none"
-            right_gesture = "none"
-            
-            for hand_info in hand_data:
-                if hand_info["label"] == "left":
-                    left_gesture = hand_info["gesture"]
-                elif hand_info["label"] == "right":
-                    right_gesture = hand_info["gesture"]
-            
-            self.left_hand_status.config(text=f"Left Hand: {left_gesture}")
-            self.right_hand_status.config(text=f"Right Hand: {right_gesture}")
-            
-            # Process multi-hand gestures
-            if self.multi_hand_settings["enabled"]:
-                self.process_multi_hand_gestures(hand_data)
-            else:
-                # Single hand mode - use first detected hand
-                if hand_data:
-                    self.process_multi_hand_gestures([hand_data[0]])
-            
-            # Create or update overlay if needed
-            if self.overlay_dirty or self.overlay_cache is None:
-                self.overlay_cache = self.create_fullscreen_overlay(frame.shape)
-                self.overlay_dirty = False
-            
-            # Handle display modes
-            if self.display_settings["background_mode"]:
-                # Background mode - show only keyboard overlay with transparency
-                if not self.display_settings["show_camera"]:
-                    # Create a semi-transparent black background
-                    bg = np.zeros_like(frame)
-                    # Blend overlay with transparent background
-                    alpha = self.display_settings["window_alpha"]
-                    display_frame = cv2.addWeighted(bg, 1-alpha, self.overlay_cache, alpha, 0)
-                else:
-                    # Blend camera with overlay
-                    alpha = self.display_settings["window_alpha"]
-                    display_frame = cv2.addWeighted(display_frame, 1-alpha, self.overlay_cache, alpha, 0)
-            else:
-                # Normal mode - blend overlay with camera
-                if self.display_settings["show_camera"]:
-                    display_frame = frame.copy()
-                else:
-                    # Show only overlay without camera
-                    display_frame = np.zeros_like(frame)
-                
-                if self.keyboard_visible:
-                    alpha = self.display_settings["window_alpha"]
-                    display_frame = cv2.addWeighted(display_frame, 1-alpha, self.overlay_cache, alpha, 0)
-            
-            # Draw multi-hand indicators
-            if hand_data:
-                self.draw_multi_hand_indicators(display_frame, hand_data)
-            
-            # Draw status information
-            self.draw_status_info(display_frame)
-            
-            # Show frame
-            cv2.imshow('Multi-Hand Gesture Keyboard Overlay', display_frame)
-            
-            # Set window properties
-            if self.display_settings["always_on_top"]:
-                cv2.setWindowProperty('Multi-Hand Gesture Keyboard Overlay', cv2.WND_PROP_TOPMOST, 1)
-            
-            # Update window transparency (platform-specific)
-            try:
-                # For Windows
-                import ctypes
-                hwnd = ctypes.windll.user32.FindWindowW(None, 'Multi-Hand Gesture Keyboard Overlay')
-                if hwnd:
-                    ctypes.windll.user32.SetLayeredWindowAttributes(
-                        hwnd, 0, int(255 * self.display_settings["window_transparency"]), 2)  # LWA_ALPHA
-            except:
-                pass  # Silently fail if not supported
-            
-            # Handle key presses
-            key_pressed = cv2.waitKey(1) & 0xFF
-            if key_pressed == ord('q'):
-                break
-            elif key_pressed == ord('h'):
-                self.show_help = not self.show_help
-            elif key_pressed == ord('k'):
-                self.keyboard_visible = not self.keyboard_visible
-            elif key_pressed == ord('t'):
-                # Toggle transparency with hotkey
-                new_transparency = 0.3 if self.display_settings["window_transparency"] > 0.5 else 0.8
-                self.display_settings["window_transparency"] = new_transparency
-                self.window_transparency_var.set(new_transparency)#here 8/10/2025
-            elif key_pressed == ord('r'):
-                self.recalibrate_hand_tracking()
-            elif key_pressed == ord('b'):
-                # Toggle background mode
-                self.display_settings["background_mode"] = not self.display_settings["background_mode"]
-                self.bg_mode_var.set(self.display_settings["background_mode"])
-                print(f"Background mode: {self.display_settings['background_mode']}")
-            elif key_pressed == ord('c'):
-                # Toggle camera display
-                self.display_settings["show_camera"] = not self.display_settings["show_camera"]
-                self.show_camera_var.set(self.display_settings["show_camera"])
-                print(f"Show camera: {self.display_settings['show_camera']}")
-            elif key_pressed == ord('m'):
-                # Toggle multi-hand mode
-                self.multi_hand_settings["enabled"] = not self.multi_hand_settings["enabled"]
-                self.multi_hand_var.set(self.multi_hand_settings["enabled"])
-                self.toggle_multi_hand()
-            elif key_pressed == ord('d'):
-                # Toggle debug mode
-                self.debug_mode = not self.debug_mode
-                print(f"Debug mode: {self.debug_mode}")
+        if not self.pipelined:
+            while self.running:
+                item = self.capture_stage()
+                if item is END:
+                    break
+                if item is None:
+                    continue
+                if self.render_stage(self.decision_stage(self.inference_stage(item))) is END:
+                    break
+        else:
+            # Every frame in flight needs its own mirror/RGB buffers
+            self.preprocessors = [FramePreprocessor(FramePool(), self.preprocess.inference_size)
+                                  for _ in range(self.pipeline.max_in_flight)]
+            self.pipeline.run()
         
         # Cleanup
+        self.timer.print_report("Overlay keyboard")
+        if self.pipelined:
+            self.pipeline.print_report("Pipeline stages")
+        self.overlay_renderer.print_report("Overlay rendering")
+        if self.key_sprites:
+            self.key_sprites.print_report("Key sprites")
+        self.overlay_compositor.print_report("Overlay compositing")
+        self.frame_buffers.print_report("Frame buffers")
+        if self.hand_roi:
+            self.hand_roi.print_report("Hand ROI")
+        if self.motion_gate:
+            self.motion_gate.print_report("Motion gate")
+        if self.landmark_tracker:
+            self.landmark_tracker.print_report("Landmark tracking")
         self.save_settings()
+        if self.trace_recorder:
+            self.trace_recorder.close()
+        self.keyboard.close()
+        self.keyboard.print_report("Keyboard input")
         self.cap.release()
-        cv2.destroyAllWindows()
+        close_window('Multi-Hand Gesture Keyboard Overlay')
 
 def main():
+    import argparse
+
+    parser = add_source_arguments(argparse.ArgumentParser(description="Multi-Hand Overlay Gesture Keyboard"))
+    add_trace_arguments(parser)
+    add_input_arguments(parser, default="pynput")
+    add_inference_arguments(parser)
+    add_roi_arguments(parser)
+    add_motion_arguments(parser)
+    add_tracking_arguments(parser)
+    add_pipeline_arguments(parser)
+    add_sprite_arguments(parser)
+    args = parser.parse_args()
+
     try:
-        keyboard = MultiHandOverlayKeyboard()
+        keyboard = MultiHandOverlayKeyboard(source=args.source, replay=args.replay,
+                                            record_trace=args.record_trace,
+                                            replay_trace=args.replay_trace,
+                                            input_backend=args.input_backend,
+                                            inference_size=args.inference_size,
+                                            hand_roi=args.hand_roi,
+                                            motion_gate=create_motion_gate(args),
+                                            track_interval=args.track_interval,
+                                            pipelined=args.pipeline,
+                                            key_sprites=args.key_sprites)
         keyboard.run()
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,192 @@
+import time
+import cv2
+import numpy as np
+from frame_buffers import FramePool, write_into
+
+BAND_GAP = 16   # Content rows closer than this are merged into one band
+
+
+def content_boxes(overlay, band_gap=BAND_GAP):
+    """Boxes (x0, y0, x1, y1), end exclusive, around the non-black parts of an overlay
+
+    Rows with content are grouped into horizontal bands (gaps shorter than
+    band_gap are bridged) and each band is narrowed to its column extent.
+    Bands never share rows, so the boxes do not overlap.
+    """
+    mask = overlay.max(axis=2) > 0
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not len(rows):
+        return []
+
+    boxes = []
+    splits = np.flatnonzero(np.diff(rows) > band_gap) + 1
+    for band in np.split(rows, splits):
+        y0, y1 = int(band[0]), int(band[-1]) + 1
+        cols = np.flatnonzero(mask[y0:y1].any(axis=0))
+        boxes.append((int(cols[0]), y0, int(cols[-1]) + 1, y1))
+    return boxes
+
+
+class OverlayCompositor:
+    """cv2.addWeighted(frame, 1 - alpha, overlay, alpha, 0) restricted to the overlay content
+
+    Outside the content boxes the overlay is black, so the blend reduces to
+    scaling the frame by 1 - alpha (convertScaleAbs, one input instead of two)
+    or to black when there is no camera frame. Inside the boxes the normal
+    addWeighted runs. The output comes from a FramePool and is reused between
+    frames, so the result is only valid until the next composite() call. The
+    scaled path is checked against addWeighted for every alpha and skipped if
+    the rounding ever differs, so the output is always identical to a
+    full-frame blend.
+    """
+
+    def __init__(self, buffers=None):
+        self.buffers = buffers if buffers is not None else FramePool()
+        self.overlay = None
+        self.boxes = []
+        self.slabs = []          # (x0, y0, x1, y1, blend) tiling the frame
+        self.output = None
+        self.black = None
+        self.alpha = None
+        self.scale_exact = False
+
+        # Counters
+        self.frames = 0
+        self.blend_pixels = 0
+        self.total_pixels = 0
+        self.total_time = 0.0
+
+    def set_overlay(self, overlay):
+        """Use a new or redrawn overlay (call whenever its pixels change)"""
+        self.overlay = overlay
+        self.boxes = content_boxes(overlay)
+        self.slabs = self._tile(overlay.shape[:2], self.boxes)
+
+    @staticmethod
+    def _tile(shape, boxes):
+        # Cover the frame once: full-width slabs between bands, margins beside them
+        h, w = shape
+        slabs = []
+        y = 0
+        for x0, y0, x1, y1 in boxes:
+            if y < y0:
+                slabs.append((0, y, w, y0, False))
+            if x0 > 0:
+                slabs.append((0, y0, x0, y1, False))
+            slabs.append((x0, y0, x1, y1, True))
+            if x1 < w:
+                slabs.append((x1, y0, w, y1, False))
+            y = y1
+        if y < h:
+            slabs.append((0, y, w, h, False))
+        return slabs
+
+    def _set_alpha(self, alpha):
+        self.alpha = alpha
+        # Does scaling round exactly like addWeighted with a black overlay at this alpha?
+        ramp = np.arange(256, dtype=np.uint8).reshape(1, 256, 1).repeat(3, axis=2)
+        blended = cv2.addWeighted(ramp, 1 - alpha, np.zeros_like(ramp), alpha, 0)
+        self.scale_exact = np.array_equal(blended, cv2.convertScaleAbs(ramp, alpha=1 - alpha))
+
+    def composite(self, frame, alpha):
+        """Blend the overlay onto frame (None for a black background) and return the output buffer"""
+        start = time.perf_counter()
+        overlay = self.overlay
+        h, w = overlay.shape[:2]
+        self.output = self.buffers.get("composite", overlay.shape)
+        if self.black is None or self.black.shape != overlay.shape:
+            self.black = self.buffers.zeros("composite_black", overlay.shape)
+        if alpha != self.alpha:
+            self._set_alpha(alpha)
+        source = self.black if frame is None else frame
+        beta = 1 - alpha
+
+        for x0, y0, x1, y1, blend in self.slabs:
+            target = self.output[y0:y1, x0:x1]
+            if blend or not self.scale_exact:
+                write_into(target, cv2.addWeighted(source[y0:y1, x0:x1], beta, overlay[y0:y1, x0:x1], alpha, 0,
+                                              dst=target))
+                if blend:
+                    self.blend_pixels += (x1 - x0) * (y1 - y0)
+            elif frame is None:
+                target[...] = 0
+            else:
+                write_into(target, cv2.convertScaleAbs(source[y0:y1, x0:x1], target, beta))
+
+        self.frames += 1
+        self.total_pixels += h * w
+        self.total_time += time.perf_counter() - start
+        return self.output
+
+    def get_stats(self):
+        """Return the blended share of the frame and the time per composite"""
+        return {
+            'frames': self.frames,
+            'boxes': len(self.boxes),
+            'blend_share': self.blend_pixels / max(self.total_pixels, 1),
+            'ms_per_frame': self.total_time * 1000.0 / max(self.frames, 1)
+        }
+
+    def print_report(self, title="Overlay compositing"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['frames']} frames, {stats['ms_per_frame']:.2f} ms/frame, "
+              f"{stats['blend_share']:.0%} of pixels blended in {stats['boxes']} boxes")
+
+
+def main():
+    import argparse
+    from frame_sources import add_source_arguments, open_source
+    from keyboard_layout import OVERLAY_LAYOUTS, overlay_geometry
+    from overlay_renderer import OverlayRenderer, sample_key_items, text_op
+
+    parser = add_source_arguments(argparse.ArgumentParser(
+        description="ROI-restricted overlay blending vs full-frame cv2.addWeighted on replayed frames"))
+    parser.set_defaults(source="synthetic:1280x720", replay="fast")
+    parser.add_argument("--frames", type=int, default=300, help="frames to replay")
+    parser.add_argument("--keyboard-size", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    source = open_source(args.source, mode=args.replay)
+    rng = np.random.default_rng(args.seed)
+    renderer = OverlayRenderer()
+    compositor = OverlayCompositor()
+    full_time = 0.0
+    identical = True
+    frames = 0
+    geometry = None
+    while frames < args.frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        if geometry is None:
+            geometry = overlay_geometry(OVERLAY_LAYOUTS["letters"], frame.shape, args.keyboard_size)
+            h, w = frame.shape[:2]
+            labels = [(text_op("Mode: BOTH", 20, 30, 0.8, (0, 255, 255), 2),),
+                      (text_op("Multi-Hand: ON", 20, 60, 0.7, (255, 255, 0), 2),),
+                      (text_op("Press 'R' to recalibrate hand tracking", w - 400, h - 30, 0.6, (200, 200, 200), 2),)]
+
+        # A new selection every few frames, as during dwell typing
+        if frames % 5 == 0:
+            selected = {geometry.keys[rng.integers(len(geometry))]}
+            compositor.set_overlay(renderer.render(frame.shape, sample_key_items(geometry, selected) + labels))
+        overlay = renderer.image
+        alpha = [0.3, 0.5, 0.8, 1.0][(frames // 20) % 4]
+        background = None if frames % 3 == 2 else frame
+
+        start = time.perf_counter()
+        reference = cv2.addWeighted(np.zeros_like(frame) if background is None else background,
+                                    1 - alpha, overlay, alpha, 0)
+        full_time += time.perf_counter() - start
+        identical &= np.array_equal(compositor.composite(background, alpha), reference)
+        frames += 1
+    source.release()
+
+    stats = compositor.get_stats()
+    print(f"{frames} frames from {args.source}: addWeighted {full_time * 1000.0 / max(frames, 1):.2f} ms/frame, "
+          f"compositor {stats['ms_per_frame']:.2f} ms/frame | identical: {identical}")
+    compositor.print_report("  compositor")
+
+
+if __name__ == "__main__":
+    main()
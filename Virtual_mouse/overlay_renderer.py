@@ -0,0 +1,237 @@
+import time
+from functools import lru_cache
+import cv2
+import numpy as np
+
+TEXT_SIZE_CACHE_SIZE = 1024
+
+
+def rect_op(x0, y0, x1, y1, color, thickness):
+    """Draw op for cv2.rectangle (thickness -1 fills)"""
+    return ('rect', (x0, y0), (x1, y1), tuple(color), thickness)
+
+
+def text_op(text, x, y, font_scale, color, thickness, font=cv2.FONT_HERSHEY_SIMPLEX):
+    """Draw op for cv2.putText"""
+    return ('text', text, (x, y), font, font_scale, tuple(color), thickness)
+
+
+@lru_cache(maxsize=TEXT_SIZE_CACHE_SIZE)
+def text_size(text, font_scale, thickness, font=cv2.FONT_HERSHEY_SIMPLEX):
+    """Cached cv2.getTextSize: ((width, height), baseline)"""
+    return cv2.getTextSize(text, font, font_scale, thickness)
+
+
+def op_bounds(op):
+    """Pixel box (x0, y0, x1, y1), end exclusive, that a draw op can touch"""
+    if op[0] == 'rect':
+        _, (x0, y0), (x1, y1), _, thickness = op
+        pad = max(thickness, 0) + 1
+        return min(x0, x1) - pad, min(y0, y1) - pad, max(x0, x1) + pad + 1, max(y0, y1) + pad + 1
+    _, text, (x, y), font, font_scale, _, thickness = op
+    (text_w, text_h), baseline = text_size(text, font_scale, thickness, font)
+    pad = thickness + 2
+    return x - pad, y - text_h - pad, x + text_w + pad + 1, y + baseline + pad + 1
+
+
+def item_bounds(item):
+    """Union of the op boxes of one item"""
+    boxes = [op_bounds(op) for op in item]
+    if not boxes:
+        return 0, 0, 0, 0
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def draw_item(image, item, offset=(0, 0)):
+    """Draw one item; offset is the image origin in overlay coordinates (for ROI views)"""
+    ox, oy = offset
+    for op in item:
+        if op[0] == 'rect':
+            _, (x0, y0), (x1, y1), color, thickness = op
+            cv2.rectangle(image, (x0 - ox, y0 - oy), (x1 - ox, y1 - oy), color, thickness)
+        else:
+            _, text, (x, y), font, font_scale, color, thickness = op
+            cv2.putText(image, text, (x - ox, y - oy), font, font_scale, color, thickness)
+
+
+def draw_items(frame_shape, items):
+    """Full redraw of all items on a black image"""
+    h, w = frame_shape[:2]
+    image = np.zeros((h, w, 3), dtype=np.uint8)
+    for item in items:
+        draw_item(image, item)
+    return image
+
+
+class OverlayRenderer:
+    """Persistent overlay image that only redraws the items that changed
+
+    An item is a tuple of draw ops (rect_op/text_op) for one key or label, in
+    drawing order. render() compares the new items with the previous ones; for
+    every item that changed, the box covering its old and new pixels is
+    cleared and everything overlapping that box is redrawn into it, clipped,
+    so the result is identical to drawing all items from scratch. With a
+    sprites atlas (key_sprites.SpriteAtlas) items are blitted from cached
+    tiles instead of being drawn.
+    """
+
+    def __init__(self, full_redraw_ratio=0.5, sprites=None):
+        self.full_redraw_ratio = full_redraw_ratio  # Dirty area share above which a full redraw is cheaper
+        self.sprites = sprites
+        self.draw = sprites.blit if sprites is not None else draw_item
+        self.image = None
+        self.items = []
+        self.bounds = []
+
+        # Counters
+        self.renders = 0
+        self.full_renders = 0
+        self.partial_renders = 0
+        self.unchanged_renders = 0
+        self.items_redrawn = 0
+        self.pixels_redrawn = 0
+        self.pixels_total = 0
+        self.full_time = 0.0
+        self.partial_time = 0.0
+
+    def render(self, frame_shape, items):
+        """Bring the overlay up to date with items and return it (do not modify it)"""
+        start = time.perf_counter()
+        items = list(items)
+        h, w = frame_shape[:2]
+        self.renders += 1
+        self.pixels_total += h * w
+
+        if self.image is None or self.image.shape[:2] != (h, w) or len(items) != len(self.items):
+            self._full_render(frame_shape, items)
+            self.full_time += time.perf_counter() - start
+            return self.image
+
+        # Boxes to rebuild: old and new extent of every changed item
+        regions = []
+        for i, item in enumerate(items):
+            if item == self.items[i]:
+                continue
+            new_bounds = item_bounds(item)
+            old_bounds = self.bounds[i]
+            self.items[i] = item
+            self.bounds[i] = new_bounds
+            region = (max(min(old_bounds[0], new_bounds[0]), 0), max(min(old_bounds[1], new_bounds[1]), 0),
+                      min(max(old_bounds[2], new_bounds[2]), w), min(max(old_bounds[3], new_bounds[3]), h))
+            if region[0] < region[2] and region[1] < region[3]:
+                regions.append(region)
+
+        if not regions:
+            self.unchanged_renders += 1
+            self.partial_time += time.perf_counter() - start
+            return self.image
+
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+        if area > self.full_redraw_ratio * h * w:
+            self._full_render(frame_shape, items)
+            self.full_time += time.perf_counter() - start
+            return self.image
+
+        for x0, y0, x1, y1 in regions:
+            roi = self.image[y0:y1, x0:x1]
+            roi[:] = 0
+            for item, (bx0, by0, bx1, by1) in zip(self.items, self.bounds):
+                if bx0 < x1 and bx1 > x0 and by0 < y1 and by1 > y0:
+                    self.draw(roi, item, (x0, y0))
+                    self.items_redrawn += 1
+        self.pixels_redrawn += area
+        self.partial_renders += 1
+        self.partial_time += time.perf_counter() - start
+        return self.image
+
+    def _full_render(self, frame_shape, items):
+        h, w = frame_shape[:2]
+        self.image = np.zeros((h, w, 3), dtype=np.uint8)
+        for item in items:
+            self.draw(self.image, item)
+        self.items = items
+        self.bounds = [item_bounds(item) for item in items]
+        self.items_redrawn += len(items)
+        self.pixels_redrawn += self.image.shape[0] * self.image.shape[1]
+        self.full_renders += 1
+
+    def invalidate(self):
+        """Force a full redraw on the next render"""
+        self.image = None
+
+    def get_stats(self):
+        """Return render counts and the average rerender cost"""
+        incremental = self.partial_renders + self.unchanged_renders
+        return {
+            'renders': self.renders,
+            'full': self.full_renders,
+            'partial': self.partial_renders,
+            'unchanged': self.unchanged_renders,
+            'full_ms': self.full_time * 1000.0 / max(self.full_renders, 1),
+            'partial_ms': self.partial_time * 1000.0 / max(incremental, 1),
+            'ms_per_render': (self.full_time + self.partial_time) * 1000.0 / max(self.renders, 1),
+            'items_per_render': self.items_redrawn / max(self.renders, 1),
+            'pixel_share': self.pixels_redrawn / max(self.pixels_total, 1)
+        }
+
+    def print_report(self, title="Overlay rendering"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['renders']} renders ({stats['full']} full, {stats['partial']} partial, "
+              f"{stats['unchanged']} unchanged), {stats['ms_per_render']:.2f} ms/render "
+              f"(full {stats['full_ms']:.2f} ms, incremental {stats['partial_ms']:.2f} ms), "
+              f"{stats['items_per_render']:.1f} items and {stats['pixel_share']:.0%} of pixels redrawn")
+
+
+def sample_key_items(geometry, selected=()):
+    """Key items with the overlay keyboard's look (grey keys, selected ones blue), for benchmarks"""
+    items = []
+    for key, (x, y, kw, kh) in zip(geometry.keys, geometry.rects.tolist()):
+        color, border = ((100, 0, 0), (255, 0, 0)) if key in selected else ((50, 50, 50), (255, 255, 255))
+        font_scale = max(0.5, min(min(kw + 4, kh + 4) / 100.0, 1.2))
+        text_w, text_h = text_size(key, font_scale, 2)[0]
+        items.append((rect_op(x, y, x + kw, y + kh, color, -1),
+                      rect_op(x, y, x + kw, y + kh, border, 3),
+                      text_op(key, x - 2 + (kw + 4 - text_w) // 2, y - 2 + (kh + 4 + text_h) // 2,
+                              font_scale, (255, 255, 255), 2)))
+    return items
+
+
+def main():
+    import argparse
+    from keyboard_layout import OVERLAY_LAYOUTS, overlay_geometry
+
+    parser = argparse.ArgumentParser(description="Incremental vs full overlay redraw during dwell selection")
+    parser.add_argument("--frames", type=int, default=300, help="selection changes per resolution")
+    parser.add_argument("--keyboard-size", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for shape in [(480, 640, 3), (720, 1280, 3), (1080, 1920, 3)]:
+        geometry = overlay_geometry(OVERLAY_LAYOUTS["letters"], shape, args.keyboard_size)
+        # Two hands dwelling: each frame one hand moves to a new key or lets go
+        selected = [None, None]
+        sequence = []
+        for _ in range(args.frames):
+            hand = rng.integers(2)
+            selected[hand] = None if rng.random() < 0.2 else geometry.keys[rng.integers(len(geometry))]
+            sequence.append(sample_key_items(geometry, set(selected)))
+
+        start = time.perf_counter()
+        full = [draw_items(shape, items) for items in sequence]
+        full_time = time.perf_counter() - start
+
+        renderer = OverlayRenderer()
+        identical = True
+        for items, reference in zip(sequence, full):
+            identical &= np.array_equal(renderer.render(shape, items), reference)
+
+        # Render time is measured inside the renderer, so the comparison is not counted
+        print(f"{shape[1]}x{shape[0]}: full {full_time * 1000.0 / len(sequence):.2f} ms/frame, "
+              f"incremental {renderer.get_stats()['ms_per_render']:.2f} ms/frame | identical: {identical}")
+        renderer.print_report("  renderer")
+
+
+if __name__ == "__main__":
+    main()
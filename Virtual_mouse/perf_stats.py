@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Accumulate per-stage wall time and frame counts for a processing loop"""
+
+    def __init__(self):
+        self.stage_totals = {}
+        self.stage_counts = {}
+        self.frames = 0
+        self.start_time = time.perf_counter()
+        self.start_cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code under the given stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        """Record a measured duration for a stage"""
+        self.stage_totals[name] = self.stage_totals.get(name, 0.0) + seconds
+        self.stage_counts[name] = self.stage_counts.get(name, 0) + 1
+
+    def frame_done(self):
+        """Mark the end of one loop iteration"""
+        self.frames += 1
+
+    def report(self):
+        """Return throughput, process CPU use (% of one core) and average per-stage time in milliseconds"""
+        elapsed = time.perf_counter() - self.start_time
+        cpu = time.process_time() - self.start_cpu
+        stages = {}
+        for name, total in self.stage_totals.items():
+            stages[name] = total * 1000.0 / max(self.stage_counts[name], 1)
+        return {
+            'frames': self.frames,
+            'elapsed': elapsed,
+            'fps': self.frames / elapsed if elapsed > 0 else 0.0,
+            'cpu_percent': cpu * 100.0 / elapsed if elapsed > 0 else 0.0,
+            'stage_ms': stages
+        }
+
+    def print_report(self, title="Pipeline"):
+        """Print a one-block summary of the report"""
+        report = self.report()
+        print(f"{title}: {report['frames']} frames in {report['elapsed']:.2f}s "
+              f"({report['fps']:.1f} FPS, {report['cpu_percent']:.0f}% CPU)")
+        for name, ms in report['stage_ms'].items():
+            print(f"  {name}: {ms:.2f} ms/frame")
@@ -0,0 +1,262 @@
+import threading
+import time
+
+END = object()   # Returned by the first stage when the source is exhausted
+
+
+class Handoff:
+    """Single-slot queue between two stage threads
+
+    put() blocks while the slot is full, so a fast stage waits for a slow one
+    instead of piling up frames, and get() blocks while it is empty. Closing
+    lets the consumer drain what is left; aborting drops it.
+    """
+
+    def __init__(self):
+        self.item = None
+        self.full = False
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def put(self, item):
+        """Hand an item to the next stage; False if the handoff was closed"""
+        with self.condition:
+            self.condition.wait_for(lambda: not self.full or self.closed)
+            if self.closed:
+                return False
+            self.item = item
+            self.full = True
+            self.condition.notify_all()
+            return True
+
+    def get(self):
+        """Return (True, item), or (False, None) once closed and empty"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.full or self.closed)
+            if not self.full:
+                return False, None
+            item = self.item
+            self.item = None
+            self.full = False
+            self.condition.notify_all()
+            return True, item
+
+    def close(self, abort=False):
+        with self.condition:
+            self.closed = True
+            if abort:
+                self.item = None
+                self.full = False
+            self.condition.notify_all()
+
+
+class Stage:
+    """One pipeline stage and its timing"""
+
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+
+        # Counters
+        self.items = 0
+        self.busy_time = 0.0      # Inside function
+        self.starved_time = 0.0   # Waiting for input
+        self.blocked_time = 0.0   # Waiting for the next stage to take the output
+
+
+class Pipeline:
+    """Run each stage of a frame loop on its own thread, connected by single-slot handoffs
+
+    Stage functions take the previous stage's output and return the item for
+    the next stage, or None to drop it. The first stage is called with None and
+    returns END when the source is exhausted; what is already in flight is
+    still finished. The last stage runs on the thread that calls run() (the
+    OpenCV window and waitKey must stay there); stop() ends the pipeline at
+    once from any stage. With one frame in every stage, capture of frame N+1
+    and rendering of frame N-1 overlap inference of frame N, so throughput is
+    bounded by the slowest stage instead of the sum of all of them. Up to
+    max_in_flight items exist at the same time, so per-frame buffers handed
+    between stages need that many copies.
+    """
+
+    def __init__(self, stages=()):
+        self.stages = [Stage(name, function) for name, function in stages]
+        self.handoffs = []
+        self.threads = []
+        self.error = None
+        self.stopping = False
+        self.start_time = None
+        self.elapsed = 0.0
+
+    def add_stage(self, name, function):
+        self.stages.append(Stage(name, function))
+        return self
+
+    @property
+    def max_in_flight(self):
+        # One item inside every stage and one in every handoff
+        return 2 * len(self.stages) - 1
+
+    def stop(self):
+        """End the pipeline now; items in flight are dropped"""
+        self.stopping = True
+        for handoff in self.handoffs:
+            handoff.close(abort=True)
+
+    def run(self):
+        """Run until the source ends or stop() is called, then re-raise the first stage error"""
+        self.handoffs = [Handoff() for _ in self.stages[1:]]
+        self.stopping = False
+        self.start_time = time.perf_counter()
+        self.threads = [threading.Thread(target=self._run_stage, args=(index,), daemon=True,
+                                         name=f"pipeline-{stage.name}")
+                        for index, stage in enumerate(self.stages[:-1])]
+        for thread in self.threads:
+            thread.start()
+        self._run_stage(len(self.stages) - 1)
+        self.stop()
+        for thread in self.threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - self.start_time
+        if self.error is not None:
+            raise self.error
+
+    def _run_stage(self, index):
+        stage = self.stages[index]
+        source = self.handoffs[index - 1] if index > 0 else None
+        target = self.handoffs[index] if index < len(self.handoffs) else None
+        try:
+            while not self.stopping:
+                item = None
+                if source is not None:
+                    start = time.perf_counter()
+                    ok, item = source.get()
+                    stage.starved_time += time.perf_counter() - start
+                    if not ok:
+                        break
+
+                start = time.perf_counter()
+                item = stage.function(item)
+                stage.busy_time += time.perf_counter() - start
+                if item is END:
+                    break
+                if item is None:
+                    continue
+                stage.items += 1
+
+                if target is not None:
+                    start = time.perf_counter()
+                    ok = target.put(item)
+                    stage.blocked_time += time.perf_counter() - start
+                    if not ok:
+                        break
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+            self.stop()
+        finally:
+            # Let the next stage finish what it already has
+            if target is not None:
+                target.close()
+
+    def get_stats(self):
+        """Return per-stage occupancy (busy share of the run), time per item and waits"""
+        elapsed = self.elapsed or (time.perf_counter() - self.start_time if self.start_time else 0.0)
+        stages = {}
+        for stage in self.stages:
+            stages[stage.name] = {
+                'items': stage.items,
+                'ms_per_item': stage.busy_time * 1000.0 / max(stage.items, 1),
+                'occupancy': stage.busy_time / elapsed if elapsed > 0 else 0.0,
+                'starved': stage.starved_time / elapsed if elapsed > 0 else 0.0,
+                'blocked': stage.blocked_time / elapsed if elapsed > 0 else 0.0
+            }
+        items = self.stages[-1].items if self.stages else 0
+        bottleneck = max(stages, key=lambda name: stages[name]['occupancy']) if stages else None
+        return {
+            'elapsed': elapsed,
+            'items': items,
+            'fps': items / elapsed if elapsed > 0 else 0.0,
+            'bottleneck': bottleneck,
+            'stages': stages
+        }
+
+    def print_report(self, title="Pipeline"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['items']} frames in {stats['elapsed']:.2f}s ({stats['fps']:.1f} FPS), "
+              f"bottleneck: {stats['bottleneck']}")
+        for name, stage in stats['stages'].items():
+            print(f"  {name}: {stage['ms_per_item']:.2f} ms/frame, {stage['occupancy']:.0%} busy, "
+                  f"{stage['starved']:.0%} waiting for input, {stage['blocked']:.0%} waiting on the next stage")
+
+
+def add_pipeline_arguments(parser):
+    """Add the --pipeline option to an argparse parser"""
+    parser.add_argument("--pipeline", action="store_true",
+                        help="run capture, inference, gesture handling and rendering on separate "
+                             "threads so they overlap")
+    return parser
+
+
+def main():
+    import argparse
+    import os
+    import cv2
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Serial loop vs pipeline on simulated stages")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--stage-ms", type=float, nargs=4, default=[4.0, 12.0, 1.0, 6.0],
+                        metavar=("CAPTURE", "INFERENCE", "DECISION", "RENDER"),
+                        help="simulated work per stage")
+    parser.add_argument("--work", choices=["opencv", "sleep"], default="opencv",
+                        help="CPU work in OpenCV (releases the GIL, like MediaPipe) or waiting "
+                             "(like a camera read or an accelerator)")
+    args = parser.parse_args()
+
+    # Busy work in OpenCV (GIL released, like MediaPipe and frame processing) sized per stage
+    image = np.random.default_rng(0).integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    calibration = time.perf_counter()
+    for _ in range(5):
+        cv2.GaussianBlur(image, (15, 15), 0)
+    blur_ms = (time.perf_counter() - calibration) * 1000.0 / 5
+
+    def work(ms):
+        def stage(item):
+            if args.work == "sleep":
+                time.sleep(ms / 1000.0)
+                return item
+            for _ in range(max(int(round(ms / blur_ms)), 1)):
+                cv2.GaussianBlur(image, (15, 15), 0)
+            return item
+        return stage
+
+    def stages():
+        counter = iter(range(args.frames))
+        capture_work = work(args.stage_ms[0])
+
+        def capture(_):
+            capture_work(None)
+            return next(counter, END)
+
+        names = ["inference", "decision", "render"]
+        return [("capture", capture)] + [(name, work(ms)) for name, ms in zip(names, args.stage_ms[1:])]
+
+    start = time.perf_counter()
+    serial_stages = stages()
+    for _ in range(args.frames):
+        item = None
+        for _, function in serial_stages:
+            item = function(item)
+    serial = time.perf_counter() - start
+
+    pipeline = Pipeline(stages())
+    pipeline.run()
+    stats = pipeline.get_stats()
+    print(f"serial {args.frames / serial:.1f} FPS, pipeline {stats['fps']:.1f} FPS "
+          f"({serial / stats['elapsed']:.2f}x), {args.work} work on {os.cpu_count()} CPUs")
+    pipeline.print_report("  pipeline")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,39 +4,84 @@ import numpy as np
 import tkinter as tk
 from tkinter import ttk
 import threading
+import multiprocessing
 import time
-from pynput.keyboard import Key, Controller as KeyboardController
-import math
 import queue
 import json
 import os
 from datetime import datetime
+from frame_capture import create_capture
+from frame_sources import add_source_arguments
+from perf_stats import StageTimer
+from display import show_frame, poll_key, close_window
+from frame_buffers import FramePool
+from frame_preprocess import add_inference_arguments, FramePreprocessor
+from motion_gate import add_motion_arguments, create_motion_gate
+from inference_pool import add_pool_arguments, create_mediapipe_hands, InferencePool
+from landmark_trace import add_trace_arguments, ReplayHands, TraceRecorder
+from input_backends import add_input_arguments, create_backend, InputWorker
+from gestures import classify_advanced_gesture, GestureStabilizer
+from hand_landmarks import LandmarkBuffer, pointing_position
+from keyboard_layout import ADVANCED_LAYOUTS, grid_geometry
 
 class AdvancedGestureKeyboard:
-    def __init__(self):
-        # Initialize MediaPipe with better settings
+    def __init__(self, source=0, replay="realtime", record_trace=None, replay_trace=None,
+                 input_backend="pynput", inference_size=None, motion_gate=None, inference_workers=0,
+                 engine=None):
+        # MediaPipe hand solution (the detector is created below, only when it runs in this process)
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,  # Single hand for better accuracy
-            min_detection_confidence=0.8,
-            min_tracking_confidence=0.7
-        )
+        self.hands = None
         self.mp_draw = mp.solutions.drawing_utils
         
-        # Initialize keyboard controller
-        self.keyboard = KeyboardController()
+        # Reused (hands, 21, 3) landmark arrays
+        self.landmark_buffer = LandmarkBuffer(max_hands=1)
+        
+        # Reused per-frame images (mirror, RGB)
+        self.frame_buffers = FramePool()
+        self.preprocess = FramePreprocessor(self.frame_buffers, inference_size)
         
-        # Camera setup
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        # Initialize keyboard controller (key events run on a worker thread)
+        self.keyboard = InputWorker(create_backend(input_backend))
+        
+        # Camera setup (live sources are read on a background thread)
+        self.shared_engine = engine is not None
+        if self.shared_engine:
+            # Frames and hands from a VisionEngine shared with the other apps
+            self.cap = engine.subscribe("keyboard")
+            self.hands = self.cap
+        else:
+            self.cap = create_capture(source, mode=replay, width=1280, height=720, fps=30)
+        
+        # Landmark trace recording / replay
+        self.replaying_trace = bool(replay_trace)
+        if replay_trace:
+            self.hands = ReplayHands(replay_trace)
+        self.trace_recorder = None
+        if record_trace:
+            self.trace_recorder = TraceRecorder(record_trace,
+                                                int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                                int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        
+        # Reuse the last result on frames without motion (replayed landmarks must stay in step)
+        self.motion_gate = motion_gate if not self.replaying_trace and not self.shared_engine else None
+        
+        # Hand detection in worker processes fed through a shared-memory frame ring
+        self.inference_pool = None
+        if inference_workers > 0 and not self.replaying_trace and not self.shared_engine:
+            self.inference_pool = InferencePool(inference_workers, create_hands=create_mediapipe_hands,
+                                                hands_args=(1, 0.8, 0.7))
+            self.motion_gate = None
+        elif not self.replaying_trace and not self.shared_engine:
+            # Initialize MediaPipe with better settings
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=1,  # Single hand for better accuracy
+                min_detection_confidence=0.8,
+                min_tracking_confidence=0.7
+            )
         
         # Advanced gesture detection
-        self.gesture_history = []
-        self.gesture_stability_threshold = 5
-        self.last_stable_gesture = "none"
+        self.gesture_stabilizer = GestureStabilizer(stability_threshold=5)
         
         # Calibration data
         self.calibration_data = self.load_calibration()
@@ -44,21 +89,7 @@ class AdvancedGestureKeyboard:
         
         # Enhanced keyboard layouts
         self.current_layout = "qwerty"
-        self.keyboard_layouts = {
-            "qwerty": [
-                ['1', '2', '3', '4', '5', '6', '7', '8', '9', '0'],
-                ['Q', 'W', 'E', 'R', 'T', 'Y', 'U', 'I', 'O', 'P'],
-                ['A', 'S', 'D', 'F', 'G', 'H', 'J', 'K', 'L'],
-                ['Z', 'X', 'C', 'V', 'B', 'N', 'M'],
-                ['SPACE', 'BACKSPACE', 'ENTER', 'SHIFT', 'CTRL']
-            ],
-            "symbols": [
-                ['!', '@', '#', '$', '%', '^', '&', '*', '(', ')'],
-                ['-', '=', '[', ']', '\\', ';', "'", ',', '.', '/'],
-                ['<', '>', '?', ':', '"', '{', '}', '|'],
-                ['SPACE', 'BACKSPACE', 'ENTER', 'QWERTY']
-            ]
-        }
+        self.keyboard_layouts = ADVANCED_LAYOUTS
         
         # Gesture state management
         self.gesture_queue = queue.Queue()
@@ -268,175 +299,146 @@ class AdvancedGestureKeyboard:
     
     def detect_advanced_gesture(self, landmarks):
         """Advanced gesture detection with stability checking"""
-        if not landmarks:
+        if landmarks is None:
             return "none"
         
-        # Get landmark positions
-        thumb_tip = landmarks[4]
-        thumb_pip = landmarks[3]
-        index_tip = landmarks[8]
-        index_pip = landmarks[6]
-        middle_tip = landmarks[12]
-        middle_pip = landmarks[10]
-        ring_tip = landmarks[16]
-        ring_pip = landmarks[14]
-        pinky_tip = landmarks[20]
-        pinky_pip = landmarks[18]
-        
-        # Calculate finger states
-        fingers = []
-        
-        # Thumb (different logic for left/right hand)
-        if thumb_tip.x > landmarks[3].x:
-            fingers.append(thumb_tip.x > thumb_pip.x)
-        else:
-            fingers.append(thumb_tip.x < thumb_pip.x)
-        
-        # Other fingers
-        fingers.append(index_tip.y < index_pip.y)
-        fingers.append(middle_tip.y < middle_pip.y)
-        fingers.append(ring_tip.y < ring_pip.y)
-        fingers.append(pinky_tip.y < pinky_pip.y)
-        
-        # Calculate distances for pinch detection
-        thumb_index_dist = self.calculate_distance(thumb_tip, index_tip)
-        thumb_middle_dist = self.calculate_distance(thumb_tip, middle_tip)
-        
-        # Gesture classification
-        total_fingers = sum(fingers)
-        
-        if thumb_index_dist < 0.04:  # Tight pinch
-            gesture = "select"
-        elif thumb_middle_dist < 0.04:  # Middle finger pinch
-            gesture = "right_click"
-        elif total_fingers == 1 and fingers[1]:  # Index finger only
-            gesture = "point"
-        elif total_fingers == 2 and fingers[1] and fingers[2]:  # Peace sign
-            gesture = "scroll"
-        elif total_fingers == 3 and fingers[1] and fingers[2] and fingers[3]:
-            gesture = "drag"
-        elif total_fingers == 5:  # Open hand
-            gesture = "open"
-        elif total_fingers == 0:  # Fist
-            gesture = "fist"
-        else:
-            gesture = "none"
-        
-        # Add to history for stability
-        self.gesture_history.append(gesture)
-        if len(self.gesture_history) > self.gesture_stability_threshold:
-            self.gesture_history.pop(0)
-        
-        # Check for stable gesture
-        if len(self.gesture_history) >= self.gesture_stability_threshold:
-            if all(g == gesture for g in self.gesture_history[-3:]):
-                self.last_stable_gesture = gesture
-                return gesture
-        
-        return self.last_stable_gesture
-    
-    def calculate_distance(self, point1, point2):
-        """Calculate Euclidean distance between two points"""
-        return math.sqrt((point1.x - point2.x)**2 + (point1.y - point2.y)**2)
+        gesture = classify_advanced_gesture(landmarks)
+        return self.gesture_stabilizer.update(gesture)
     
     def get_precise_pointing_position(self, landmarks, frame_shape):
         """Get precise pointing position with calibration"""
-        if not landmarks:
+        if landmarks is None:
             return None
         
-        index_tip = landmarks[8]
-        h, w = frame_shape[:2]
-        
         # Apply calibration if available
-        x = index_tip.x
-        y = index_tip.y
-        
         if self.is_calibrated and 'offset_x' in self.calibration_data:
-            x += self.calibration_data['offset_x']
-            y += self.calibration_data['offset_y']
+            return pointing_position(landmarks, frame_shape,
+                                     self.calibration_data['offset_x'],
+                                     self.calibration_data['offset_y'])
         
-        # Convert to pixel coordinates
-        pixel_x = int(x * w)
-        pixel_y = int(y * h)
-        
-        return (pixel_x, pixel_y)
+        return pointing_position(landmarks, frame_shape)
     
     def map_to_keyboard_advanced(self, point, frame_shape):
         """Advanced mapping with better accuracy"""
         if not point:
             return None
         
-        x, y = point
-        h, w = frame_shape[:2]
-        
-        # Get current layout
+        # Row/column lookup tables of the cached grid for this layout and frame size
         layout = self.keyboard_layouts[self.current_layout]
-        
-        # Calculate grid dimensions
-        total_rows = len(layout)
-        row_height = h / (total_rows + 1)  # +1 for padding
-        
-        # Determine row
-        row_idx = int((y - row_height/2) / row_height)
-        row_idx = max(0, min(row_idx, total_rows - 1))
-        
-        if row_idx >= len(layout):
-            return None
-        
-        # Determine column within row
-        row = layout[row_idx]
-        col_width = w / len(row)
-        col_idx = int(x / col_width)
-        col_idx = max(0, min(col_idx, len(row) - 1))
-        
-        return row[col_idx]
+        return grid_geometry(layout, frame_shape).key_at(point)
     
     def camera_loop(self):
         """Enhanced camera processing loop"""
+        timer = StageTimer()
+        source_ended = False
         while self.running:
             ret, frame = self.cap.read()
             if not ret:
+                if not self.cap.isOpened():
+                    # Recorded source finished
+                    source_ended = True
+                    break
                 continue
             
-            # Flip and process frame
-            frame = cv2.flip(frame, 1)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Hand detection
-            results = self.hands.process(rgb_frame)
-            
-            gesture = "none"
-            pointing_pos = None
-            
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    # Draw landmarks
-                    self.mp_draw.draw_landmarks(
-                        frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS
-                    )
-                    
-                    # Detect gesture
-                    gesture = self.detect_advanced_gesture(hand_landmarks.landmark)
-                    pointing_pos = self.get_precise_pointing_position(
-                        hand_landmarks.landmark, frame.shape
-                    )
-            
-            # Add visual feedback
-            self.add_visual_feedback(frame, gesture, pointing_pos)
-            
-            # Show frame (only if not in background mode)
-            if not self.background_mode:
-                cv2.imshow('Advanced Gesture Keyboard', frame)
+            if self.inference_pool:
+                if not self.submit_frame(frame, timer):
+                    break
+                continue
             
-            # Process gesture
-            if gesture != "none":
-                self.gesture_queue.put((gesture, pointing_pos, frame.shape))
+            if self.shared_engine:
+                # The engine's frame is already mirrored and is what its hands are looked up by
+                rgb_frame = frame
+                if not self.background_mode:
+                    frame = self.frame_buffers.copy("display", frame)
+            else:
+                # Mirrored RGB for inference; the mirrored BGR frame is only needed when shown
+                rgb_frame = self.preprocess.inference_input(frame)
+                if not self.background_mode:
+                    frame = self.preprocess.display_frame()
             
-            # Handle window events
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # Hand detection
+            with timer.stage("inference"):
+                if self.motion_gate:
+                    results = self.motion_gate.process(rgb_frame, self.hands.process)
+                else:
+                    results = self.hands.process(rgb_frame)
+            if not self.handle_frame(frame, results, timer):
                 break
         
+        if source_ended and self.inference_pool:
+            # Show the frames still in the workers
+            self.collect_frames(timer)
+        
+        timer.print_report("Camera loop")
+        self.frame_buffers.print_report()
+        if self.motion_gate:
+            self.motion_gate.print_report()
+        if self.inference_pool:
+            self.inference_pool.print_report()
         self.cleanup_camera()
+        if self.shared_engine and self.running:
+            # Quitting ends the whole app here, as it does the other apps on the engine
+            self.root.after(0, self.root.quit)
+    
+    def submit_frame(self, frame, timer):
+        """Queue a frame for the inference workers and handle the results that are ready"""
+        pool = self.inference_pool
+        with timer.stage("inference"):
+            # Preprocess straight into the ring slot the workers read from
+            slot = pool.acquire(self.preprocess.inference_shape(frame.shape))
+            self.preprocess.inference_input(frame, dst=slot)
+            pool.commit(frame)
+        return self.collect_frames(timer, keep_in_flight=pool.workers)
+    
+    def collect_frames(self, timer, keep_in_flight=0):
+        """Handle pool results in frame order until at most keep_in_flight remain; False on quit"""
+        pool = self.inference_pool
+        while pool.in_flight > keep_in_flight or pool.ready():
+            with timer.stage("inference wait"):
+                _, results, frame = pool.get()
+            if not self.background_mode:
+                frame = self.frame_buffers.flip("mirror", frame, 1)
+            if not self.handle_frame(frame, results, timer):
+                return False
+        return True
+    
+    def handle_frame(self, frame, results, timer):
+        """Draw, classify and show one frame's hand results; False when 'q' was pressed"""
+        if self.trace_recorder:
+            self.trace_recorder.record(results)
+        
+        gesture = "none"
+        pointing_pos = None
+        
+        if results.multi_hand_landmarks:
+            hand_arrays = self.landmark_buffer.update(results)
+            for hand_landmarks, landmarks in zip(results.multi_hand_landmarks, hand_arrays):
+                # Draw landmarks
+                self.mp_draw.draw_landmarks(
+                    frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS
+                )
+                
+                # Detect gesture
+                gesture = self.detect_advanced_gesture(landmarks)
+                pointing_pos = self.get_precise_pointing_position(
+                    landmarks, frame.shape
+                )
+        
+        # Add visual feedback
+        self.add_visual_feedback(frame, gesture, pointing_pos)
+        
+        # Show frame (only if not in background mode)
+        if not self.background_mode:
+            show_frame('Advanced Gesture Keyboard', frame)
+        
+        # Process gesture
+        if gesture != "none":
+            self.gesture_queue.put((gesture, pointing_pos, frame.shape))
+        
+        # Handle window events
+        timer.frame_done()
+        self.frame_buffers.frame_done()
+        return poll_key('Advanced Gesture Keyboard', 1) != ord('q')
     #here 4/10/2025
     def add_visual_feedback(self, frame, gesture, pointing_pos):
         """Add visual feedback to camera frame"""
@@ -470,24 +472,9 @@ class AdvancedGestureKeyboard:
     
     def draw_keyboard_overlay(self, frame):
         """Draw keyboard grid overlay on camera frame"""
-        h, w = frame.shape[:2]
+        # Grid lines are rasterized once per layout and frame size
         layout = self.keyboard_layouts[self.current_layout]
-        
-        # Draw grid lines
-        total_rows = len(layout)
-        row_height = h // (total_rows + 1)
-        
-        for i in range(1, total_rows + 1):
-            y = i * row_height
-            cv2.line(frame, (0, y), (w, y), (100, 100, 100), 1)
-        
-        # Draw column lines for each row
-        for row_idx, row in enumerate(layout):
-            y = (row_idx + 1) * row_height
-            col_width = w // len(row)
-            for i in range(1, len(row)):
-                x = i * col_width
-                cv2.line(frame, (x, y - row_height//2), (x, y + row_height//2), (100, 100, 100), 1)
+        grid_geometry(layout, frame.shape).draw_grid(frame, (100, 100, 100))
     
     def gesture_processor(self):
         """Enhanced gesture processing"""
@@ -592,14 +579,11 @@ class AdvancedGestureKeyboard:
         """Type a key with enhanced functionality"""
         try:
             if key == 'SPACE':
-                self.keyboard.press(Key.space)
-                self.keyboard.release(Key.space)
+                self.keyboard.press_key('space')
             elif key == 'BACKSPACE':
-                self.keyboard.press(Key.backspace)
-                self.keyboard.release(Key.backspace)
+                self.keyboard.press_key('backspace')
             elif key == 'ENTER':
-                self.keyboard.press(Key.enter)
-                self.keyboard.release(Key.enter)
+                self.keyboard.press_key('enter')
             elif key == 'SHIFT':
                 # Toggle shift state (simplified)
                 pass
@@ -611,7 +595,7 @@ class AdvancedGestureKeyboard:
                 self.change_layout()
                 return
             else:
-                self.keyboard.type(key.lower())
+                self.keyboard.type_text(key.lower())
             
             # Update stats
             self.typing_stats['keys_typed'] += 1
@@ -628,7 +612,14 @@ class AdvancedGestureKeyboard:
         """Clean up camera resources"""
         if hasattr(self, 'cap'):
             self.cap.release()
-        cv2.destroyAllWindows()
+        if getattr(self, 'trace_recorder', None):
+            self.trace_recorder.close()
+        if getattr(self, 'inference_pool', None):
+            self.inference_pool.close()
+        if hasattr(self, 'keyboard'):
+            self.keyboard.close()
+            self.keyboard.print_report("Keyboard input")
+        close_window('Advanced Gesture Keyboard')
     
     def on_closing(self):
         """Handle window closing"""
@@ -674,8 +665,24 @@ class AdvancedGestureKeyboard:
             self.root.quit()
 
 def main():
+    import argparse
+
+    parser = add_source_arguments(argparse.ArgumentParser(description="Advanced Gesture Virtual Keyboard"))
+    add_trace_arguments(parser)
+    add_input_arguments(parser, default="pynput")
+    add_inference_arguments(parser)
+    add_motion_arguments(parser)
+    add_pool_arguments(parser)
+    args = parser.parse_args()
+
     try:
-        keyboard = AdvancedGestureKeyboard()
+        keyboard = AdvancedGestureKeyboard(source=args.source, replay=args.replay,
+                                           record_trace=args.record_trace,
+                                           replay_trace=args.replay_trace,
+                                           input_backend=args.input_backend,
+                                           inference_size=args.inference_size,
+                                           motion_gate=create_motion_gate(args),
+                                           inference_workers=args.inference_workers)
         keyboard.start()
     except Exception as e:
         print(f"Error starting advanced gesture keyboard: {e}")
@@ -683,4 +690,6 @@ def main():
         print("pip install opencv-python mediapipe pynput numpy")
 
 if __name__ == "__main__":
+    # Inference workers re-run this module when spawned from a packaged executable
+    multiprocessing.freeze_support()
     main()
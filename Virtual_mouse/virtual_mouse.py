@@ -3,179 +3,47 @@ import mediapipe as mp
 import numpy as np
 import pyautogui
 import time
-import math
+import argparse
+from frame_capture import create_capture
+from frame_sources import add_source_arguments
+from perf_stats import StageTimer
+from display import show_frame, poll_key, close_window
+from frame_buffers import FramePool
+from frame_preprocess import add_inference_arguments, FramePreprocessor
+from motion_gate import add_motion_arguments, create_motion_gate
+from landmark_tracker import add_tracking_arguments, create_landmark_tracker
+from multi_camera import add_camera_arguments, create_multi_camera
+from inference_pool import create_mediapipe_hands
+from cursor_filters import add_filter_arguments, create_filter
+from cursor_prediction import add_prediction_arguments, CursorPredictor, PredictionErrorLog
+from cursor_output import add_output_arguments, resolve_move_rate, CursorOutputThread, MoveLimiter
+from input_backends import add_input_arguments, create_backend, InputWorker
+from gestures import detect_gesture
+from hand_landmarks import (
+    LandmarkBuffer, landmarks_to_pixels, FINGERTIPS,
+    THUMB_TIP, INDEX_FINGER_TIP, MIDDLE_FINGER_TIP, PINKY_TIP
+)
+from landmark_trace import add_trace_arguments, ReplayHands, TraceRecorder
 
 # Disable pyautogui failsafe for smoother operation
 pyautogui.FAILSAFE = False
 
-# Initialize MediaPipe Hand solution
+# MediaPipe Hand solution (the detector itself is created in main, only when this process runs it)
 mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=1,
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.7
-)
 mp_drawing = mp.solutions.drawing_utils
 
 # Get screen dimensions
 screen_width, screen_height = pyautogui.size()
 print(f"Screen resolution: {screen_width}x{screen_height}")
 
-# Set up webcam
-cap = cv2.VideoCapture(0)
-frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-print(f"Camera resolution: {frame_width}x{frame_height}")
-
-# Parameters
-smoothening = 12  # Increased for smoother movement
-prev_x, prev_y = 0, 0
-curr_x, curr_y = 0, 0
-
-# Additional smoothing parameters
-velocity_smoothening = 8
-dead_zone = 5  # Minimum movement threshold
-movement_history = []
-max_history = 5
+# Camera frame size (set once the frame source is opened in main)
+frame_width, frame_height = 640, 480
 
 # Gesture detection parameters
 gesture_threshold = 25  # More restrictive threshold for actual pinching
 click_delay = 0.3
 scroll_sensitivity = 3
 
-# State variables
-is_left_clicking = False
-is_right_clicking = False
-is_double_clicking = False
-is_dragging = False
-drag_start_time = 0
-last_scroll_time = 0
-scroll_start_y = 0
-
-# Timing variables
-left_click_start_time = 0
-right_click_start_time = 0
-double_click_start_time = 0
-
-def calculate_distance(p1, p2):
-    """Calculate Euclidean distance between two points"""
-    return math.sqrt((p2[0] - p1[0])**2 + (p2[1] - p2[1])**2)
-
-def smooth_movement(new_x, new_y, prev_x, prev_y):
-    """Apply advanced smoothing to cursor movement"""
-    global movement_history
-    
-    # Calculate raw movement
-    raw_dx = new_x - prev_x
-    raw_dy = new_y - prev_y
-    
-    # Apply dead zone to prevent micro-movements
-    if abs(raw_dx) < dead_zone and abs(raw_dy) < dead_zone:
-        return prev_x, prev_y
-    
-    # Add to movement history for velocity smoothing
-    movement_history.append((raw_dx, raw_dy))
-    if len(movement_history) > max_history:
-        movement_history.pop(0)
-    
-    # Calculate average velocity
-    if len(movement_history) > 1:
-        avg_dx = sum(dx for dx, dy in movement_history) / len(movement_history)
-        avg_dy = sum(dy for dx, dy in movement_history) / len(movement_history)
-        
-        # Apply velocity-based smoothing
-        smooth_dx = prev_x + (new_x - prev_x) / smoothening + avg_dx / velocity_smoothening
-        smooth_dy = prev_y + (new_y - prev_y) / smoothening + avg_dy / velocity_smoothening
-    else:
-        smooth_dx = prev_x + (new_x - prev_x) / smoothening
-        smooth_dy = prev_y + (new_y - prev_y) / smoothening
-    
-    return smooth_dx, smooth_dy
-
-def get_finger_positions(landmarks):
-    """Extract key finger positions from hand landmarks"""
-    positions = {}
-    
-    # Finger tip landmarks
-    positions['thumb_tip'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.THUMB_TIP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.THUMB_TIP].y * frame_height)
-    ]
-    positions['index_tip'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_TIP].y * frame_height)
-    ]
-    positions['middle_tip'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.MIDDLE_FINGER_TIP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.MIDDLE_FINGER_TIP].y * frame_height)
-    ]
-    positions['ring_tip'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.RING_FINGER_TIP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.RING_FINGER_TIP].y * frame_height)
-    ]
-    positions['pinky_tip'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.PINKY_TIP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.PINKY_TIP].y * frame_height)
-    ]
-    
-    # Finger MCP (base) landmarks for finger state detection
-    positions['index_mcp'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_MCP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.INDEX_FINGER_MCP].y * frame_height)
-    ]
-    positions['middle_mcp'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.MIDDLE_FINGER_MCP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.MIDDLE_FINGER_MCP].y * frame_height)
-    ]
-    positions['ring_mcp'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.RING_FINGER_MCP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.RING_FINGER_MCP].y * frame_height)
-    ]
-    positions['pinky_mcp'] = [
-        int(landmarks.landmark[mp_hands.HandLandmark.PINKY_MCP].x * frame_width),
-        int(landmarks.landmark[mp_hands.HandLandmark.PINKY_MCP].y * frame_height)
-    ]
-    
-    return positions
-
-def is_finger_up(tip_pos, mcp_pos):
-    """Check if a finger is extended (up)"""
-    return tip_pos[1] < mcp_pos[1]
-
-def detect_gesture(positions):
-    """Detect various hand gestures with precise pinch detection"""
-    # Calculate distances
-    thumb_index_dist = calculate_distance(positions['thumb_tip'], positions['index_tip'])
-    thumb_middle_dist = calculate_distance(positions['thumb_tip'], positions['middle_tip'])
-    thumb_pinky_dist = calculate_distance(positions['thumb_tip'], positions['pinky_tip'])
-    index_middle_dist = calculate_distance(positions['index_tip'], positions['middle_tip'])
-    
-    # Check which fingers are up
-    fingers_up = []
-    fingers_up.append(is_finger_up(positions['index_tip'], positions['index_mcp']))  # Index
-    fingers_up.append(is_finger_up(positions['middle_tip'], positions['middle_mcp']))  # Middle
-    fingers_up.append(is_finger_up(positions['ring_tip'], positions['ring_mcp']))  # Ring
-    fingers_up.append(is_finger_up(positions['pinky_tip'], positions['pinky_mcp']))  # Pinky
-    
-    gesture = "none"
-    
-    # More restrictive gesture detection - only trigger on actual pinches
-    if thumb_pinky_dist < gesture_threshold and thumb_pinky_dist > 10:  # Avoid false positives
-        gesture = "double_click"
-    elif thumb_index_dist < gesture_threshold and thumb_index_dist > 10:
-        gesture = "left_click"
-    elif thumb_middle_dist < gesture_threshold and thumb_middle_dist > 10:
-        gesture = "right_click"
-    elif fingers_up == [True, True, False, False] and index_middle_dist < 50:
-        gesture = "scroll"
-    elif fingers_up == [True, False, False, False]:
-        gesture = "cursor"
-    elif sum(fingers_up) == 0:
-        gesture = "fist"
-    
-    return gesture, thumb_index_dist, thumb_middle_dist, thumb_pinky_dist
-
 def draw_hand_indicator(image, hand_detected):
     """Draw hand detection status indicator"""
     indicator_color = (0, 255, 0) if hand_detected else (0, 0, 255)
@@ -192,9 +60,8 @@ def draw_gesture_info(image, gesture, positions, thumb_index_dist, thumb_middle_
     """Draw gesture information and visual feedback with distance indicators"""
     # Draw finger tip circles
     colors = [(0, 255, 0), (255, 0, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255)]
-    finger_names = ['thumb_tip', 'index_tip', 'middle_tip', 'ring_tip', 'pinky_tip']
     
-    for i, finger in enumerate(finger_names):
+    for i, finger in enumerate(FINGERTIPS):
         cv2.circle(image, tuple(positions[finger]), 8, colors[i], cv2.FILLED)
     
     # Draw gesture status with color coding
@@ -223,189 +90,362 @@ def draw_gesture_info(image, gesture, positions, thumb_index_dist, thumb_middle_
         cv2.putText(image, "DOUBLE PINCH READY", (10, pinch_status_y + 40), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 255), 2)
 
-print("Advanced Virtual Mouse Control Started!")
-print("Hand Gestures:")
-print("- Index finger pointing: Move cursor")
-print("- Thumb + Index pinch: Left click")
-print("- Thumb + Index hold: Draw/Select mode")
-print("- Thumb + Pinky pinch: Double click")
-print("- Thumb + Middle pinch: Right click")
-print("- Index + Middle up: Scroll mode")
-print("- Fist: Stop all actions")
-print("Press 'q' to quit.")
-
-while cap.isOpened():
-    success, image = cap.read()
-    if not success:
-        print("Failed to capture image from camera.")
-        break
+def main(argv=None, engine=None):
+    global frame_width, frame_height
+
+    parser = add_source_arguments(argparse.ArgumentParser(description="Advanced Virtual Mouse Control"))
+    add_trace_arguments(parser)
+    add_filter_arguments(parser)
+    add_prediction_arguments(parser)
+    add_output_arguments(parser)
+    add_input_arguments(parser, default="pyautogui")
+    add_inference_arguments(parser)
+    add_motion_arguments(parser)
+    add_tracking_arguments(parser)
+    add_camera_arguments(parser)
+    parser.add_argument("--headless", action="store_true",
+                        help="do not open a window (for benchmarking replays)")
+    parser.add_argument("--max-frames", type=int, default=0,
+                        help="stop after this many frames (0 = run until the source ends)")
+    args = parser.parse_args(argv)
+
+    # Set up the frame source (live sources are read on a background thread); with several
+    # cameras every camera runs its own detection pipeline and the loop reads their merged hands
+    cameras = None
+    if not args.replay_trace and engine is None:
+        cameras = create_multi_camera(args, create_mediapipe_hands, (1, 0.7, 0.7), max_hands=1)
+    if engine is not None:
+        # Frames and hands from a shared VisionEngine (see vision_engine.py)
+        cap = engine.subscribe("mouse")
+    else:
+        cap = cameras or create_capture(args.source, mode=args.replay)
+    # Detection already ran elsewhere; hands.process() returns its result
+    detected_upstream = cameras is not None or engine is not None
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or frame_width
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or frame_height
+    print(f"Camera resolution: {frame_width}x{frame_height}")
+
+    # Hands from upstream, from a replayed landmark trace, or from MediaPipe in this thread
+    if detected_upstream:
+        hands = cap
+    elif args.replay_trace:
+        hands = ReplayHands(args.replay_trace)
+    else:
+        hands = mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=1,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.7
+        )
+
+    # Landmark trace recording
+    recorder = TraceRecorder(args.record_trace, frame_width, frame_height) if args.record_trace else None
+
+    # Reuse the last result on frames without motion (replayed landmarks must stay in step)
+    motion_gate = create_motion_gate(args) if not args.replay_trace and not detected_upstream else None
+
+    # Cursor smoothing (the legacy preset is the original lerp + velocity filter)
+    cursor_filter = create_filter(args.cursor_filter)
+    curr_x, curr_y = 0, 0
+
+    # Optional latency compensation
+    predictor = CursorPredictor(bounds=(screen_width, screen_height)) if args.predict else None
+    prediction_log = PredictionErrorLog()
+
+    # Mouse events run on a worker thread so they never stall the frame loop
+    mouse = InputWorker(create_backend(args.input_backend, (screen_width, screen_height)))
+
+    # Skip moves that would not change the cursor and cap the move rate
+    move_limiter = MoveLimiter(mouse.move_to, max_rate=resolve_move_rate(args))
+
+    # High-rate cursor output decoupled from the camera frame rate
+    cursor_output = None
+    if args.cursor_rate > 0:
+        cursor_output = CursorOutputThread(move_limiter.move_to, rate_hz=args.cursor_rate,
+                                           flush=move_limiter.flush).start()
+
+    # State variables
+    is_left_clicking = False
+    is_right_clicking = False
+    is_double_clicking = False
+    is_dragging = False
+    last_scroll_time = 0
+    scroll_start_y = 0
+
+    # Timing variables
+    left_click_start_time = 0
+    right_click_start_time = 0
+    double_click_start_time = 0
+
+    timer = StageTimer()
+    frame_buffers = FramePool()
+    preprocess = FramePreprocessor(frame_buffers, args.inference_size)
+    landmark_buffer = LandmarkBuffer(max_hands=1)
+
+    # Optical-flow landmarks between detections every --track-interval frames
+    landmark_tracker = None
+    if not args.replay_trace and not detected_upstream:
+        landmark_tracker = create_landmark_tracker(args, frame_buffers)
+    if landmark_tracker:
+        def track_hands(image):
+            return landmark_tracker.process(image, hands.process)
+    else:
+        track_hands = hands.process
+
+    print("Advanced Virtual Mouse Control Started!")
+    print("Hand Gestures:")
+    print("- Index finger pointing: Move cursor")
+    print("- Thumb + Index pinch: Left click")
+    print("- Thumb + Index hold: Draw/Select mode")
+    print("- Thumb + Pinky pinch: Double click")
+    print("- Thumb + Middle pinch: Right click")
+    print("- Index + Middle up: Scroll mode")
+    print("- Fist: Stop all actions")
+    print("Press 'q' to quit.")
+
+    while cap.isOpened():
+        if args.max_frames and timer.frames >= args.max_frames:
+            break
+
+        success, image, frame_time = cap.read_timestamped()
+        if not success:
+            # A recording that ended is not a capture failure
+            if cap.isOpened():
+                print("Failed to capture image from camera.")
+            break
+        frame_start = time.perf_counter()
+        # Live timestamps are wall clock; recorded ones are media time
+        capture_age = time.time() - frame_time if cap.live else 0.0
         
-    # Flip the image horizontally for mirror view
-    image = cv2.flip(image, 1)
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        if engine is not None:
+            # The engine's frame is already mirrored and is what its hands are looked up by
+            image_rgb = image
+            if not args.headless:
+                image = frame_buffers.copy("display", image)
+        else:
+            # Mirrored RGB for inference in one pass; the mirrored BGR view only when it is shown
+            image_rgb = preprocess.inference_input(image)
+            if not args.headless:
+                image = preprocess.display_frame()
     
-    # Process the image and detect hands
-    results = hands.process(image_rgb)
+        # Process the image and detect hands
+        with timer.stage("inference"):
+            if motion_gate:
+                results = motion_gate.process(image_rgb, track_hands)
+            else:
+                results = track_hands(image_rgb)
+        if recorder:
+            recorder.record(results)
     
-    if results.multi_hand_landmarks:
-        # Add this right after processing hand landmarks:
-        draw_hand_indicator(image, True)  # Hand detected
-        for hand_landmarks in results.multi_hand_landmarks:
-            # Draw hand landmarks
-            mp_drawing.draw_landmarks(
-                image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+        if results.multi_hand_landmarks:
+            # Add this right after processing hand landmarks:
+            draw_hand_indicator(image, True)  # Hand detected
+            hand_arrays = landmark_buffer.update(results)
+            for hand_landmarks, landmarks in zip(results.multi_hand_landmarks, hand_arrays):
+                # Draw hand landmarks
+                mp_drawing.draw_landmarks(
+                    image, hand_landmarks, mp_hands.HAND_CONNECTIONS)
             
-            # Get finger positions
-            positions = get_finger_positions(hand_landmarks)
+                # Get (21, 2) pixel positions
+                positions = landmarks_to_pixels(landmarks, frame_width, frame_height)
             
-            # Detect gesture
-            gesture, thumb_index_dist, thumb_middle_dist, thumb_pinky_dist = detect_gesture(positions)
+                # Detect gesture
+                with timer.stage("gesture"):
+                    gesture, thumb_index_dist, thumb_middle_dist, thumb_pinky_dist = detect_gesture(positions, gesture_threshold)
 
-            # Draw gesture information
-            draw_gesture_info(image, gesture, positions, thumb_index_dist, thumb_middle_dist, thumb_pinky_dist)
+                # Draw gesture information
+                draw_gesture_info(image, gesture, positions, thumb_index_dist, thumb_middle_dist, thumb_pinky_dist)
             
-            # Cursor movement (always active with index finger)
-            index_x, index_y = positions['index_tip']
-            screen_x = np.interp(index_x, (100, frame_width-100), (0, screen_width))
-            screen_y = np.interp(index_y, (100, frame_height-100), (0, screen_height))
+                # Cursor movement (always active with index finger)
+                index_x, index_y = positions[INDEX_FINGER_TIP]
+                screen_x = np.interp(index_x, (100, frame_width-100), (0, screen_width))
+                screen_y = np.interp(index_y, (100, frame_height-100), (0, screen_height))
 
-            # Apply advanced smoothing
-            curr_x, curr_y = smooth_movement(screen_x, screen_y, prev_x, prev_y)
+                # Apply cursor smoothing
+                curr_x, curr_y = cursor_filter.filter(screen_x, screen_y, frame_time)
 
-            # Move mouse cursor
-            pyautogui.moveTo(curr_x, curr_y)
-            prev_x, prev_y = curr_x, curr_y
+                # Project the cursor to where the finger is now
+                move_x, move_y = curr_x, curr_y
+                if predictor:
+                    if args.predict_latency_ms is not None:
+                        latency = args.predict_latency_ms / 1000.0
+                    else:
+                        latency = capture_age + time.perf_counter() - frame_start
+                    prediction_log.observe(screen_x, screen_y, frame_time)
+                    move_x, move_y = predictor.predict(curr_x, curr_y, frame_time, latency)
+                    prediction_log.add(frame_time + latency, (move_x, move_y), (curr_x, curr_y))
+
+                # Move mouse cursor
+                if cursor_output:
+                    cursor_output.set_target(move_x, move_y)
+                else:
+                    move_limiter.move_to(move_x, move_y)
             
-            # Handle different gestures
-            current_time = time.time()
+                # Handle different gestures
+                current_time = time.time()
             
-            if gesture == "double_click":
-                # Only proceed if it's a clear pinch gesture
-                if thumb_pinky_dist < gesture_threshold and thumb_pinky_dist > 10:
-                    cv2.line(image, tuple(positions['thumb_tip']), 
-                            tuple(positions['pinky_tip']), (255, 0, 255), 3)
+                if gesture == "double_click":
+                    # Only proceed if it's a clear pinch gesture
+                    if thumb_pinky_dist < gesture_threshold and thumb_pinky_dist > 10:
+                        cv2.line(image, tuple(positions[THUMB_TIP]), 
+                                tuple(positions[PINKY_TIP]), (255, 0, 255), 3)
                     
-                    if not is_double_clicking:
-                        is_double_clicking = True
-                        double_click_start_time = current_time
-                    elif current_time - double_click_start_time > click_delay:
-                        pyautogui.doubleClick()
-                        cv2.putText(image, "DOUBLE CLICK!", (200, 50), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 255), 3)
-                        double_click_start_time = current_time
-
-            elif gesture == "left_click":
-                # Only proceed if it's a clear pinch gesture
-                if thumb_index_dist < gesture_threshold and thumb_index_dist > 10:
-                    cv2.line(image, tuple(positions['thumb_tip']), 
-                            tuple(positions['index_tip']), (0, 0, 255), 3)
+                        if not is_double_clicking:
+                            is_double_clicking = True
+                            double_click_start_time = current_time
+                        elif current_time - double_click_start_time > click_delay:
+                            mouse.click(count=2)
+                            cv2.putText(image, "DOUBLE CLICK!", (200, 50), 
+                                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 255), 3)
+                            double_click_start_time = current_time
+
+                elif gesture == "left_click":
+                    # Only proceed if it's a clear pinch gesture
+                    if thumb_index_dist < gesture_threshold and thumb_index_dist > 10:
+                        cv2.line(image, tuple(positions[THUMB_TIP]), 
+                                tuple(positions[INDEX_FINGER_TIP]), (0, 0, 255), 3)
                     
-                    if not is_left_clicking:
-                        is_left_clicking = True
-                        left_click_start_time = current_time
-                    elif current_time - left_click_start_time > click_delay:
-                        if not is_dragging:
-                            # Single click for quick pinch
-                            if current_time - left_click_start_time < 0.8:
-                                pyautogui.click()
-                                cv2.putText(image, "LEFT CLICK!", (200, 50), 
-                                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
-                            # Enable drawing/selection mode for held pinch
-                            else:
-                                is_dragging = True
-                                pyautogui.mouseDown()
-                                cv2.putText(image, "DRAWING/SELECTING", (200, 100), 
-                                           cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 255), 3)
-                        left_click_start_time = current_time
-
-            elif gesture == "right_click":
-                # Only proceed if it's a clear pinch gesture
-                if thumb_middle_dist < gesture_threshold and thumb_middle_dist > 10:
-                    cv2.line(image, tuple(positions['thumb_tip']), 
-                            tuple(positions['middle_tip']), (255, 0, 0), 3)
+                        if not is_left_clicking:
+                            is_left_clicking = True
+                            left_click_start_time = current_time
+                        elif current_time - left_click_start_time > click_delay:
+                            if not is_dragging:
+                                # Single click for quick pinch
+                                if current_time - left_click_start_time < 0.8:
+                                    mouse.click()
+                                    cv2.putText(image, "LEFT CLICK!", (200, 50), 
+                                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
+                                # Enable drawing/selection mode for held pinch
+                                else:
+                                    is_dragging = True
+                                    mouse.mouse_down()
+                                    cv2.putText(image, "DRAWING/SELECTING", (200, 100), 
+                                               cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 255), 3)
+                            left_click_start_time = current_time
+
+                elif gesture == "right_click":
+                    # Only proceed if it's a clear pinch gesture
+                    if thumb_middle_dist < gesture_threshold and thumb_middle_dist > 10:
+                        cv2.line(image, tuple(positions[THUMB_TIP]), 
+                                tuple(positions[MIDDLE_FINGER_TIP]), (255, 0, 0), 3)
                     
-                    if not is_right_clicking:
-                        is_right_clicking = True
-                        right_click_start_time = current_time
-                    elif current_time - right_click_start_time > click_delay:
-                        pyautogui.rightClick()
-                        cv2.putText(image, "RIGHT CLICK!", (200, 50), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 3)
-                        right_click_start_time = current_time
+                        if not is_right_clicking:
+                            is_right_clicking = True
+                            right_click_start_time = current_time
+                        elif current_time - right_click_start_time > click_delay:
+                            mouse.click(button='right')
+                            cv2.putText(image, "RIGHT CLICK!", (200, 50), 
+                                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 3)
+                            right_click_start_time = current_time
             
-            elif gesture == "scroll":
-                cv2.line(image, tuple(positions['index_tip']), 
-                        tuple(positions['middle_tip']), (0, 255, 255), 3)
+                elif gesture == "scroll":
+                    cv2.line(image, tuple(positions[INDEX_FINGER_TIP]), 
+                            tuple(positions[MIDDLE_FINGER_TIP]), (0, 255, 255), 3)
                 
-                if current_time - last_scroll_time > 0.1:  # Scroll throttling
-                    if scroll_start_y == 0:
-                        scroll_start_y = index_y
+                    if current_time - last_scroll_time > 0.1:  # Scroll throttling
+                        if scroll_start_y == 0:
+                            scroll_start_y = index_y
                     
-                    scroll_diff = scroll_start_y - index_y
-                    if abs(scroll_diff) > 20:
-                        if scroll_diff > 0:
-                            pyautogui.scroll(scroll_sensitivity)
-                            cv2.putText(image, "SCROLL UP", (200, 50), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
-                        else:
-                            pyautogui.scroll(-scroll_sensitivity)
-                            cv2.putText(image, "SCROLL DOWN", (200, 50), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
+                        scroll_diff = scroll_start_y - index_y
+                        if abs(scroll_diff) > 20:
+                            if scroll_diff > 0:
+                                mouse.scroll(scroll_sensitivity)
+                                cv2.putText(image, "SCROLL UP", (200, 50), 
+                                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
+                            else:
+                                mouse.scroll(-scroll_sensitivity)
+                                cv2.putText(image, "SCROLL DOWN", (200, 50), 
+                                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 3)
                         
-                        scroll_start_y = index_y
-                        last_scroll_time = current_time
+                            scroll_start_y = index_y
+                            last_scroll_time = current_time
             
-            else:
-                # Reset all states when no gesture is detected
-                if is_left_clicking:
-                    is_left_clicking = False
-                if is_right_clicking:
-                    is_right_clicking = False
-                if is_double_clicking:
-                    is_double_clicking = False
-                if is_dragging:
-                    is_dragging = False
-                    pyautogui.mouseUp()
-                scroll_start_y = 0
+                else:
+                    # Reset all states when no gesture is detected
+                    if is_left_clicking:
+                        is_left_clicking = False
+                    if is_right_clicking:
+                        is_right_clicking = False
+                    if is_double_clicking:
+                        is_double_clicking = False
+                    if is_dragging:
+                        is_dragging = False
+                        mouse.mouse_up()
+                    scroll_start_y = 0
             
-            # Display distances for debugging
-            cv2.putText(image, f"T-I: {int(thumb_index_dist)}", (10, 70), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            cv2.putText(image, f"T-M: {int(thumb_middle_dist)}", (10, 90), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            cv2.putText(image, f"T-P: {int(thumb_pinky_dist)}", (10, 110), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                # Display distances for debugging
+                cv2.putText(image, f"T-I: {int(thumb_index_dist)}", (10, 70), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                cv2.putText(image, f"T-M: {int(thumb_middle_dist)}", (10, 90), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                cv2.putText(image, f"T-P: {int(thumb_pinky_dist)}", (10, 110), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
     
-    else:
-        # Reset all states when no hand is detected
-        draw_hand_indicator(image, False)  # No hand detected
-        if is_dragging:
-            is_dragging = False
-            pyautogui.mouseUp()
-        is_left_clicking = False
-        is_right_clicking = False
-        is_double_clicking = False
-        scroll_start_y = 0
+        else:
+            # Reset all states when no hand is detected
+            draw_hand_indicator(image, False)  # No hand detected
+            if is_dragging:
+                is_dragging = False
+                mouse.mouse_up()
+            is_left_clicking = False
+            is_right_clicking = False
+            is_double_clicking = False
+            scroll_start_y = 0
     
-    # Display status
-    status_text = "Virtual Mouse: Active"
-    if is_dragging:
-        status_text += " | DRAWING/SELECTING"
+        # Display status
+        status_text = "Virtual Mouse: Active"
+        if is_dragging:
+            status_text += " | DRAWING/SELECTING"
     
-    cv2.putText(image, status_text, (10, frame_height - 20), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        cv2.putText(image, status_text, (10, frame_height - 20), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
     
-    # Display the image
-    cv2.imshow('Advanced Virtual Mouse Control', image)
+        if not cursor_output:
+            move_limiter.flush()
+
+        timer.frame_done()
+        frame_buffers.frame_done()
+        if args.headless:
+            continue
+
+        # Display the image
+        show_frame('Advanced Virtual Mouse Control', image)
     
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(5) & 0xFF == ord('q'):
-        break
+        # Break the loop if 'q' is pressed
+        if poll_key('Advanced Virtual Mouse Control', 5) == ord('q'):
+            break
+
+    # Cleanup
+    if cursor_output:
+        cursor_output.stop()
+        stats = cursor_output.get_stats()
+        print(f"Cursor output: {stats['moves']} moves, {stats['tick_rate']:.0f} Hz")
+
+    if is_dragging:
+        mouse.mouse_up()
+
+    mouse.close()
+    if recorder:
+        recorder.close()
+
+    cap.release()
+    if not detected_upstream:
+        hands.close()
+    close_window('Advanced Virtual Mouse Control')
+    timer.print_report("Virtual mouse")
+    frame_buffers.print_report()
+    if motion_gate:
+        motion_gate.print_report()
+    if landmark_tracker:
+        landmark_tracker.print_report()
+    if cameras:
+        cameras.print_report()
+    move_limiter.print_report()
+    mouse.print_report("Mouse input")
+    if predictor:
+        prediction_log.print_report()
+    print("Advanced Virtual Mouse Control Ended")
 
-# Cleanup
-if is_dragging:
-    pyautogui.mouseUp()
 
-cap.release()
-cv2.destroyAllWindows()
-print("Advanced Virtual Mouse Control Ended")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+from frame_capture import create_capture
+from frame_preprocess import FramePreprocessor
+from frame_sources import REPLAY_REALTIME
+from inference_pool import create_mediapipe_hands
+from landmark_trace import ReplayResults
+
+# (max hands, detection confidence, tracking confidence) each app uses on its own
+APP_HANDS = {
+    "mouse": (1, 0.7, 0.7),
+    "overlay": (2, 0.7, 0.5),
+    "keyboard": (1, 0.8, 0.7)
+}
+PENDING_RESULTS = 8      # Frames a consumer may have read and not yet passed to process() (pipelined consumers)
+
+
+class EngineConsumer:
+    """One consumer's view of a VisionEngine, usable as its frame source and as its Hands
+
+    read() returns the newest frame the consumer has not seen (frames
+    published while it was busy are dropped, like ThreadedCapture), and
+    process(frame) returns the engine's hands for that frame, matched by
+    the frame object itself, so a consumer loop that does cap.read() then
+    hands.process(frame) gets the right hands whether it is pipelined or
+    skips frames. Frames come already mirrored (the engine's display frame),
+    so consumers skip their own mirror and RGB pass; they are shared between
+    consumers and must not be written to, so the apps only draw on their own
+    copies.
+    """
+
+    def __init__(self, engine, name):
+        self.engine = engine
+        self.name = name
+        self.condition = threading.Condition()
+        self.latest = None            # (frame_id, frame, timestamp, results)
+        self.last_id = 0
+        self.pending = OrderedDict()  # frame_id -> (frame, results) read and not yet processed
+        self.closed = False
+
+        # Counters
+        self.frames_read = 0
+        self.dropped_frames = 0
+        self.unprocessed = 0          # Frames read but never passed to process()
+        self.unmatched = 0            # process() calls with a frame that was not read from the engine
+
+    @property
+    def live(self):
+        return self.engine.cap.live
+
+    def deliver(self, frame_id, frame, timestamp, results):
+        """Called by the engine thread for every frame (frame None when the engine stopped)"""
+        with self.condition:
+            if frame is not None:
+                self.latest = (frame_id, frame, timestamp, results)
+            self.condition.notify_all()
+
+    def read_timestamped(self, timeout=1.0):
+        """Return (ret, frame, timestamp) for the newest unseen frame"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self._has_new() or not self.isOpened(), timeout):
+                return False, None, 0.0
+            if not self._has_new():
+                return False, None, 0.0
+            frame_id, frame, timestamp, results = self.latest
+
+        self.dropped_frames += frame_id - self.last_id - 1
+        self.last_id = frame_id
+        self.frames_read += 1
+        self.pending[frame_id] = (frame, results)
+        if len(self.pending) > PENDING_RESULTS:
+            self.pending.popitem(last=False)
+            self.unprocessed += 1
+        return True, frame, timestamp
+
+    def read(self):
+        ret, frame, _ = self.read_timestamped()
+        return ret, frame
+
+    def _has_new(self):
+        return self.latest is not None and self.latest[0] > self.last_id
+
+    def process(self, image):
+        """Hands of a frame returned by read() (detection already ran in the engine)"""
+        for frame_id, (frame, results) in self.pending.items():
+            if frame is image:
+                del self.pending[frame_id]
+                return results
+        self.unmatched += 1
+        return ReplayResults()
+
+    def close(self):
+        pass
+
+    def isOpened(self):
+        return not self.closed and (self.engine.running or self._has_new())
+
+    def get(self, prop):
+        return self.engine.cap.get(prop)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        """Stop receiving frames; the engine keeps running for the other consumers"""
+        self.closed = True
+        self.engine.unsubscribe(self)
+
+    def get_stats(self):
+        return {
+            'read': self.frames_read,
+            'dropped': self.dropped_frames,
+            'unprocessed': self.unprocessed + len(self.pending),
+            'unmatched': self.unmatched
+        }
+
+
+class VisionEngine:
+    """Capture and hand detection done once, published to any number of in-process consumers
+
+    One thread reads the camera, runs MediaPipe on every frame and hands the
+    mirrored frame and its result to every subscribed EngineConsumer, so the
+    mouse and both keyboards can run together on one camera with one
+    inference and one mirror per frame instead of one per app. Consumers that fall behind skip to the newest
+    frame; the engine never waits for them.
+    """
+
+    def __init__(self, source=0, create_hands=create_mediapipe_hands, hands_args=(2,), mode=REPLAY_REALTIME,
+                 inference_size=None, width=1280, height=720, fps=30):
+        self.cap = create_capture(source, mode=mode, width=width, height=height, fps=fps)
+        self.hands = create_hands(*hands_args)
+        self.preprocess = FramePreprocessor(inference_size=inference_size)
+        self.consumers = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        # Counters
+        self.frames = 0
+        self.inference_time = 0.0
+        self.start_time = None
+        self.elapsed = 0.0
+        self.consumer_stats = {}      # name -> stats of consumers that have left
+
+    def subscribe(self, name="consumer"):
+        """Return a new consumer that receives every frame from now on"""
+        consumer = EngineConsumer(self, name)
+        with self.lock:
+            self.consumers.append(consumer)
+        return consumer
+
+    def unsubscribe(self, consumer):
+        with self.lock:
+            if consumer in self.consumers:
+                self.consumers.remove(consumer)
+                self.consumer_stats[consumer.name] = consumer.get_stats()
+
+    def start(self):
+        self.running = True
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self._loop, name="vision-engine", daemon=True)
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        try:
+            while self.running:
+                ret, frame, timestamp = self.cap.read_timestamped()
+                if not ret:
+                    if not self.cap.isOpened():
+                        # Recorded source finished
+                        break
+                    continue
+
+                start = time.perf_counter()
+                results = self.hands.process(self.preprocess.inference_input(frame))
+                self.inference_time += time.perf_counter() - start
+                # A new array per frame, since consumers keep it after the next one arrives
+                mirrored = cv2.flip(frame, 1)
+                self.frames += 1
+                with self.lock:
+                    consumers = list(self.consumers)
+                for consumer in consumers:
+                    consumer.deliver(self.frames, mirrored, timestamp, results)
+        finally:
+            self.running = False
+            self.elapsed = time.perf_counter() - self.start_time
+            with self.lock:
+                consumers = list(self.consumers)
+            for consumer in consumers:
+                consumer.deliver(self.frames, None, 0.0, None)
+
+    def stop(self):
+        """Stop capture and inference; consumers see the source end"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        self.cap.release()
+        self.hands.close()
+
+    def get_stats(self):
+        """Return frames, inference time per frame and what each consumer read and dropped"""
+        elapsed = self.elapsed or (time.perf_counter() - self.start_time if self.start_time else 0.0)
+        with self.lock:
+            consumers = dict(self.consumer_stats)
+            consumers.update((consumer.name, consumer.get_stats()) for consumer in self.consumers)
+        return {
+            'frames': self.frames,
+            'fps': self.frames / elapsed if elapsed > 0 else 0.0,
+            'inference_ms': self.inference_time * 1000.0 / max(self.frames, 1),
+            'consumers': consumers
+        }
+
+    def print_report(self, title="Vision engine"):
+        stats = self.get_stats()
+        print(f"{title}: {stats['frames']} frames ({stats['fps']:.1f} FPS), one inference per frame "
+              f"({stats['inference_ms']:.2f} ms)")
+        for name, consumer in stats['consumers'].items():
+            print(f"  {name}: {consumer['read']} frames read, {consumer['dropped']} skipped, "
+                  f"{consumer['unprocessed']} read without asking for their hands, "
+                  f"{consumer['unmatched']} hand requests for unknown frames")
+
+
+def main():
+    import argparse
+    from frame_sources import add_source_arguments
+    from frame_preprocess import add_inference_arguments
+    from input_backends import BACKENDS
+
+    parser = add_source_arguments(argparse.ArgumentParser(
+        description="Run the virtual mouse and keyboards together on one camera and one hand detector"))
+    add_inference_arguments(parser)
+    parser.add_argument("--apps", nargs="+", choices=["mouse", "overlay", "keyboard"], default=["mouse", "overlay"],
+                        help="apps to run on the shared engine")
+    parser.add_argument("--input-backend", default=None, choices=list(BACKENDS),
+                        help="input backend for every app (default: each app's own)")
+    args = parser.parse_args()
+
+    # One detector for every app: as many hands as any of them tracks, with the strictest confidences
+    hands_args = tuple(max(values) for values in zip(*(APP_HANDS[app] for app in args.apps)))
+    engine = VisionEngine(args.source, create_mediapipe_hands, hands_args,
+                          mode=args.replay, inference_size=args.inference_size)
+    backend = {"input_backend": args.input_backend} if args.input_backend else {}
+    threads = []
+    keyboard = None
+
+    if "mouse" in args.apps:
+        import virtual_mouse
+        argv = ["--input-backend", args.input_backend] if args.input_backend else []
+        threads.append(threading.Thread(target=virtual_mouse.main, args=(argv, engine), name="mouse", daemon=True))
+    if "overlay" in args.apps:
+        from multi_hand_virtual_keyboard import MultiHandOverlayKeyboard
+        overlay = MultiHandOverlayKeyboard(engine=engine, **backend)
+        threads.append(threading.Thread(target=overlay.run, name="overlay", daemon=True))
+    if "keyboard" in args.apps:
+        from virtual_keyboard import AdvancedGestureKeyboard
+        keyboard = AdvancedGestureKeyboard(engine=engine, **backend)
+
+    engine.start()
+    for thread in threads:
+        thread.start()
+    try:
+        if keyboard:
+            # Tk has to run on the main thread
+            keyboard.start()
+        else:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        for thread in threads:
+            thread.join(timeout=5.0)
+        engine.print_report()
+
+
+if __name__ == "__main__":
+    main()